@@ -0,0 +1,74 @@
+"""
+    Finds the argon2 parameters that fit a verify time budget on this host.
+    For each memory cost, the time cost is raised until a verify reaches
+    the target. The configuration with the most memory within the budget
+    wins (memory hardness is what slows down GPU attacks).
+
+    Run on the production hardware with:
+        python -m benchmarks.calibrate_argon2 --target-ms 250
+    and copy the printed AUTH_* lines to the environment.
+"""
+import argparse
+import os
+import statistics
+import time
+from passlib.hash import argon2
+
+
+MEMORY_COSTS = (19_456, 47_104, 65_536, 102_400, 131_072, 262_144) # KiB
+MAX_TIME_COST = 10
+SAMPLES = 5
+
+
+def measure_verify(time_cost: int, memory_cost: int, parallelism: int) -> float:
+    "Median verify time in seconds, what a login actually pays."
+    handler = argon2.using(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+    hashed = handler.hash("calibration-password")
+    timings = []
+    for _ in range(SAMPLES):
+        started = time.perf_counter()
+        handler.verify("calibration-password", hashed)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def calibrate(target: float, parallelism: int) -> tuple[int, int, float]:
+    best: tuple[int, int, float] = (1, MEMORY_COSTS[0], measure_verify(1, MEMORY_COSTS[0], parallelism))
+
+    for memory_cost in MEMORY_COSTS:
+        for time_cost in range(1, MAX_TIME_COST + 1):
+            elapsed = measure_verify(time_cost, memory_cost, parallelism)
+            print(f"  m={memory_cost:>7} KiB t={time_cost:<2} p={parallelism}: {elapsed * 1000:7.1f} ms")
+
+            if elapsed > target:
+                break
+            best = (time_cost, memory_cost, elapsed)
+
+        # The cheapest time cost already exceeds the budget, more memory won't fit either.
+        if time_cost == 1 and elapsed > target:
+            break
+
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target-ms", type=float, default=250, help="Verify time budget per login.")
+    parser.add_argument("--parallelism", type=int, default=min(os.cpu_count() or 1, 8))
+    args = parser.parse_args()
+
+    print(f"Calibrating argon2 for {args.target_ms:.0f} ms per verify ...")
+    time_cost, memory_cost, elapsed = calibrate(args.target_ms / 1000, args.parallelism)
+
+    # Each verify uses `parallelism` threads, more at once only adds queueing.
+    concurrent_verifies = max(1, (os.cpu_count() or 1) // args.parallelism)
+    print()
+    print(f"# Verify takes {elapsed * 1000:.1f} ms, about {concurrent_verifies / elapsed:.0f} logins/s per host.")
+    print(f"AUTH_ARGON2_TIME_COST={time_cost}")
+    print(f"AUTH_ARGON2_MEMORY_COST={memory_cost}")
+    print(f"AUTH_ARGON2_PARALLELISM={args.parallelism}")
+    print(f"AUTH_MAX_CONCURRENT_VERIFIES={concurrent_verifies}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+    Generates 500 presigned URLs with a client per call (the previous S3
+    behaviour) and with the long lived client opened by S3.open().
+
+    Runs against a local S3 stand-in, e.g.
+        moto_server -p 5000
+        python -m benchmarks.presigned_urls --endpoint-url http://localhost:5000
+"""
+import argparse
+import asyncio
+import time
+import aioboto3
+from src.service.files import S3, FileMetadata, AllowdeContentTypes
+from src.settings import AWSS3Settings
+from src.service.files import get_client_config
+
+
+COUNT = 500
+
+
+def build_metadata(count: int) -> list[FileMetadata]:
+    return [
+        FileMetadata(
+            filename=f"benchmarks/file-{i}.pdf",
+            content_type=AllowdeContentTypes.PDF,
+            size=1024
+        )
+        for i in range(count)
+    ]
+
+
+async def client_per_call(session: aioboto3.Session, bucket: str, endpoint_url: str, files: list[FileMetadata]) -> None:
+
+    async def sign(fm: FileMetadata) -> str:
+        async with session.client("s3", endpoint_url=endpoint_url) as s3:
+            return await s3.generate_presigned_url(
+                ClientMethod="put_object",
+                Params={"Bucket": bucket, "Key": fm.filename, "ContentType": fm.content_type},
+                ExpiresIn=3600
+            )
+
+    await asyncio.gather(*(sign(fm) for fm in files))
+
+
+async def main(endpoint_url: str, bucket: str) -> None:
+    session = aioboto3.Session(
+        aws_access_key_id="benchmark", aws_secret_access_key="benchmark", region_name="us-east-1"
+    )
+    files = build_metadata(COUNT)
+
+    started = time.perf_counter()
+    await client_per_call(session, bucket, endpoint_url, files)
+    per_call = time.perf_counter() - started
+
+    aws = AWSS3Settings(
+        access_key_id="benchmark", secret_access_key="benchmark",
+        region="us-east-1", s3_bucket=bucket, endpoint_url=endpoint_url
+    )
+    storage = S3(bucket=bucket, session=session, config=get_client_config(aws), endpoint_url=endpoint_url)
+    await storage.open()
+    try:
+        started = time.perf_counter()
+        await storage.generate_presigned_urls(files)
+        pooled = time.perf_counter() - started
+    finally:
+        await storage.close()
+
+    print(f"client per call : {per_call:.3f}s ({COUNT / per_call:,.0f} urls/s)")
+    print(f"long lived      : {pooled:.3f}s ({COUNT / pooled:,.0f} urls/s)")
+    print(f"speedup         : {per_call / pooled:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--endpoint-url", default="http://localhost:5000")
+    parser.add_argument("--bucket", default="benchmark")
+    args = parser.parse_args()
+    asyncio.run(main(args.endpoint_url, args.bucket))
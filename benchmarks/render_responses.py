@@ -0,0 +1,67 @@
+"""
+    Compares the default FastAPI response path (model_dump -> response_model
+    validation -> JSON dump) against the prebuilt orjson renderers used by
+    GET /courses/{id}, /modules/{id} and /users/{id}.
+
+    Run with: python -m benchmarks.render_responses
+"""
+import json
+import timeit
+from datetime import UTC, datetime
+from pydantic import TypeAdapter
+from src.commands.courses import Course
+from src.commands.modules import Module
+from src.commands.users import User
+from src.api.schemas.courses import CourseOutSchema, course_out_renderer
+from src.api.schemas.modules import ModuleOutSchema, module_out_renderer
+from src.api.schemas.users import UserOutSchema, user_out_renderer
+
+
+NUMBER = 20_000
+
+
+def build_samples() -> dict:
+    now = datetime.now(tz=UTC)
+    course = Course(
+        id=1, title="INTRODUCTION TO POSTGRES", slug="introduction-to-postgres",
+        short_description="s" * 60, long_description="l" * 120,
+        details={"type": "pre-recorded", "total_hours": 12.5, "price": 4999},
+        trainer_id=2, manager_id=3, created_by=1, created_at=now
+    )
+    module = Module(
+        id=7, title="INDEXES", description="All about btree and gin indexes.",
+        course_id=1, created_by=1, created_at=now
+    )
+    user = User(
+        id=3, username="manager", email="manager@example.com",
+        password="hashed", role="subadmin", created_by=1, created_at=now
+    )
+    return {
+        "course": (course, CourseOutSchema, course_out_renderer),
+        "module": (module, ModuleOutSchema, module_out_renderer),
+        "user": (user, UserOutSchema, user_out_renderer),
+    }
+
+
+def fastapi_path(obj, adapter: TypeAdapter) -> bytes:
+    validated = adapter.validate_python(obj.model_dump())
+    content = adapter.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def main() -> None:
+    for name, (obj, schema, renderer) in build_samples().items():
+        adapter = TypeAdapter(schema)
+        assert json.loads(fastapi_path(obj, adapter)) == json.loads(renderer.render(obj))
+
+        baseline = timeit.timeit(lambda: fastapi_path(obj, adapter), number=NUMBER)
+        fast = timeit.timeit(lambda: renderer.render(obj), number=NUMBER)
+        print(
+            f"{name:<8} response_model: {NUMBER / baseline:>10,.0f} ops/s   "
+            f"renderer: {NUMBER / fast:>10,.0f} ops/s   "
+            f"speedup: {baseline / fast:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
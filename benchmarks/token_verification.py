@@ -0,0 +1,42 @@
+"""
+    Compares a full JWT verification (signature, claims) on every request
+    against the claims cache of TokenService, for a pool of active tokens.
+
+    Run with: python -m benchmarks.token_verification
+"""
+import timeit
+import jwt
+from src.service.permission_policy import UserRole
+from src.service.tokens import TokenService
+
+
+NUMBER = 100_000
+ACTIVE_TOKENS = 1_000
+
+
+def main() -> None:
+    service = TokenService(signing_key=b"benchmark-secret" * 4, verifying_key=b"benchmark-secret" * 4)
+    tokens = [service.issue(user_id, UserRole.TRAINER).access_token for user_id in range(ACTIVE_TOKENS)]
+
+    def uncached() -> None:
+        for token in tokens:
+            jwt.decode(
+                token, b"benchmark-secret" * 4, algorithms=["HS256"],
+                audience=service.audience, issuer=service.issuer
+            )
+
+    def cached() -> None:
+        for token in tokens:
+            service.verify(token)
+
+    rounds = NUMBER // ACTIVE_TOKENS
+    uncached_seconds = timeit.timeit(uncached, number=rounds)
+    cached_seconds = timeit.timeit(cached, number=rounds)
+
+    print(f"jwt.decode      : {uncached_seconds / NUMBER * 1e6:.2f}us per request")
+    print(f"claims cache    : {cached_seconds / NUMBER * 1e6:.2f}us per request")
+    print(f"speedup         : {uncached_seconds / cached_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,28 @@
+import math
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 from src.api.routers.users import user_router
+from src.api.routers.auth import router as auth_router
 from src.api.routers.courses import router as course_router
 from src.api.routers.modules import router as module_router
+from src.api.routers.resources import router as resource_router
+from src.api.routers.storage import router as storage_router
 from src.database import async_db_manager
-from src.exceptions import DomainError
+from src.invalidation import invalidation_bus
+from src.api.dependencies import storage_service, storage_cleanup_worker, thumbnail_generator, revocation_list
+from src.exceptions import DomainError, ThrottledError
 from src.api.exception_registry import exception_registry
+from src.loop_monitor import LoopLagMonitor
+from src.metrics import metrics
+from src.settings import settings
+
+
+loop_monitor = LoopLagMonitor(
+    interval=settings.monitoring.loop_lag_interval,
+    slow_callback_threshold=settings.monitoring.slow_callback_threshold,
+    debug=settings.monitoring.debug
+)
 
 
 @asynccontextmanager
@@ -15,7 +31,19 @@ async def lifespan(app: FastAPI):
         Lifespan event to initialize and close the database pool.
     """
     await async_db_manager.init_pool()
+    await invalidation_bus.start()
+    await revocation_list.start()
+    await storage_service.open()
+    await storage_cleanup_worker.start()
+    await thumbnail_generator.start()
+    await loop_monitor.start()
     yield 
+    await loop_monitor.stop()
+    await thumbnail_generator.stop()
+    await storage_cleanup_worker.stop()
+    await storage_service.close()
+    await revocation_list.stop()
+    await invalidation_bus.stop()
     await async_db_manager.close_pool()
 
 
@@ -32,9 +60,32 @@ async def health_check() -> dict:
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics() -> str:
+    return metrics.render()
+
+
+@app.get("/metrics/blocking-calls", include_in_schema=False)
+async def get_blocking_calls() -> list[dict]:
+    "Recent stacks captured while the event loop was blocked (debug mode only)."
+    return [
+        {
+            "blocked_for": report.blocked_for,
+            "captured_at": report.captured_at,
+            "stack": report.stack
+        }
+        for report in loop_monitor.reports
+    ]
+
+
+app.include_router(auth_router, prefix=api_version)
 app.include_router(user_router, prefix=api_version)
 app.include_router(course_router, prefix=api_version)
 app.include_router(module_router, prefix=api_version)
+app.include_router(resource_router, prefix=api_version)
+
+if settings.storage.backend == "local":
+    app.include_router(storage_router, prefix=api_version)
 
 
 @app.exception_handler(DomainError)
@@ -48,9 +99,16 @@ async def custom_exception_handler(
         if isinstance(exc, domain_exc_class):
             status_code = code 
             break
+    
+    headers = {}
+    if status_code == 401:
+        headers["WWW-Authenticate"] = "Bearer"
+    if isinstance(exc, ThrottledError):
+        headers["Retry-After"] = str(max(1, math.ceil(exc.retry_after)))
         
     return JSONResponse(
         status_code=status_code,
+        headers=headers or None,
         content={
             "message": exc.message,
             "type": exc.__class__.__name__,
@@ -0,0 +1,17 @@
+-- Durable queue of object storage keys waiting to be deleted.
+-- depends:
+
+-- migrate: apply
+create table if not exists storage_deletion_queue (
+    object_key text primary key,
+    attempts integer not null default 0,
+    last_error text,
+    next_attempt_at timestamptz not null default now(),
+    created_at timestamptz not null default now()
+);
+
+create index if not exists storage_deletion_queue_next_attempt_at_idx
+    on storage_deletion_queue (next_attempt_at);
+
+-- migrate: rollback
+drop table if exists storage_deletion_queue;
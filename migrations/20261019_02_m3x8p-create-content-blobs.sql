@@ -0,0 +1,16 @@
+-- Content addressed blobs, one stored object per sha256 digest.
+-- depends: 20261019_01_q7k2d-create-storage-deletion-queue
+
+-- migrate: apply
+create table if not exists content_blobs (
+    digest text primary key,
+    object_key text not null unique,
+    size bigint not null,
+    content_type text,
+    ref_count integer not null default 0 check (ref_count >= 0),
+    created_at timestamptz not null default now(),
+    updated_at timestamptz
+);
+
+-- migrate: rollback
+drop table if exists content_blobs;
@@ -0,0 +1,8 @@
+-- Resized thumbnail variants of a course, keyed by width.
+-- depends: 20261019_02_m3x8p-create-content-blobs
+
+-- migrate: apply
+alter table courses add column if not exists thumbnail_variants jsonb;
+
+-- migrate: rollback
+alter table courses drop column if exists thumbnail_variants;
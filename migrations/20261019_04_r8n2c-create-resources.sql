@@ -0,0 +1,24 @@
+-- Files attached to a module, uploaded by the clients with presigned URLs.
+-- depends: 20261019_03_t5v9w-add-course-thumbnail-variants
+
+-- migrate: apply
+create table if not exists resources (
+    id integer generated always as identity primary key,
+    module_id integer not null references modules(id),
+    filename text not null,
+    content_type text not null,
+    size bigint not null check (size > 0),
+    object_key text not null unique,
+    status text not null default 'pending' check (status in ('pending', 'ready')),
+    created_at timestamptz not null default now(),
+    created_by integer references users(id),
+    updated_at timestamptz,
+    updated_by integer references users(id),
+    deleted_at timestamptz,
+    deleted_by integer references users(id)
+);
+
+create index if not exists resources_module_id_idx on resources(module_id) where deleted_at is null;
+
+-- migrate: rollback
+drop table if exists resources;
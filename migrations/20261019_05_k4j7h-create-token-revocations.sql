@@ -0,0 +1,19 @@
+-- Revoked access tokens (by jti) and per user epochs (every token issued before not_before).
+-- depends: 20261019_04_r8n2c-create-resources
+
+-- migrate: apply
+create table if not exists token_revocations (
+    id bigint generated always as identity primary key,
+    token_id text,
+    user_id integer,
+    not_before timestamptz,
+    -- After this, every token covered by the row has expired anyway.
+    expires_at timestamptz not null,
+    created_at timestamptz not null default now(),
+    check ((token_id is not null) <> (user_id is not null and not_before is not null))
+);
+
+create index if not exists token_revocations_expires_at_idx on token_revocations(expires_at);
+
+-- migrate: rollback
+drop table if exists token_revocations;
@@ -0,0 +1,13 @@
+-- Login token buckets shared by the workers (AUTH_LOGIN_THROTTLE_BACKEND=postgres).
+-- Unlogged, the buckets refill by themselves and don't need to survive a crash.
+-- depends: 20261019_05_k4j7h-create-token-revocations
+
+-- migrate: apply
+create unlogged table if not exists login_throttle (
+    key text primary key,
+    tokens float8 not null,
+    updated_at timestamptz not null default now()
+);
+
+-- migrate: rollback
+drop table if exists login_throttle;
@@ -0,0 +1,37 @@
+-- Unique keys among the live rows, the targets of insert ... on conflict do nothing.
+-- Soft deleted rows keep their values, so a title or an email can be reused after a delete.
+-- The old existence checks were racy, live duplicates may exist: the migration stops and
+-- lists them instead of failing on the index. Rename or soft delete them, then run it again.
+-- depends: 20261019_06_w2p6f-create-login-throttle
+
+-- migrate: apply
+do $$
+declare
+    duplicates text;
+begin
+    select string_agg(dup, '; ') into duplicates
+    from (
+        select format('users.email %L x%s', email, count(*)) as dup
+        from users where deleted_at is null group by email having count(*) > 1
+        union all
+        select format('courses.title %L x%s', title, count(*))
+        from courses where deleted_at is null group by title having count(*) > 1
+        union all
+        select format('modules (course_id, title) (%s, %L) x%s', course_id, title, count(*))
+        from modules where deleted_at is null group by course_id, title having count(*) > 1
+    ) as d;
+
+    if duplicates is not null then
+        raise exception 'Live duplicates block the unique indexes: %', duplicates;
+    end if;
+end
+$$;
+
+create unique index if not exists users_email_live_key on users (email) where deleted_at is null;
+create unique index if not exists courses_title_live_key on courses (title) where deleted_at is null;
+create unique index if not exists modules_course_id_title_live_key on modules (course_id, title) where deleted_at is null;
+
+-- migrate: rollback
+drop index if exists modules_course_id_title_live_key;
+drop index if exists courses_title_live_key;
+drop index if exists users_email_live_key;
@@ -0,0 +1,18 @@
+-- Resources backed by the content addressed blobs: `sha256` is declared by the client,
+-- `content_digest` is set once the stored bytes were verified and reference a content_blobs row.
+-- Several resources then share the blob object, the object key is only unique for own uploads.
+-- depends: 20261019_07_h6d3n-add-partial-unique-indexes
+
+-- migrate: apply
+alter table resources add column if not exists sha256 text;
+alter table resources add column if not exists content_digest text;
+alter table resources drop constraint if exists resources_object_key_key;
+create unique index if not exists resources_own_object_key_key on resources (object_key) where content_digest is null;
+create index if not exists resources_content_digest_idx on resources (content_digest) where deleted_at is null;
+
+-- migrate: rollback
+drop index if exists resources_content_digest_idx;
+drop index if exists resources_own_object_key_key;
+alter table resources drop column if exists content_digest;
+alter table resources drop column if exists sha256;
+alter table resources add constraint resources_object_key_key unique (object_key);
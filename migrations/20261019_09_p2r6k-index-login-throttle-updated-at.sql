@@ -0,0 +1,8 @@
+-- The idle buckets are pruned by age (PostgresRateLimiter.prune).
+-- depends: 20261019_08_c9f4b-add-resource-content-digest
+
+-- migrate: apply
+create index if not exists login_throttle_updated_at_idx on login_throttle (updated_at);
+
+-- migrate: rollback
+drop index if exists login_throttle_updated_at_idx;
@@ -1,5 +1,7 @@
-from typing import Annotated
-from fastapi import Depends
+import ipaddress
+from typing import Annotated, Optional
+from fastapi import Depends, Request
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
 # Base Dependency
 from src.database import async_db_manager
@@ -9,6 +11,10 @@ from src.commands.base import UserID
 from src.service.users import UserService, PasswordHandler
 from src.repository.users import UserRespository
 from src.service.permission_policy import PermissionPolicy
+from src.service.tokens import Principal, TokenService, current_principal
+from src.service.revocation import RevocationList
+from src.service.throttling import LoginThrottle
+from src.exceptions import UnAuthenticated
 
 # Course Dependency.
 from src.repository.courses import CourseRepository
@@ -19,6 +25,19 @@ from src.service.course import CourseService
 from src.repository.modules import ModuleRepository
 from src.service.modules import ModuleService
 
+# Resource Dependency.
+from src.repository.resources import ResourceRepository
+from src.service.resources import ResourceService
+# Object Storage Dependency.
+from src.settings import settings
+from src.service.files import BaseObjectStorageService, S3, get_session, get_client_config
+from src.service.signing import SigV4Signer
+from src.service.local_storage import LocalFileStorage
+from src.service.storage_cleanup import StorageCleanupWorker
+from src.service.content_store import ContentStore
+from src.service.thumbnails import ThumbnailGenerator
+from src.api.streaming import ObjectStreamer
+
 # DB Connection
 db = async_db_manager
 
@@ -26,11 +45,58 @@ db = async_db_manager
 user_repository = UserRespository(db=db)
 course_reposiory = CourseRepository(db=db)
 module_repository = ModuleRepository(db=db)
+resource_repository = ResourceRepository(db=db)
 
 
 # Helper classes
 permission_policy = PermissionPolicy()
 password_handler = PasswordHandler()
+login_throttle = LoginThrottle.from_settings(settings.auth)
+revocation_list = RevocationList()
+token_service = TokenService.from_settings(settings.auth, revocations=revocation_list)
+
+def build_storage_service() -> BaseObjectStorageService:
+    "Builds the storage backend selected in the settings."
+    
+    if settings.storage.backend == "local":
+        return LocalFileStorage(
+            root=settings.storage.local_root,
+            signing_secret=settings.storage.signing_secret.get_secret_value().encode(),
+            base_url=settings.storage.public_url
+        )
+    
+    return S3(
+        bucket=settings.aws.s3_bucket.get_secret_value(),
+        session=get_session(),
+        config=get_client_config(settings.aws),
+        endpoint_url=settings.aws.endpoint_url,
+        signer=SigV4Signer(
+            access_key_id=settings.aws.access_key_id.get_secret_value(),
+            secret_access_key=settings.aws.secret_access_key.get_secret_value(),
+            region=settings.aws.region.get_secret_value(),
+            bucket=settings.aws.s3_bucket.get_secret_value(),
+            endpoint_url=settings.aws.endpoint_url
+        ),
+        url_cache_size=settings.aws.presigned_url_cache_size,
+        part_size=settings.aws.multipart_part_size,
+        max_concurrency=settings.aws.multipart_concurrency
+    )
+
+
+# Object storage, the client (if any) is opened once in the app lifespan.
+storage_service: BaseObjectStorageService = build_storage_service()
+storage_cleanup_worker = StorageCleanupWorker(
+    storage=storage_service,
+    pending_ttl=settings.storage.pending_upload_ttl
+)
+content_store = ContentStore(storage=storage_service)
+object_streamer = ObjectStreamer(storage=storage_service)
+thumbnail_generator = ThumbnailGenerator(
+    storage=storage_service,
+    repo=course_reposiory,
+    widths=settings.storage.thumbnail_widths,
+    max_workers=settings.storage.thumbnail_workers
+)
 
 
 
@@ -43,7 +109,8 @@ def get_user_service() -> UserService:
         user_repo=user_repository,
         permission_policy=permission_policy,
         password_handler=password_handler,
-        repo=user_repository
+        repo=user_repository,
+        login_throttle=login_throttle
     )
   
 
@@ -51,7 +118,9 @@ def get_course_service() -> CourseService:
     return CourseService(
         user_repo=user_repository,
         permission_policy=permission_policy,
-        repo=course_reposiory
+        repo=course_reposiory,
+        thumbnail_generator=thumbnail_generator,
+        storage=storage_service
     )  
     
 
@@ -62,17 +131,105 @@ def get_module_service() -> ModuleService:
         repo=module_repository
     )
 
+def get_resource_service() -> ResourceService:
+    return ResourceService(
+        storage=storage_service,
+        user_repo=user_repository,
+        permission_policy=permission_policy,
+        repo=resource_repository,
+        content_store=content_store
+    )
+
+
+def get_storage_service() -> BaseObjectStorageService:
+    return storage_service
+
+
+def get_object_streamer() -> ObjectStreamer:
+    return object_streamer
+
+
 UserServiceDependency = Annotated[UserService, Depends(get_user_service)]  
 CourseServiceDependency = Annotated[CourseService, Depends(get_course_service)]
 ModuleServiceDependency = Annotated[ModuleService, Depends(get_module_service)]
+ResourceServiceDependency = Annotated[ResourceService, Depends(get_resource_service)]
+StorageServiceDependency = Annotated[BaseObjectStorageService, Depends(get_storage_service)]
+ObjectStreamerDependency = Annotated[ObjectStreamer, Depends(get_object_streamer)]
+
+
+
+def get_token_service() -> TokenService:
+    return token_service
+
 
+def get_revocation_list() -> RevocationList:
+    return revocation_list
 
 
-def sample_get_current_user() -> UserID:
-    "This is sample need to implement using JWT"
-    return "U-1"
+TokenServiceDependency = Annotated[TokenService, Depends(get_token_service)]
+RevocationListDependency = Annotated[RevocationList, Depends(get_revocation_list)]
 
 
-CurrentUser = Annotated[UserID, Depends(sample_get_current_user)]
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+async def get_current_principal(
+    credentials: Annotated[Optional[HTTPAuthorizationCredentials], Depends(bearer_scheme)]
+) -> Principal:
+    """
+        Verifies the bearer token of the request. Kept async, so the
+        principal is set in the request context and seen by `require_access`.
+    """
+    if credentials is None:
+        raise UnAuthenticated()
+    
+    principal = token_service.verify(credentials.credentials)
+    current_principal.set(principal)
+    return principal
+
+
+async def get_current_user(
+    principal: Annotated[Principal, Depends(get_current_principal)]
+) -> UserID:
+    return principal.user_id
+
+
+CurrentPrincipal = Annotated[Principal, Depends(get_current_principal)]
+CurrentUser = Annotated[UserID, Depends(get_current_user)]
+
+
+
+trusted_proxies = [ipaddress.ip_network(proxy, strict=False) for proxy in settings.auth.trusted_proxies]
+
+
+def _is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address.strip())
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted_proxies)
+
+
+def get_client_ip(request: Request) -> Optional[str]:
+    """
+        Address of the client for the per IP throttling. Behind a reverse
+        proxy the peer is the proxy itself: X-Forwarded-For is read from the
+        right, skipping the trusted proxies, the first other hop is the
+        client (the entries on its left can be forged by the client).
+    """
+    if request.client is None:
+        return None
+    
+    address = request.client.host
+    if not _is_trusted_proxy(address):
+        return address
+    
+    forwarded = request.headers.get("x-forwarded-for", "")
+    for hop in reversed([hop.strip() for hop in forwarded.split(",") if hop.strip()]):
+        address = hop
+        if not _is_trusted_proxy(hop):
+            break
+    return address
 
 
+ClientIP = Annotated[Optional[str], Depends(get_client_ip)]
@@ -0,0 +1,42 @@
+import hashlib
+from datetime import datetime
+from typing import Any, Optional
+from fastapi import Response, status
+
+
+
+def entity_etag(
+    entity_id: Any,
+    version: Optional[datetime],
+    namespace: str = "entity"
+) -> str:
+    """
+        Builds a strong ETag from the entity id and its version
+        (updated_at, falling back to created_at).
+    """
+    raw = f"{namespace}:{entity_id}:{version.isoformat() if version else ''}"
+    return '"' + hashlib.blake2b(raw.encode(), digest_size=12).hexdigest() + '"'
+
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+        Checks the If-None-Match header against the current ETag.
+        As per RFC 9110 uses weak comparison and supports '*' and lists.
+    """
+    if not if_none_match:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag}
+    )
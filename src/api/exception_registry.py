@@ -7,6 +7,7 @@ exception_registry: dict[Type[exc.DomainError], int]  = {
         exc.AlreadyExistsError: 409,
         exc.UnAuthenticated: 401,
         exc.UnauthorizedError: 403,
+        exc.ThrottledError: 429,
         exc.SecurityError: 401,
         exc.ValidationError: 400
     }
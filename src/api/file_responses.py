@@ -0,0 +1,64 @@
+import os
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+from src.api.ranges import RangeNotSatisfiable, content_range, if_range_matches, parse_range_header
+
+
+
+class SendfileResponse(FileResponse):
+    """
+        FileResponse that hands the file descriptor to the server with the
+        ASGI `http.response.zerocopysend` extension (sendfile), including 
+        single range requests. Servers without the extension, and multi range
+        requests, fall back to the regular chunked FileResponse.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if "http.response.zerocopysend" not in scope.get("extensions", {}):
+            return await super().__call__(scope, receive, send)
+
+        stat_result = await anyio.to_thread.run_sync(os.stat, self.path)
+        self.set_stat_headers(stat_result)
+        size = stat_result.st_size
+        request_headers = Headers(scope=scope)
+
+        start, end, status_code = 0, size - 1, self.status_code
+        range_header = request_headers.get("range")
+
+        if range_header and if_range_matches(
+            request_headers.get("if-range"), self.headers.get("etag"), self.headers.get("last-modified")
+        ):
+            try:
+                ranges = parse_range_header(range_header, size)
+            except RangeNotSatisfiable:
+                ranges = [] # Let FileResponse send the 416.
+
+            if ranges is not None and len(ranges) != 1:
+                return await super().__call__(scope, receive, send)
+            if ranges:
+                start, end = ranges[0]
+                status_code = 206
+                self.headers["content-range"] = content_range(start, end, size)
+
+        count = max(end - start + 1, 0)
+        self.headers["content-length"] = str(count)
+        self.headers["accept-ranges"] = "bytes"
+
+        await send({"type": "http.response.start", "status": status_code, "headers": self.raw_headers})
+
+        if scope["method"].upper() == "HEAD" or count == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        else:
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file,
+                    "offset": start,
+                    "count": count,
+                    "more_body": False
+                })
+
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,68 @@
+from typing import Optional
+
+
+
+class RangeNotSatisfiable(ValueError):
+    "The Range header does not overlap the representation."
+
+
+
+def parse_range_header(header: Optional[str], size: int) -> Optional[list[tuple[int, int]]]:
+    """
+        Parses a `Range: bytes=...` header into inclusive (start, end) pairs.
+        Returns None when the header is absent or not a bytes range, in which
+        case the whole representation is sent (as per RFC 9110).
+    """
+    if not header:
+        return None
+
+    unit, _, specs = header.partition("=")
+    if unit.strip().lower() != "bytes" or not specs:
+        return None
+
+    ranges: list[tuple[int, int]] = []
+    for spec in specs.split(","):
+        first, sep, last = spec.strip().partition("-")
+        if not sep:
+            return None
+        try:
+            if first == "": # Suffix range, the last N bytes.
+                length = int(last)
+                if length <= 0:
+                    continue
+                start, end = max(size - length, 0), size - 1
+            else:
+                start = int(first)
+                end = min(int(last), size - 1) if last else size - 1
+        except ValueError:
+            return None
+
+        if start > end or start >= size:
+            continue
+        ranges.append((start, end))
+
+    if not ranges:
+        raise RangeNotSatisfiable(header)
+    return ranges
+
+
+
+def content_range(start: int, end: int, size: int) -> str:
+    return f"bytes {start}-{end}/{size}"
+
+
+
+def if_range_matches(
+    if_range: Optional[str],
+    etag: Optional[str],
+    last_modified: Optional[str]
+) -> bool:
+    """
+        A Range is only honoured when If-Range (if sent) still matches the
+        representation, otherwise the full content must be sent.
+    """
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return etag is not None and not if_range.startswith("W/") and if_range == etag
+    return last_modified is not None and if_range == last_modified
@@ -0,0 +1,99 @@
+from functools import partial
+from typing import Any, Callable, Mapping, Optional, Type
+import orjson
+from fastapi import Response
+from pydantic import BaseModel, PlainSerializer
+from pydantic.fields import FieldInfo
+from src.commands.base import EntityBase
+
+
+
+class ORJSONResponse(Response):
+    "JSON response rendered with orjson. Accepts pre-rendered bytes as is."
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return orjson.dumps(content, default=_default)
+
+
+
+def _default(value: Any) -> Any:
+    "Fallback for the types orjson does not know (nested pydantic models)."
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Type {type(value).__name__} is not JSON serializable")
+
+
+
+def _prefixed_id(prefix: str) -> Callable[[Any], Any]:
+    """
+        Fast equivalent of `to_external_id`, without building an
+        EntityBase model per value. e.g., 1 becomes U-1
+    """
+    def convert(value: Any) -> Any:
+        if value is None or (isinstance(value, str) and "-" in value):
+            return value
+        return f"{prefix}-{value}"
+    return convert
+
+
+
+def _field_converter(field: FieldInfo) -> Optional[Callable[[Any], Any]]:
+    "Returns the converter of the prefixed ID fields, None for the rest."
+    for meta in field.metadata:
+        if not isinstance(meta, PlainSerializer) or not isinstance(meta.func, partial):
+            continue
+        cls = meta.func.keywords.get("cls")
+        if isinstance(cls, type) and issubclass(cls, EntityBase):
+            return _prefixed_id(cls.PREFIX)
+    return None
+
+
+
+class ResponseRenderer:
+    """
+        Serializes domain objects (or asyncpg Records) straight to JSON bytes
+        using the fields of an output schema. The field list and the ID
+        converters are built once, so rendering skips the response_model
+        re-validation and the jsonable_encoder pass done by FastAPI.
+    """
+
+    def __init__(self, schema: Type[BaseModel]) -> None:
+        self.schema = schema
+        self._fields: tuple[tuple[str, str, Optional[Callable[[Any], Any]]], ...] = tuple(
+            (name, field.serialization_alias or name, _field_converter(field))
+            for name, field in schema.model_fields.items()
+        )
+
+
+    def to_dict(self, obj: Any) -> dict[str, Any]:
+        if isinstance(obj, Mapping) or hasattr(obj, "keys") and not isinstance(obj, BaseModel):
+            getter = obj.__getitem__ # dict or asyncpg Record.
+        else:
+            getter = partial(getattr, obj)
+
+        data = {}
+        for name, alias, convert in self._fields:
+            value = getter(name)
+            data[alias] = convert(value) if convert is not None else value
+        return data
+
+
+    def render(self, obj: Any) -> bytes:
+        return orjson.dumps(self.to_dict(obj), default=_default)
+
+
+    def response(
+        self,
+        obj: Any,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None
+    ) -> ORJSONResponse:
+        return ORJSONResponse(
+            content=self.render(obj),
+            status_code=status_code,
+            headers=headers
+        )
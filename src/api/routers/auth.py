@@ -0,0 +1,30 @@
+from fastapi import APIRouter, status
+from src.api.dependencies import ClientIP, CurrentPrincipal, RevocationListDependency, TokenServiceDependency, UserServiceDependency
+from src.api.schemas.auth import LoginSchema, TokenOutSchema
+from src.commands.users import UserAuth
+
+
+router = APIRouter(prefix="/auth", tags=["Auth"])
+
+
+@router.post("/login", response_model=TokenOutSchema)
+async def login(
+    credentials: LoginSchema,
+    client_ip: ClientIP,
+    user_service: UserServiceDependency,
+    token_service: TokenServiceDependency
+):
+    user = await user_service.authenticate(
+        UserAuth(**credentials.model_dump()),
+        client_ip=client_ip
+    )
+    token = token_service.issue(user.id, user.role)
+    return TokenOutSchema(access_token=token.access_token, expires_in=token.expires_in)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    principal: CurrentPrincipal,
+    revocation_list: RevocationListDependency
+):
+    await revocation_list.revoke_token(principal)
@@ -1,8 +1,15 @@
-from fastapi import APIRouter, status
-from src.api.dependencies import CurrentUser, CourseServiceDependency
-from src.commands.base import CourseID
-from src.commands.courses import CourseDelete, CourseGetByIDQuery, CourseCreate, CourseInfoUpdate, RecordedCourseDetailsUpdate
-from src.api.schemas.courses import CourseOutSchema, CourseCreateSchema, CourseInfoUpdateSchema, RecordedCourseDetailsUpdateSchema
+from typing import Annotated, Optional
+from fastapi import APIRouter, Header, Query, Request, status
+from src.api.dependencies import CurrentUser, CourseServiceDependency, ModuleServiceDependency, ObjectStreamerDependency
+from src.api.etag import entity_etag, etag_matches, not_modified
+from src.api.rendering import ORJSONResponse
+from src.commands.base import CourseBase, CourseID
+from src.commands.courses import CourseDelete, CourseGetByIDQuery, CourseCreate, CourseInfoUpdate, CourseThumbnailUpload, RecordedCourseDetailsUpdate
+from src.api.schemas.courses import (
+    CourseOutSchema, CourseCreateSchema, CourseInfoUpdateSchema, RecordedCourseDetailsUpdateSchema, CourseOutlineSchema,
+    CourseThumbnailUploadSchema, CourseThumbnailUploadOutSchema, course_out_renderer
+)
+from src.api.schemas.modules import module_out_renderer
 
 
 
@@ -13,16 +20,85 @@ router = APIRouter(prefix="/courses", tags=["Courses"])
 async def get_course(
     course_id: CourseID,
     course_service: CourseServiceDependency,
-    current_user: CurrentUser
+    current_user: CurrentUser,
+    if_none_match: Annotated[Optional[str], Header()] = None
+):
+    
+    query = CourseGetByIDQuery(id=course_id, viewer_id=current_user)
+    
+    # Conditional request, answer from the version only.
+    if if_none_match:
+        etag = entity_etag(course_id, await course_service.get_version(query))
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+    
+    course = await course_service.get(query)
+    return course_out_renderer.response(
+        course, headers={"ETag": entity_etag(course.id, course.updated_at or course.created_at)}
+    )
+
+
+@router.get("/{course_id}/outline", response_model=CourseOutlineSchema)
+async def get_course_outline(
+    course_id: CourseID,
+    module_service: ModuleServiceDependency,
+    current_user: CurrentUser,
+    if_none_match: Annotated[Optional[str], Header()] = None
 ):
     
-    return await course_service.get(
-        CourseGetByIDQuery(
+    query = CourseGetByIDQuery(id=course_id, viewer_id=current_user)
+    
+    if if_none_match:
+        etag = entity_etag(course_id, await module_service.get_outline_version(query), namespace="outline")
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+    
+    version, modules = await module_service.get_outline(query)
+    return ORJSONResponse(
+        content={
+            "course_id": f"{CourseBase.PREFIX}-{course_id}",
+            "modules": [module_out_renderer.to_dict(module) for module in modules]
+        },
+        headers={"ETag": entity_etag(course_id, version, namespace="outline")}
+    )
+    
+
+@router.get("/{course_id}/thumbnail")
+async def download_course_thumbnail(
+    course_id: CourseID,
+    request: Request,
+    course_service: CourseServiceDependency,
+    object_streamer: ObjectStreamerDependency,
+    current_user: CurrentUser,
+    width: Annotated[Optional[int], Query(gt=0, le=4096)] = None
+):
+    # Permission is checked once, the bytes are then streamed without any further lookup.
+    thumbnail_key = await course_service.get_thumbnail_key(
+        CourseGetByIDQuery(id=course_id, viewer_id=current_user), width=width
+    )
+    return await object_streamer.response(thumbnail_key, request.headers)
+
+
+@router.post("/{course_id}/thumbnail/uploads", response_model=CourseThumbnailUploadOutSchema)
+async def request_thumbnail_upload(
+    course_id: CourseID,
+    upload: CourseThumbnailUploadSchema,
+    course_service: CourseServiceDependency,
+    current_user: CurrentUser
+):
+    issued = await course_service.request_thumbnail_upload(
+        CourseThumbnailUpload(
+            **upload.model_dump(),
             id=course_id,
-            viewer_id=current_user
+            updated_by=current_user
         )
     )
-    
+    return CourseThumbnailUploadOutSchema(
+        thumbnail=issued.thumbnail,
+        upload_url=issued.upload_url,
+        expires_in=course_service.upload_expire_mins * 60
+    )
+
 
 @router.post("/", response_model=CourseOutSchema, status_code=status.HTTP_201_CREATED)
 async def create_course(
@@ -30,12 +106,13 @@ async def create_course(
     course_service: CourseServiceDependency,
     current_user: CurrentUser
 ):
-    return await course_service.create(
+    created_course = await course_service.create(
         CourseCreate(
             **course.model_dump(),
             created_by=current_user
         )
     )
+    return course_out_renderer.response(created_course, status_code=status.HTTP_201_CREATED)
 
 
 
@@ -1,8 +1,16 @@
-from fastapi import APIRouter, status
-from src.commands.base import ModuleID
+from typing import Annotated, Optional
+from fastapi import APIRouter, Header, status
+from src.api.etag import entity_etag, etag_matches, not_modified
+from src.commands.base import ModuleID, ResourceBase
 from src.commands.modules import ModuleCreate, ModuleUpdate, ModuleDelete, ModuleGetQuery, ReArrangeModule
-from src.api.schemas.modules import ModuleOutSchema, ModuleCreateSchema, ModuleUpdateSchema, ReArrangeModuleSchema
-from src.api.dependencies import CurrentUser, ModuleServiceDependency
+from src.api.schemas.modules import ModuleOutSchema, ModuleCreateSchema, ModuleUpdateSchema, ReArrangeModuleSchema, module_out_renderer
+from src.api.schemas.resources import (
+    ResourceUploadBatchSchema, ResourceUploadBatchOutSchema, ResourceUploadCompleteSchema,
+    ResourceUploadCompletionOutSchema, resource_out_renderer
+)
+from src.api.rendering import ORJSONResponse
+from src.commands.resources import ResourceUploadBatch, ResourceUploadComplete
+from src.api.dependencies import CurrentUser, ModuleServiceDependency, ResourceServiceDependency
 
 
 router = APIRouter(prefix="/modules", tags=["Modules"])
@@ -12,14 +20,21 @@ router = APIRouter(prefix="/modules", tags=["Modules"])
 async def get_module(
     module_id: ModuleID,
     module_service: ModuleServiceDependency,
-    current_user: CurrentUser
+    current_user: CurrentUser,
+    if_none_match: Annotated[Optional[str], Header()] = None
 ):
     
-    return await module_service.get(
-        ModuleGetQuery(
-            id=module_id,
-            viewer_id=current_user
-        )
+    query = ModuleGetQuery(id=module_id, viewer_id=current_user)
+    
+    # Conditional request, answer from the version only.
+    if if_none_match:
+        etag = entity_etag(module_id, await module_service.get_version(query))
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+    
+    module = await module_service.get(query)
+    return module_out_renderer.response(
+        module, headers={"ETag": entity_etag(module.id, module.updated_at or module.created_at)}
     )
 
 
@@ -29,12 +44,13 @@ async def create_module(
     module_service: ModuleServiceDependency,
     current_user: CurrentUser
 ):
-    return await module_service.create(
+    created_module = await module_service.create(
         ModuleCreate(
             **module.model_dump(),
             created_by=current_user
         )
-    )    
+    )
+    return module_out_renderer.response(created_module, status_code=status.HTTP_201_CREATED)
     
     
 @router.patch("/{module_id}", response_model=ModuleUpdateSchema)
@@ -82,9 +98,58 @@ async def update_module_position(
             updated_by=current_user
         )
     )
-    
-
 
 
+@router.post(
+    "/{module_id}/resources/uploads", 
+    response_model=ResourceUploadBatchOutSchema, 
+    status_code=status.HTTP_201_CREATED
+)
+async def request_resource_uploads(
+    module_id: ModuleID,
+    batch: ResourceUploadBatchSchema,
+    resource_service: ResourceServiceDependency,
+    current_user: CurrentUser
+):
+    uploads = await resource_service.create(
+        ResourceUploadBatch(
+            **batch.model_dump(),
+            module_id=module_id,
+            created_by=current_user
+        )
+    )
+    return ORJSONResponse(
+        content={
+            "uploads": [
+                {
+                    "resource": resource_out_renderer.to_dict(upload.resource),
+                    "upload_url": upload.upload_url
+                }
+                for upload in uploads
+            ],
+            "expires_in": resource_service.upload_expire_mins * 60
+        },
+        status_code=status.HTTP_201_CREATED
+    )
 
 
+@router.post("/{module_id}/resources/uploads/complete", response_model=ResourceUploadCompletionOutSchema)
+async def complete_resource_uploads(
+    module_id: ModuleID,
+    completion: ResourceUploadCompleteSchema,
+    resource_service: ResourceServiceDependency,
+    current_user: CurrentUser
+):
+    result = await resource_service.complete_uploads(
+        ResourceUploadComplete(
+            **completion.model_dump(),
+            module_id=module_id,
+            updated_by=current_user
+        )
+    )
+    return ORJSONResponse(
+        content={
+            "ready": [resource_out_renderer.to_dict(resource) for resource in result.ready],
+            "failed": [f"{ResourceBase.PREFIX}-{resource_id}" for resource_id in result.failed]
+        }
+    )
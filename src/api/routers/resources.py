@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Request, status
+from src.api.dependencies import CurrentUser, ObjectStreamerDependency, ResourceServiceDependency
+from src.api.schemas.resources import ResourceOutSchema, ResourceUpdateSchema, resource_out_renderer
+from src.commands.base import ResourceID
+from src.commands.resources import ResourceDelete, ResourceGetQuery, ResourceUpdate
+
+
+router = APIRouter(prefix="/resources", tags=["Resources"])
+
+
+@router.get("/{resource_id}", response_model=ResourceOutSchema)
+async def get_resource(
+    resource_id: ResourceID,
+    resource_service: ResourceServiceDependency,
+    current_user: CurrentUser
+):
+    resource = await resource_service.get(ResourceGetQuery(id=resource_id, viewer_id=current_user))
+    return resource_out_renderer.response(resource)
+
+
+@router.get("/{resource_id}/download")
+async def download_resource(
+    resource_id: ResourceID,
+    request: Request,
+    resource_service: ResourceServiceDependency,
+    object_streamer: ObjectStreamerDependency,
+    current_user: CurrentUser
+):
+    # Permission is checked once, the bytes are then streamed without any further lookup.
+    object_key = await resource_service.get_download_key(
+        ResourceGetQuery(id=resource_id, viewer_id=current_user)
+    )
+    return await object_streamer.response(object_key, request.headers)
+
+
+@router.patch("/{resource_id}", response_model=ResourceOutSchema)
+async def update_resource(
+    resource_id: ResourceID,
+    resource: ResourceUpdateSchema,
+    resource_service: ResourceServiceDependency,
+    current_user: CurrentUser
+):
+    updated_resource = await resource_service.update(
+        ResourceUpdate(
+            id=resource_id,
+            updated_by=current_user,
+            **resource.model_dump()
+        )
+    )
+    return resource_out_renderer.response(updated_resource)
+
+
+@router.delete("/{resource_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_resource(
+    resource_id: ResourceID,
+    resource_service: ResourceServiceDependency,
+    current_user: CurrentUser
+):
+    await resource_service.delete(
+        ResourceDelete(
+            id=resource_id,
+            deleted_by=current_user
+        )
+    )
@@ -0,0 +1,60 @@
+import mimetypes
+from typing import Annotated
+from fastapi import APIRouter, Depends, Query, Request, status
+from src.api.dependencies import StorageServiceDependency
+from src.api.file_responses import SendfileResponse
+from src.exceptions import ResourceNotFoundError, UnauthorizedError
+from src.service.local_storage import LocalFileStorage
+
+
+router = APIRouter(prefix="/storage", tags=["Storage"])
+
+
+
+def get_local_storage(storage: StorageServiceDependency) -> LocalFileStorage:
+    if not isinstance(storage, LocalFileStorage):
+        raise ResourceNotFoundError(message="Local storage is not enabled.")
+    return storage
+
+
+LocalStorageDependency = Annotated[LocalFileStorage, Depends(get_local_storage)]
+
+
+
+@router.get("/{key:path}")
+async def download_object(
+    key: str,
+    storage: LocalStorageDependency,
+    expires: Annotated[int, Query()],
+    signature: Annotated[str, Query()]
+):
+    
+    if not storage.verify_signature("GET", key, expires, signature):
+        raise UnauthorizedError("The URL is invalid or expired.")
+    
+    path = storage.path_for(key)
+    if not path.is_file():
+        raise ResourceNotFoundError(value=key, identifier="key")
+    
+    return SendfileResponse(
+        path, 
+        media_type=mimetypes.guess_type(key)[0] or "application/octet-stream"
+    )
+    
+
+@router.put("/{key:path}", status_code=status.HTTP_201_CREATED)
+async def upload_object(
+    key: str,
+    request: Request,
+    storage: LocalStorageDependency,
+    expires: Annotated[int, Query()],
+    signature: Annotated[str, Query()]
+):
+    
+    if not storage.verify_signature("PUT", key, expires, signature):
+        raise UnauthorizedError("The URL is invalid or expired.")
+    
+    result = await storage.upload_stream(
+        key, request.stream(), content_type=request.headers.get("content-type")
+    )
+    return {"key": result.key, "size": result.size, "sha256": result.sha256}
@@ -2,7 +2,7 @@ from fastapi import APIRouter, status
 from src.commands.base import UserID
 from src.commands.users import UserGetByIDQuery, UserCreateWithConfirmPassword, UserDelete
 from src.api.dependencies import UserServiceDependency, CurrentUser
-from src.api.schemas.users import UserCreateSchema, UserOutSchema
+from src.api.schemas.users import UserCreateSchema, UserOutSchema, user_out_renderer
 
 
 user_router = APIRouter(prefix="/users", tags=["Users"])
@@ -14,12 +14,13 @@ async def get_user(
     user_service: UserServiceDependency,
     current_user: CurrentUser
 ):
-    return await user_service.get(        
+    user = await user_service.get(        
         UserGetByIDQuery(
             id=user_id,
             viewer_id=current_user
         )
     )
+    return user_out_renderer.response(user)
     
 
 
@@ -30,12 +31,13 @@ async def create_user(
     current_user: CurrentUser
 ):
     
-    return await user_service.create(
+    created_user = await user_service.create(
         UserCreateWithConfirmPassword(
             **user.model_dump(),
             created_by=current_user
         )
     )
+    return user_out_renderer.response(created_user, status_code=status.HTTP_201_CREATED)
 
 
 
@@ -0,0 +1,13 @@
+from typing import Literal
+from pydantic import BaseModel
+from src.commands.users import UserAuth
+
+
+
+class LoginSchema(UserAuth): ...
+
+
+class TokenOutSchema(BaseModel):
+    access_token: str
+    token_type: Literal["bearer"] = "bearer"
+    expires_in: int # Seconds
@@ -1,7 +1,9 @@
 from typing import Annotated, Optional, Union
 from pydantic import BaseModel, StringConstraints, Field
 from src.commands.base import CourseID, UserID
-from src.commands.courses import CourseCreateCore, RecordedCourseDetailsUpdateCore, CourseInfoUpdateCore  
+from src.commands.courses import CourseCreateCore, CourseThumbnailUploadCore, RecordedCourseDetailsUpdateCore, CourseInfoUpdateCore  
+from src.api.rendering import ResponseRenderer
+from src.api.schemas.modules import ModuleOutSchema
 
 
 
@@ -17,9 +19,24 @@ class CourseOutSchema(BaseModel):
     created_by: UserID
     
 
+course_out_renderer = ResponseRenderer(CourseOutSchema)
+
+
+class CourseOutlineSchema(BaseModel):
+    course_id: CourseID
+    modules: list[ModuleOutSchema]
+
 class CourseInfoUpdateSchema(CourseInfoUpdateCore): ...
 
 class RecordedCourseDetailsUpdateSchema(RecordedCourseDetailsUpdateCore): ...
+
+class CourseThumbnailUploadSchema(CourseThumbnailUploadCore): ...
+
+
+class CourseThumbnailUploadOutSchema(BaseModel):
+    thumbnail: str # Set it with update-basic-info once uploaded.
+    upload_url: str
+    expires_in: int # Seconds
     
          
 
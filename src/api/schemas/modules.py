@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from src.commands.base import CourseID, ModuleID
 from src.commands.modules import ModuleCreateCore, ModuleUpdateCore, ModuleTitile, ReArrangeModuleCore
+from src.api.rendering import ResponseRenderer
 
 
 class ModuleOutSchema(BaseModel):
@@ -8,6 +9,9 @@ class ModuleOutSchema(BaseModel):
     title: ModuleTitile
     course_id: CourseID
 
+
+module_out_renderer = ResponseRenderer(ModuleOutSchema)
+
 class ModuleCreateSchema(ModuleCreateCore): ...
 class ModuleUpdateSchema(ModuleUpdateCore): ...
 class ReArrangeModuleSchema(ReArrangeModuleCore): ...
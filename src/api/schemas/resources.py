@@ -0,0 +1,38 @@
+from typing import Optional
+from pydantic import BaseModel
+from src.commands.base import ModuleID, ResourceID
+from src.commands.resources import ResourceStatus, ResourceUploadBatchCore, ResourceUploadCompleteCore, ResourceUpdateCore
+from src.api.rendering import ResponseRenderer
+
+
+
+class ResourceOutSchema(BaseModel):
+    id: ResourceID
+    module_id: ModuleID
+    filename: str
+    content_type: str
+    size: int
+    status: ResourceStatus
+
+
+resource_out_renderer = ResponseRenderer(ResourceOutSchema)
+
+
+class ResourceUploadOutSchema(BaseModel):
+    resource: ResourceOutSchema
+    upload_url: Optional[str] # None when the content is already stored, the resource is ready.
+
+
+class ResourceUploadBatchOutSchema(BaseModel):
+    uploads: list[ResourceUploadOutSchema]
+    expires_in: int # Seconds
+
+
+class ResourceUploadCompletionOutSchema(BaseModel):
+    ready: list[ResourceOutSchema]
+    failed: list[ResourceID]
+
+
+class ResourceUploadBatchSchema(ResourceUploadBatchCore): ...
+class ResourceUploadCompleteSchema(ResourceUploadCompleteCore): ...
+class ResourceUpdateSchema(ResourceUpdateCore): ...
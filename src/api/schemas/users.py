@@ -2,6 +2,7 @@ from pydantic import BaseModel, ConfigDict, StringConstraints, EmailStr
 from typing import Annotated
 from src.commands.users import UserRole
 from src.commands.base import UserID
+from src.api.rendering import ResponseRenderer
 
 
 
@@ -19,6 +20,10 @@ class UserOutSchema(BaseModel):
     id: UserID
     email: EmailStr
     role: UserRole
+
+
+user_out_renderer = ResponseRenderer(UserOutSchema)
+
     
 
 
@@ -0,0 +1,116 @@
+from email.utils import format_datetime
+from typing import Mapping
+from fastapi import Response, status
+from fastapi.responses import StreamingResponse
+from src.api.etag import etag_matches, not_modified
+from src.api.ranges import RangeNotSatisfiable, content_range, if_range_matches, parse_range_header
+from src.cache import LRUBytesCache, TTLCache
+from src.exceptions import ResourceNotFoundError
+from src.metrics import metrics
+from src.service.files import BaseObjectStorageService, ObjectInfo
+
+
+
+class ObjectStreamer:
+    """
+        Streams objects from the storage service through the API, so bucket
+        keys never leave the server. Supports Range / If-Range and
+        If-None-Match. Large objects are proxied chunk by chunk (at most one
+        chunk buffered per download), small hot objects are served from an
+        in-process LRU of bytes.
+    """
+
+    def __init__(
+        self,
+        storage: BaseObjectStorageService,
+        chunk_size: int = 64 * 1024,
+        cache_max_bytes: int = 64 * 1024 * 1024,
+        cache_max_object_bytes: int = 256 * 1024,
+        stat_ttl: float = 30.0
+    ) -> None:
+
+        self.storage = storage
+        self.chunk_size = chunk_size
+        self._bytes_cache: LRUBytesCache[tuple[str, str]] = LRUBytesCache(cache_max_bytes, cache_max_object_bytes)
+        # Short lived metadata cache, saves the HEAD round trip for hot objects.
+        self._stat_cache: TTLCache[str, ObjectInfo] = TTLCache(maxsize=10_000, ttl=stat_ttl)
+        self._cache_hits = metrics.counter("object_streamer_cache_hits_total", "Downloads served from the bytes cache.")
+        self._cache_misses = metrics.counter("object_streamer_cache_misses_total", "Downloads read from the storage.")
+
+
+    async def _stat(self, key: str) -> ObjectInfo:
+        info = self._stat_cache.get(key)
+        if info is None:
+            info = await self.storage.stat_object(key)
+            if info is None:
+                raise ResourceNotFoundError(value=key, identifier="key")
+            self._stat_cache.set(key, info)
+        return info
+
+
+    async def _read_small(self, info: ObjectInfo) -> bytes:
+        cache_key = (info.key, info.etag)
+        data = self._bytes_cache.get(cache_key)
+        if data is not None:
+            self._cache_hits.inc()
+            return data
+
+        self._cache_misses.inc()
+        data = b"".join([chunk async for chunk in self.storage.stream_object(info.key, chunk_size=self.chunk_size)])
+        self._bytes_cache.set(cache_key, data)
+        return data
+
+
+    async def response(
+        self,
+        key: str,
+        request_headers: Mapping[str, str],
+        cache_control: str = "private, max-age=300"
+    ) -> Response:
+
+        info = await self._stat(key)
+        headers = {
+            "ETag": info.etag,
+            "Last-Modified": format_datetime(info.last_modified, usegmt=True),
+            "Accept-Ranges": "bytes",
+            "Cache-Control": cache_control,
+        }
+        media_type = info.content_type or "application/octet-stream"
+
+        if etag_matches(request_headers.get("if-none-match"), info.etag):
+            return not_modified(info.etag)
+
+        # Nothing to read, any range of an empty object is unsatisfiable, the body is sent whole.
+        if info.size == 0:
+            return Response(content=b"", status_code=status.HTTP_200_OK, headers=headers, media_type=media_type)
+
+        start, end, status_code = 0, info.size - 1, status.HTTP_200_OK
+        if if_range_matches(request_headers.get("if-range"), info.etag, headers["Last-Modified"]):
+            try:
+                ranges = parse_range_header(request_headers.get("range"), info.size)
+            except RangeNotSatisfiable:
+                return Response(
+                    status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                    headers={"Content-Range": f"bytes */{info.size}"}
+                )
+
+            # Multiple ranges are not worth a multipart body, send the whole object.
+            if ranges is not None and len(ranges) == 1:
+                start, end = ranges[0]
+                status_code = status.HTTP_206_PARTIAL_CONTENT
+                headers["Content-Range"] = content_range(start, end, info.size)
+
+        if info.size <= self._bytes_cache.max_item_bytes:
+            data = await self._read_small(info)
+            return Response(
+                content=data[start: end + 1], status_code=status_code,
+                headers=headers, media_type=media_type
+            )
+
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            self.storage.stream_object(key, start, end, chunk_size=self.chunk_size),
+            status_code=status_code,
+            headers=headers,
+            media_type=media_type
+        )
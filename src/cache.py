@@ -0,0 +1,115 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+
+
+class TTLCache[K: Hashable, V]:
+    """
+        Bounded in-process cache where every entry expires after a ttl.
+        When full, the least recently used entry is evicted.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic
+    ) -> None:
+
+        if maxsize <= 0:
+            raise ValueError("maxsize should be greater than zero.")
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+
+    def get(self, key: K) -> Optional[V]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if expires_at <= self._clock():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+
+    def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+
+        self._data[key] = (self._clock() + ttl, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+    def pop(self, key: K) -> Optional[V]:
+        item = self._data.pop(key, None)
+        return item[1] if item else None
+
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+    def __contains__(self, key: K) -> bool:
+        return self.get(key) is not None
+
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+
+class LRUBytesCache[K: Hashable]:
+    """
+        LRU cache of byte strings bounded by their total size, for small hot
+        objects (e.g. thumbnails). Values larger than `max_item_bytes` are
+        never cached.
+    """
+
+    def __init__(self, max_bytes: int, max_item_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.max_item_bytes = min(max_item_bytes, max_bytes)
+        self.current_bytes = 0
+        self._data: OrderedDict[K, bytes] = OrderedDict()
+
+
+    def get(self, key: K) -> Optional[bytes]:
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+
+    def set(self, key: K, value: bytes) -> None:
+        if len(value) > self.max_item_bytes:
+            return
+
+        self.pop(key)
+        self._data[key] = value
+        self.current_bytes += len(value)
+
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self._data.popitem(last=False)
+            self.current_bytes -= len(evicted)
+
+
+    def pop(self, key: K) -> Optional[bytes]:
+        value = self._data.pop(key, None)
+        if value is not None:
+            self.current_bytes -= len(value)
+        return value
+
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -1,12 +1,26 @@
+import posixpath
 from datetime import datetime
 from typing import Annotated, Literal, Optional, Union
 from pydantic import ConfigDict, Field, StringConstraints, BaseModel
 from enum import Enum
 from src.commands.base import CourseBase, UserID, AuditFields, NullField
 from src.commands.validator import UpdateValidatorMixin
+from src.service.files import AllowdeContentTypes
 
 
 
+THUMBNAIL_PREFIX = "thumbnails"
+MAX_THUMBNAIL_SIZE = 20 * 1024 * 1024 # 20 MiB, the variants are rendered in memory.
+
+
+def is_course_thumbnail_key(course_id: int, key: str) -> bool:
+    """
+        Only the keys issued for the course (uploads and generated variants)
+        can be its thumbnail, any other object of the bucket is rejected.
+    """
+    return key.startswith(f"{THUMBNAIL_PREFIX}/{course_id}/") and posixpath.normpath(key) == key
+
+
 class CourseType(str, Enum):
     PRE_RECORDED = "pre-recorded"
     LIVE = "live"
@@ -76,6 +90,20 @@ class RecordedCourseDetailsUpdateCore(UpdateValidatorMixin, BaseModel):
 class RecordedCourseDetailsUpdate(RecordedCourseDetailsUpdateCore, CourseBase):
     updated_by: UserID    
 
+class CourseThumbnailUploadCore(BaseModel):
+    content_type: Literal[AllowdeContentTypes.PNG, AllowdeContentTypes.JPG, AllowdeContentTypes.JPEG]
+    size: Annotated[int, Field(gt=0, le=MAX_THUMBNAIL_SIZE)]
+
+
+class CourseThumbnailUpload(CourseThumbnailUploadCore, CourseBase):
+    updated_by: UserID
+
+
+class CourseThumbnailUploadURL(BaseModel):
+    thumbnail: str # Key to set as the course thumbnail once uploaded.
+    upload_url: str
+
+
 class CourseGet(CourseBase): ...
 
 class CourseGetByIDQuery(CourseGet):
@@ -84,4 +112,6 @@ class CourseGetByIDQuery(CourseGet):
 
 class Course(AuditFields, CourseCreate, CourseBase):
     slug: Annotated[Optional[str], NullField]
+    # Resized copies of the thumbnail keyed by width, filled in background.
+    thumbnail_variants: Optional[dict[str, str]] = None
     
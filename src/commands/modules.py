@@ -51,6 +51,7 @@ class ModuleGetQuery(ModuleBase):
 
 class Module(ModuleBase, ModuleCreate):
     created_at: datetime
+    updated_at: Optional[datetime] = None
     deleted_at: Optional[datetime] = None
     
 
@@ -0,0 +1,91 @@
+from enum import StrEnum
+from typing import Annotated, Optional, Self
+from pydantic import BaseModel, ConfigDict, Field, StringConstraints, model_validator
+from src.commands.base import ResourceBase, ModuleID, ResourceID, UserID, AuditFields, NullField
+from src.commands.validator import UpdateValidatorMixin
+from src.service.files import AllowdeContentTypes
+
+
+
+MAX_RESOURCE_SIZE = 500 * 1024 * 1024 # 500 MiB, a single PUT supports up to 5 GiB.
+MAX_UPLOAD_BATCH = 50
+
+
+class ResourceStatus(StrEnum):
+    PENDING = "pending" # Row created, the client is uploading.
+    READY = "ready"
+
+
+ResourceFilename = Annotated[str, StringConstraints(min_length=1, max_length=255, strip_whitespace=True)]
+Sha256Digest = Annotated[str, StringConstraints(pattern=r"^[0-9a-fA-F]{64}$", to_lower=True)]
+
+
+class ResourceFile(BaseModel):
+    filename: ResourceFilename
+    content_type: AllowdeContentTypes
+    size: Annotated[int, Field(gt=0, le=MAX_RESOURCE_SIZE)]
+    # Hex sha256 of the content, lets known content skip the upload.
+    sha256: Optional[Sha256Digest] = None
+
+
+class ResourceUploadBatchCore(BaseModel):
+    files: Annotated[list[ResourceFile], Field(min_length=1, max_length=MAX_UPLOAD_BATCH)]
+    
+    @model_validator(mode="after")
+    def validate_unique_filenames(self) -> Self:
+        filenames = [file.filename for file in self.files]
+        if len(set(filenames)) != len(filenames):
+            raise ValueError("Filenames should be unique within a batch.")
+        return self
+
+
+class ResourceUploadBatch(ResourceUploadBatchCore):
+    module_id: ModuleID
+    created_by: UserID
+
+
+class ResourceUploadCompleteCore(BaseModel):
+    resource_ids: Annotated[list[ResourceID], Field(min_length=1, max_length=MAX_UPLOAD_BATCH)]
+
+
+class ResourceUploadComplete(ResourceUploadCompleteCore):
+    module_id: ModuleID
+    updated_by: UserID
+
+
+class ResourceUpdateCore(UpdateValidatorMixin, BaseModel):
+    filename: Annotated[Optional[ResourceFilename], NullField]
+
+
+class ResourceUpdate(ResourceUpdateCore, ResourceBase):
+    updated_by: UserID
+
+
+class ResourceDelete(ResourceBase):
+    deleted_by: UserID
+
+
+class ResourceGet(ResourceBase): ...
+
+
+class ResourceGetQuery(ResourceBase):
+    viewer_id: UserID
+
+
+class Resource(AuditFields, ResourceFile, ResourceBase):
+    module_id: ModuleID
+    object_key: str
+    status: ResourceStatus = ResourceStatus.PENDING
+    content_digest: Optional[str] = None # Set once the stored bytes were verified.
+    
+    model_config = ConfigDict(use_enum_values=True)
+
+
+class ResourceUpload(BaseModel):
+    resource: Resource
+    upload_url: Optional[str] # None when the content was already stored, nothing to upload.
+
+
+class ResourceUploadCompletion(BaseModel):
+    ready: list[Resource]
+    failed: list[ResourceID] # Missing, already completed or not matching the declared size.
@@ -1,6 +1,6 @@
 from pydantic import EmailStr, BaseModel, StringConstraints, ConfigDict
 from enum import StrEnum
-from typing import Annotated
+from typing import Annotated, Optional
 from src.commands.base import UserBase, UserID, AuditFields
 
 
@@ -29,6 +29,8 @@ class UserCreateWithConfirmPassword(UserCreate):
 class PasswordUpdate(BaseModel):
     email: EmailStr
     new_password: str
+    # Only update if the stored hash is still this one (compare and set).
+    expected_password: Optional[str] = None
     
 
     
@@ -1,12 +1,16 @@
 import contextlib
-from typing import Literal, AsyncGenerator, Union, overload
+import json
+import re
+from typing import Callable, Literal, AsyncGenerator, Optional, Sequence, Union, overload
 import asyncpg
 from asyncpg.protocol.record import Record
 from asyncpg.pool import Pool
 from asyncpg.connection import Connection
 from src.settings import settings
-from src.query_builder.asyncpg import AsyncPgQueryBuilder
+from src.metrics import metrics
+from src.query_builder.asyncpg import AsyncPgExecutableSQL, AsyncPgQueryBuilder
 from src.query_builder.base import BaseExecutableSQL, BaseQueryBuilder
+from src.singleflight import SingleFlight
 
 
 
@@ -14,7 +18,18 @@ class AsyncPgDBManager:
     
     def __init__(self, query_builder: BaseQueryBuilder = AsyncPgQueryBuilder()):
         self._pool: Union[Pool, None] = None 
+        self._listener: Union[Connection, None] = None
         self.query_builder: BaseQueryBuilder = query_builder 
+        self._read_flight = SingleFlight("db_reads")
+    
+    
+    @staticmethod
+    def _connection_params() -> dict:
+        return dict(
+            user=settings.database.user.get_secret_value(), password=settings.database.password.get_secret_value(), 
+            host=settings.database.host.get_secret_value(), database=settings.database.name.get_secret_value(),
+            port=settings.database.port,
+        )
     
     
     async def init_pool(self) -> None:
@@ -24,9 +39,7 @@ class AsyncPgDBManager:
         
         try:
             pool: Pool = await asyncpg.create_pool(
-                user=settings.database.user.get_secret_value(), password=settings.database.password.get_secret_value(), 
-                host=settings.database.host.get_secret_value(), database=settings.database.name.get_secret_value(),
-                port=settings.database.port,
+                **self._connection_params(),
                 min_size=10,
                 max_size=20,
                 # Senior Tip: Retire connections before they "rot"
@@ -42,6 +55,7 @@ class AsyncPgDBManager:
 
 
     async def close_pool(self) -> None:
+        await self.close_listener()
         try:
             if self._pool:
                 await self._pool.close()
@@ -51,6 +65,45 @@ class AsyncPgDBManager:
             print(f"Error occured while closing the pool. {str(e)}")
             
     
+    async def listen(
+        self,
+        channel: str,
+        callback: Callable[[Connection, int, str, str], None],
+        on_terminate: Optional[Callable[[Connection], None]] = None
+    ) -> None:
+        """
+            Subscribes to a LISTEN/NOTIFY channel on a dedicated connection.
+            The listener connection is opened once and lives outside the pool,
+            since pooled connections are recycled and would drop the LISTEN.
+        """
+        
+        if self._listener is None or self._listener.is_closed():
+            self._listener = await asyncpg.connect(**self._connection_params())
+            if on_terminate is not None:
+                self._listener.add_termination_listener(on_terminate)
+            print("Database listener connection created.")
+            
+        await self._listener.add_listener(channel, callback)
+        
+    
+    async def close_listener(self) -> None:
+        try:
+            if self._listener and not self._listener.is_closed():
+                await self._listener.close()
+                print("Database listener connection closed.")
+        except Exception as e:
+            print(f"Error occured while closing the listener connection. {str(e)}")
+        finally:
+            self._listener = None
+            
+    
+    async def notify(self, channel: str, payload: str) -> None:
+        executable = self.query_builder.build_executable(
+            "select pg_notify($1, $2);", values=(channel, payload)
+        )
+        await self.execute(executable, fetch_returns="none")
+        
+    
     @contextlib.asynccontextmanager
     async def connection(self) -> AsyncGenerator[Connection, None]:
         if self._pool is None:
@@ -106,26 +159,146 @@ class AsyncPgDBManager:
         
     
     
+    async def execute_shared(
+        self,
+        executable: BaseExecutableSQL,
+        fetch_returns: Literal["all", "one"]
+    ) -> Union[list[Record], Record, None]:
+        """
+            Executes a read only statement. Concurrent calls with the same
+            statement and values share a single in-flight query.
+        """
+        
+        key = (executable.sql, tuple(executable.values), fetch_returns)
+        try:
+            hash(key)
+        except TypeError: # Unhashable values (e.g. lists), can't be coalesced.
+            return await self.execute(executable, fetch_returns=fetch_returns)
+        
+        return await self._read_flight.do(
+            key, lambda: self.execute(executable, fetch_returns=fetch_returns)
+        )
+    
+    
+    @contextlib.asynccontextmanager
+    async def transaction(self) -> AsyncGenerator["Transaction", None]:
+        "Opens a transaction on a pooled connection, committed when the block exits cleanly."
+        async with self.connection() as conn:
+            async with conn.transaction():
+                yield Transaction(conn)
+    
+    
     async def with_transaction(
         self,
         executables: list[BaseExecutableSQL],
         return_last: bool = True,
-    ) -> Union[list[Record], Record, None]:
-        
+        pipelined: bool = False
+    ) -> Union[list[list[Record]], Record, None]:
+        """
+            Runs the executables in one transaction. Returns the first row of
+            the last one, or every result (one list of rows per executable)
+            when `return_last` is False.
+            
+            `pipelined` sends independent statements in a single round trip,
+            see `Transaction.run`. Statements that depend on the writes of the
+            previous ones must stay sequential (the default).
+        """
         
         if not executables:
             return None
         
-        async with self.connection() as conn:
-            async with conn.transaction():
-                for idx, executable in enumerate(executables, start=1):
-                    if idx != len(executables):
-                        await conn.execute(executable.sql, *executable.values)
-                    else:
-                        result = await conn.fetchrow(executable.sql, *executable.values)
+        async with self.transaction() as tx:
+            results = await tx.run(executables, pipelined=pipelined)
     
-        return result if return_last else None
+        if not return_last:
+            return results
+        return results[-1][0] if results[-1] else None
                     
     
 
+_pipelined_statements = metrics.counter(
+    "db_pipelined_statements_total", "Statements sent in a single round trip by pipelined transactions."
+)
+
+
+
+class Transaction:
+    """
+        An open transaction. `run` executes statements on it, `savepoint`
+        scopes a part that can fail and be rolled back without aborting
+        the rest of the transaction.
+    """
+    
+    # Statements that can be wrapped in a CTE, a nested WITH can't hold data-modifying statements.
+    _pipelineable = re.compile(r"^\s*(insert|update|delete|select)\b", re.IGNORECASE)
+    _returns_rows = re.compile(r"^\s*select\b|\breturning\b", re.IGNORECASE)
+    _placeholder = re.compile(r"\$(\d+)")
+    
+    def __init__(self, conn: Connection) -> None:
+        self.conn = conn
+    
+    
+    @contextlib.asynccontextmanager
+    async def savepoint(self) -> AsyncGenerator["Transaction", None]:
+        """
+            Rolls back to the savepoint if the block raises, the exception
+            still propagates and the outer transaction can go on if caught.
+        """
+        async with self.conn.transaction():
+            yield self
+    
+    
+    async def run(
+        self,
+        executables: Sequence[BaseExecutableSQL],
+        pipelined: bool = False
+    ) -> list[list[Union[Record, dict]]]:
+        """
+            Returns the rows of every executable. Pipelined, the statements
+            are combined into one statement of CTEs, a single round trip, so
+            the locks are held for one round trip instead of N. They all see
+            the same snapshot: a statement won't see the writes of another.
+            The rows then come back as dicts decoded from JSON (timestamps as
+            ISO strings). Falls back to one statement at a time when any of
+            them can't be combined.
+        """
+        if pipelined and len(executables) > 1:
+            executable = self.build_pipeline(executables)
+            if executable is not None:
+                _pipelined_statements.inc(len(executables))
+                row = await self.conn.fetchrow(executable.sql, *executable.values)
+                return json.loads(row["results"])
+        
+        return [
+            await self.conn.fetch(executable.sql, *executable.values)
+            for executable in executables
+        ]
+    
+    
+    @classmethod
+    def build_pipeline(cls, executables: Sequence[BaseExecutableSQL]) -> Optional[AsyncPgExecutableSQL]:
+        "Combines the statements in one, None if one of them can't be a CTE."
+        ctes, outputs, values = [], [], []
+        
+        for idx, executable in enumerate(executables):
+            sql = executable.sql.strip().rstrip(";")
+            if not cls._pipelineable.match(sql):
+                return None
+            
+            # Shift the placeholders after the values of the previous statements.
+            offset = len(values)
+            sql = cls._placeholder.sub(lambda m: f"${int(m.group(1)) + offset}", sql)
+            values.extend(executable.values)
+            
+            ctes.append(f"s{idx} as ({sql})")
+            outputs.append(
+                f"(select coalesce(jsonb_agg(s{idx}), '[]') from s{idx})" 
+                if cls._returns_rows.search(sql) else "'[]'::jsonb"
+            )
+        
+        sql = f"with {', '.join(ctes)} select jsonb_build_array({', '.join(outputs)}) as results;"
+        return AsyncPgExecutableSQL(sql=sql, values=tuple(values))
+
+
+
 async_db_manager = AsyncPgDBManager()
\ No newline at end of file
@@ -89,6 +89,13 @@ class UnAuthenticated(SecurityError):
 
 class UnauthorizedError(SecurityError):
     _default = "Do not have a permission to perform this action."
+    
+class ThrottledError(SecurityError):
+    _default = "Too many attempts, try again later."
+    
+    def __init__(self, retry_after: float, message: Optional[str] = None):
+        self.retry_after = retry_after
+        super().__init__(message)
 
 
 
@@ -172,4 +179,10 @@ class InvalidRoleError(ValidationError):
 
 
     
-    
\ No newline at end of file
+    
+class ChecksumMismatchError(ValidationError):
+    _default = "The uploaded content does not match the expected checksum."
+
+
+class InvalidThumbnailError(ValidationError):
+    _default = "The thumbnail should be uploaded through the thumbnail upload of the course."
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Callable, Iterable, NamedTuple, Optional
+from asyncpg.connection import Connection
+from src.database import AsyncPgDBManager, async_db_manager
+
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidationEvent(NamedTuple):
+    """
+        A change of a row. `id` None means the whole table (or every table
+        when `table` is "*") must be considered stale.
+    """
+    table: str
+    id: Optional[int]
+
+
+InvalidationHandler = Callable[[InvalidationEvent], None]
+
+ALL_TABLES = "*"
+
+
+
+class InvalidationBus:
+    """
+        Cross worker cache invalidation built on Postgres LISTEN/NOTIFY.
+
+        Repositories publish (table, id) events after a write, every worker
+        receives them on the listener connection owned by AsyncPgDBManager
+        and runs the handlers subscribed to that table.
+    """
+
+    channel: str = "cache_invalidation"
+
+    def __init__(
+        self,
+        db: Optional[AsyncPgDBManager] = None,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0
+    ) -> None:
+
+        self.db = db or async_db_manager
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._handlers: dict[str, list[InvalidationHandler]] = defaultdict(list)
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._running = False
+
+
+    def subscribe(self, table: str, handler: InvalidationHandler) -> None:
+        "Registers a handler for a table, or for every table with '*'."
+        self._handlers[table].append(handler)
+
+
+    async def start(self) -> None:
+        self._running = True
+        await self.db.listen(self.channel, self._on_notification, on_terminate=self._on_terminate)
+
+
+    async def stop(self) -> None:
+        self._running = False
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        await self.db.close_listener()
+
+
+    async def publish(self, table: str, ids: Iterable[Optional[int]]) -> None:
+        """
+            Publishes the changed ids of a table. Handlers of this worker run
+            immediately, the other workers get them through NOTIFY.
+        """
+
+        ids = list(ids)
+        if not ids:
+            return
+
+        for entity_id in ids:
+            self._dispatch(InvalidationEvent(table, entity_id))
+
+        try:
+            await self.db.notify(self.channel, json.dumps({"table": table, "ids": ids}))
+        except Exception:
+            # The write is already committed, failing the request won't help.
+            logger.exception("Could not publish the invalidation of %s %s", table, ids)
+
+
+    def _on_notification(self, conn: Connection, pid: int, channel: str, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+            events = [InvalidationEvent(message["table"], entity_id) for entity_id in message["ids"]]
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed invalidation payload %r", payload)
+            return
+
+        for event in events:
+            self._dispatch(event)
+
+
+    def _dispatch(self, event: InvalidationEvent) -> None:
+        handlers = self._handlers.get(event.table, []) + self._handlers.get(ALL_TABLES, [])
+        for handler in handlers:
+            try:
+                handler(event)
+            except Exception:
+                logger.exception("Invalidation handler %r failed for %s", handler, event)
+
+
+    def _on_terminate(self, conn: Connection) -> None:
+        # Events may have been missed while disconnected, flush everything.
+        self._dispatch(InvalidationEvent(ALL_TABLES, None))
+
+        if self._running and (self._reconnect_task is None or self._reconnect_task.done()):
+            self._reconnect_task = asyncio.get_running_loop().create_task(self._reconnect())
+
+
+    async def _reconnect(self) -> None:
+        delay = self.reconnect_delay
+        while self._running:
+            await asyncio.sleep(delay)
+            try:
+                await self.start()
+                # Flush again, anything could have changed before LISTEN was re-issued.
+                self._dispatch(InvalidationEvent(ALL_TABLES, None))
+                logger.info("Invalidation listener reconnected.")
+                return
+            except Exception:
+                logger.exception("Invalidation listener reconnect failed, retrying in %.1fs", delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+
+
+
+invalidation_bus = InvalidationBus()
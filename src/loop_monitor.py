@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+from src.metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+LAG_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+@dataclass
+class BlockingCallReport:
+    "Stack of the event loop thread captured while the loop was blocked."
+    blocked_for: float
+    captured_at: float
+    stack: list[str] = field(default_factory=list)
+
+
+
+class LoopLagMonitor:
+    """
+        Measures how late the event loop wakes up a sleeping heartbeat task.
+        Any lag is time where a callback kept the loop busy (argon2 hashing,
+        sqlparse formatting, blocking I/O etc.).
+
+        In debug mode a watchdog thread samples the loop thread's stack when
+        a heartbeat is overdue by more than `slow_callback_threshold`, so
+        the blocking work can be attributed to a specific function.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.25,
+        slow_callback_threshold: float = 0.1,
+        debug: bool = False,
+        max_reports: int = 100
+    ) -> None:
+
+        self.interval = interval
+        self.slow_callback_threshold = slow_callback_threshold
+        self.debug = debug
+        self.reports: deque[BlockingCallReport] = deque(maxlen=max_reports)
+
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat: float = time.monotonic()
+        self._beat: int = 0
+        self._reported_beat: int = -1
+
+        self._lag = metrics.histogram(
+            "event_loop_lag_seconds",
+            "Delay between the scheduled and actual wake up of the heartbeat.",
+            buckets=LAG_BUCKETS
+        )
+        self._blocked = metrics.counter(
+            "event_loop_blocked_total",
+            "Number of times the loop was blocked longer than the slow callback threshold."
+        )
+        self._max_lag = metrics.gauge(
+            "event_loop_lag_max_seconds",
+            "Maximum lag observed since the process started."
+        )
+
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop_event.clear()
+        self._task = asyncio.create_task(self._heartbeat(), name="loop-lag-monitor")
+
+        if self.debug:
+            self._watchdog = threading.Thread(
+                target=self._watch, name="loop-lag-watchdog", daemon=True
+            )
+            self._watchdog.start()
+
+
+    async def stop(self) -> None:
+        self._stop_event.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=self.interval * 2)
+            self._watchdog = None
+
+
+    async def _heartbeat(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+
+            self._lag.observe(lag)
+            if lag > self._max_lag.value:
+                self._max_lag.set(lag)
+
+            if lag >= self.slow_callback_threshold:
+                self._blocked.inc()
+                # The watchdog only knows the loop was blocked *at least* this long.
+                if self.debug and self._reported_beat == self._beat and self.reports:
+                    self.reports[-1].blocked_for = lag
+                    logger.warning(
+                        "Event loop blocked for %.3fs in:\n%s",
+                        lag, "".join(self.reports[-1].stack)
+                    )
+
+            self._beat += 1
+            self._last_beat = time.monotonic()
+
+
+    def _watch(self) -> None:
+        poll_interval = min(self.interval, self.slow_callback_threshold) / 2
+
+        while not self._stop_event.wait(poll_interval):
+            overdue = time.monotonic() - self._last_beat - self.interval
+
+            # Capture only once per blocked heartbeat.
+            if overdue < self.slow_callback_threshold or self._reported_beat == self._beat:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+
+            self._reported_beat = self._beat
+            self.reports.append(
+                BlockingCallReport(
+                    blocked_for=overdue,
+                    captured_at=time.time(),
+                    stack=traceback.format_stack(frame)
+                )
+            )
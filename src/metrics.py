@@ -0,0 +1,163 @@
+import bisect
+import threading
+from typing import Optional, Sequence, Union
+
+
+
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+
+class Counter:
+    "Monotonic counter. Safe to increment from any thread."
+
+    def __init__(self, name: str, description: str = "") -> None:
+        self.name = name
+        self.description = description
+        self._value: float = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} counter",
+            f"{self.name} {self._value}"
+        ]
+
+
+
+class Gauge(Counter):
+    "Value that can go up and down."
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = value
+
+    def dec(self, amount: float = 1) -> None:
+        self.inc(-amount)
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {self._value}"
+        ]
+
+
+
+class Histogram:
+    "Cumulative bucket histogram in the Prometheus exposition format."
+
+    def __init__(
+        self,
+        name: str,
+        description: str = "",
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> None:
+        self.name = name
+        self.description = description
+        self.buckets: tuple[float, ...] = tuple(sorted(buckets))
+        self._counts: list[int] = [0] * (len(self.buckets) + 1) # Last slot is +Inf.
+        self._sum: float = 0.0
+        self._count: int = 0
+        self._max: float = 0.0
+        self._lock = threading.Lock()
+
+
+    def observe(self, value: float) -> None:
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+            self._count += 1
+            if value > self._max:
+                self._max = value
+
+
+    def snapshot(self) -> dict[str, Union[float, dict[str, int]]]:
+        with self._lock:
+            counts = list(self._counts)
+            total, count, maximum = self._sum, self._count, self._max
+
+        cumulative, buckets = 0, {}
+        for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+            cumulative += bucket_count
+            buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+
+        return {"buckets": buckets, "sum": total, "count": count, "max": maximum}
+
+
+    def render(self) -> list[str]:
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram"
+        ]
+        lines.extend(
+            f'{self.name}_bucket{{le="{bound}"}} {count}'
+            for bound, count in snapshot["buckets"].items()
+        )
+        lines.append(f"{self.name}_sum {snapshot['sum']}")
+        lines.append(f"{self.name}_count {snapshot['count']}")
+        return lines
+
+
+
+class MetricsRegistry:
+    """
+        Process local registry of metrics. Metrics are created once
+        and looked up by name, so modules can share a metric safely.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Union[Counter, Gauge, Histogram]] = {}
+        self._lock = threading.Lock()
+
+
+    def _get_or_create(self, name: str, factory):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = factory()
+                self._metrics[name] = metric
+            return metric
+
+
+    def counter(self, name: str, description: str = "") -> Counter:
+        return self._get_or_create(name, lambda: Counter(name, description))
+
+
+    def gauge(self, name: str, description: str = "") -> Gauge:
+        return self._get_or_create(name, lambda: Gauge(name, description))
+
+
+    def histogram(
+        self,
+        name: str,
+        description: str = "",
+        buckets: Optional[Sequence[float]] = None
+    ) -> Histogram:
+        return self._get_or_create(
+            name, lambda: Histogram(name, description, buckets or DEFAULT_BUCKETS)
+        )
+
+
+    def render(self) -> str:
+        "Renders all the metrics in Prometheus text exposition format."
+        lines: list[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+
+metrics = MetricsRegistry()
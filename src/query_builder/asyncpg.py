@@ -92,6 +92,35 @@ class AsyncPgQueryBuilder(BaseQueryBuilder):
         return AsyncPgExecutableSQL(sql=sql, values=tuple(columns_and_values.values()))
         
         
+    def build_insert_if_absent(
+        self,
+        tablename: str,
+        data: dict[str, Any],
+        conflict_columns: Sequence[str],
+        conflict_where: Optional[str] = "deleted_at is null",
+        return_columns: Sequence[str] = ("*",)
+    ) -> AsyncPgExecutableSQL:
+        """
+            Insert that does nothing, and returns no row, when a live row
+            already holds the unique key. `conflict_where` must match the
+            predicate of the partial unique index.
+        """
+        
+        executable = self.build_insert(tablename, data, return_columns=())
+        sql = executable.sql.rstrip(";")
+        sql += f"ON CONFLICT ({', '.join(conflict_columns)}) "
+        if conflict_where:
+            sql += f"WHERE {conflict_where} "
+        sql += "DO NOTHING "
+        
+        if return_columns:
+            sql += "RETURNING "
+            sql += ", ".join([col for col in return_columns])
+        sql += ";"
+        
+        return AsyncPgExecutableSQL(sql=sql, values=executable.values)
+        
+        
     def build_update(
         self, 
         tablename: str, 
@@ -30,6 +30,17 @@ class BaseQueryBuilder(ABC):
     ) -> BaseExecutableSQL: ...
     
     
+    @abstractmethod
+    def build_insert_if_absent(
+        self,
+        tablename: str,
+        data: dict[str, Any],
+        conflict_columns: Sequence[str],
+        conflict_where: Optional[str] = "deleted_at is null",
+        return_columns: Sequence[str] = ("*", )
+    ) -> BaseExecutableSQL: ...
+    
+    
     @abstractmethod
     def build_update(
         self,
@@ -2,14 +2,23 @@ from abc import abstractmethod, ABC
 from datetime import UTC, datetime
 from asyncpg.protocol.record import Record
 from pydantic import AliasChoices, BaseModel, Field
-from typing import Annotated, Any, ClassVar, Literal, Optional, Sequence, Type
+from dataclasses import dataclass
+from typing import Annotated, Any, ClassVar, Literal, NamedTuple, Optional, Sequence, Type
 from src.database import AsyncPgDBManager, async_db_manager
-from src.commands.base import UserID, ID, ReArrangeBase
-from src.query_builder.base import BaseWhere
+from src.commands.base import UserID, ID, ReArrangeBase, any_id_adaptor
+from src.query_builder.base import BaseExecutableSQL, BaseWhere
 from src.query_builder.asyncpg import AsyncPgWhere
 from src.repository.ownership_specification import BaseOwnershipSpec
+from src.repository.ownership_cache import OwnershipCache, ownership_cache as default_ownership_cache
+from src.repository.content_blobs import ContentBlobRepository
+from src.repository.storage_deletion_queue import StorageDeletionQueueRepository
+from src.invalidation import InvalidationBus, invalidation_bus as default_invalidation_bus
 from src.commands.base import ID
 import json
+import logging
+
+
+logger = logging.getLogger(__name__)
 
 
 
@@ -31,6 +40,29 @@ class ReorderParicipants(BaseModel):
         )
 
 
+class Cascade(NamedTuple):
+    """
+        A dependent table soft deleted with its parent, the rows of
+        `repository` whose `foreign_key` points to a deleted parent row.
+        The cascades of `repository` itself are followed too.
+    """
+    repository: Type["BaseRepository"]
+    foreign_key: str
+    
+    
+
+@dataclass(frozen=True, slots=True)
+class CascadeResult:
+    row: Optional[Record] # The deleted root row, None if it was not found.
+    ids: dict[str, list[int]] # Soft deleted ids per dependent table.
+    queued_keys: int # Storage keys queued for cleanup.
+    
+    @property
+    def counts(self) -> dict[str, int]:
+        return {table: len(ids) for table, ids in self.ids.items()}
+
+
+
 class BaseRepository[T](ABC):
     
     """
@@ -39,12 +71,27 @@ class BaseRepository[T](ABC):
     """
     
     tablename: ClassVar[str] = "Sample"
+    # Columns of the partial unique index (where deleted_at is null) used by add_if_absent.
+    unique_columns: ClassVar[Sequence[str]] = ()
+    # Dependent tables soft deleted along with a row, see `cascade_delete`.
+    cascades: ClassVar[Sequence[Cascade]] = ()
+    # text[] expression over a row, the storage keys to queue when it is deleted.
+    storage_keys: ClassVar[Optional[str]] = None
+    # Column referencing a content blob, its reference is released when the row is deleted.
+    blob_digest: ClassVar[Optional[str]] = None
     _ownership_spec: ClassVar[Type[BaseOwnershipSpec]]
     
     
-    def __init__(self, db: Optional[AsyncPgDBManager] = None) -> None:
+    def __init__(
+        self, 
+        db: Optional[AsyncPgDBManager] = None,
+        invalidation_bus: Optional[InvalidationBus] = None,
+        ownership_cache: Optional[OwnershipCache] = None
+    ) -> None:
         super().__init__()
         self.db = db or async_db_manager
+        self.invalidation_bus = invalidation_bus or default_invalidation_bus
+        self.ownership_cache = ownership_cache or default_ownership_cache
 
 
     @abstractmethod
@@ -58,8 +105,30 @@ class BaseRepository[T](ABC):
         user_id: UserID,
     ) -> bool:
         
-        spec = self._ownership_spec(entity_id, user_id)
-        return await spec.is_satisfied()
+        key = (self._ownership_spec, entity_id, user_id)
+        owned = self.ownership_cache.get(key)
+        if owned is not None:
+            return owned
+        
+        epoch = self.ownership_cache.begin()
+        spec = self._ownership_spec(entity_id, user_id, self.db)
+        decision = await spec.evaluate()
+        if decision is None:
+            # Not cached, the id may exist later.
+            return False
+        
+        owned, scope_id = decision
+        self.ownership_cache.set(key, owned, (spec.scope_table, scope_id), epoch)
+        return owned
+    
+    
+    async def filter_owned(
+        self,
+        entity_ids: Sequence[ID],
+        user_id: UserID
+    ) -> set[int]:
+        "Returns the ids the user owns among `entity_ids`, one query for the whole set."
+        return await self._ownership_spec.filter_owned(entity_ids, user_id, db=self.db)
         
 
     def _add_audit_field(
@@ -79,17 +148,58 @@ class BaseRepository[T](ABC):
         return updated_dict
     
     
+    async def _publish_invalidation(
+        self, 
+        ids: Sequence[Optional[int]],
+        tablename: Optional[str] = None
+    ) -> None:
+        """
+            Tells every worker that these rows changed, so the cached copies
+            are evicted. An id of None marks the whole table as stale.
+        """
+        await self.invalidation_bus.publish(tablename or self.tablename, ids)
+        
+        
+    async def _publish_row_change(self, row: Optional[Record]) -> None:
+        if row:
+            await self._publish_invalidation([row["id"]])
+    
+    
+    def _insert_data(self, cmd: BaseModel) -> dict[str, Any]:
+        "Columns and values of the row inserted for a create command."
+        return cmd.model_dump()
+    
+    
     @abstractmethod
     async def add(self, cmd: BaseModel) -> T:
         "Insert new record."
         executable = self.db.query_builder.build_insert(
             self.tablename, 
-            cmd.model_dump(),
+            self._insert_data(cmd),
         )
         
         entity = await self.db.execute(executable, fetch_returns="one")    
         return self._to_domain(entity)
     
+    
+    async def add_if_absent(self, cmd: BaseModel) -> Optional[T]:
+        """
+            Inserts the record unless a live one already has the same
+            `unique_columns`, in a single statement. Returns None on conflict,
+            so there is no window between an existence check and the insert.
+        """
+        if not self.unique_columns:
+            raise NotImplementedError(f"{type(self).__name__} does not declare its unique columns.")
+        
+        executable = self.db.query_builder.build_insert_if_absent(
+            self.tablename,
+            self._insert_data(cmd),
+            conflict_columns=self.unique_columns
+        )
+        
+        entity = await self.db.execute(executable, fetch_returns="one")
+        return self._to_domain(entity)
+    
 
     @abstractmethod
     async def update(self, cmd: BaseModel) -> Optional[T]:
@@ -104,11 +214,125 @@ class BaseRepository[T](ABC):
         )
         
         entity = await self.db.execute(executable, fetch_returns="one")
+        await self._publish_row_change(entity)
         
         return self._to_domain(entity)
         
     
     
+    def build_cascade_delete(self, entity_id: ID, data: dict[str, Any]) -> BaseExecutableSQL:
+        """
+            Builds one statement that soft deletes a row and, through chained
+            data-modifying CTEs, every live row depending on it following the
+            `cascades`, however deep. The storage keys of the deleted rows are
+            queued and their content blob references released in the same
+            statement. It returns the root row with the deleted ids per table
+            (`cascade_ids`) and the queued count.
+        """
+        values = list(self.db.query_builder.process_data(data).values())
+        set_clause = ", ".join(f"{col} = ${idx}" for idx, col in enumerate(data, start=1))
+        values.append(any_id_adaptor.validate_python(entity_id))
+        
+        ctes = [
+            f"d0 as (update {self.tablename} set {set_clause} "
+            f"where id = ${len(values)} and deleted_at is null returning *)"
+        ]
+        key_sources = [f"select unnest({self.storage_keys}) from d0"] if self.storage_keys else []
+        digest_sources = [f"select {self.blob_digest} from d0"] if self.blob_digest else []
+        ids_by_table: dict[str, list[str]] = {}
+        
+        def walk(repository: Type[BaseRepository], parent: str) -> None:
+            for cascade in repository.cascades:
+                child = cascade.repository
+                name = f"d{len(ctes)}"
+                returning = "id" + (f", {child.storage_keys} as storage_keys" if child.storage_keys else "")
+                returning += f", {child.blob_digest} as blob_digest" if child.blob_digest else ""
+                ctes.append(
+                    f"{name} as (update {child.tablename} set {set_clause} "
+                    f"where {cascade.foreign_key} in (select id from {parent}) and deleted_at is null "
+                    f"returning {returning})"
+                )
+                if child.storage_keys:
+                    key_sources.append(f"select unnest(storage_keys) from {name}")
+                if child.blob_digest:
+                    digest_sources.append(f"select blob_digest from {name}")
+                ids_by_table.setdefault(child.tablename, []).append(name)
+                walk(child, name)
+        
+        walk(type(self), "d0")
+        
+        queued = "0"
+        if key_sources:
+            ctes.append(
+                f"queued as (insert into {StorageDeletionQueueRepository.tablename}(object_key) "
+                f"select key from ({' union all '.join(key_sources)}) as t(key) "
+                f"where key is not null on conflict (object_key) do nothing returning 1)"
+            )
+            queued = "(select count(*) from queued)"
+        
+        if digest_sources:
+            # Blobs left without reference are removed by ContentBlobRepository.sweep_orphans,
+            # the same row can't be updated and deleted in one statement.
+            ctes.append(
+                f"released as (update {ContentBlobRepository.tablename} as b "
+                f"set ref_count = b.ref_count - r.refs, updated_at = now() "
+                f"from (select digest, count(*) as refs from ({' union all '.join(digest_sources)}) as t(digest) "
+                f"where digest is not null group by digest) as r "
+                f"where b.digest = r.digest returning b.digest)"
+            )
+        
+        cascade_ids = ", ".join(
+            f"'{table}', " + " || ".join(f"(select coalesce(jsonb_agg(id), '[]') from {name})" for name in names)
+            for table, names in ids_by_table.items()
+        )
+        ctes_sql = ",\n            ".join(ctes)
+        sql = f"""
+            with {ctes_sql}
+            select 
+                d0.*, 
+                jsonb_build_object({cascade_ids}) as cascade_ids,
+                {queued} as queued_keys
+            from 
+                d0
+            ;
+        """
+        return self.db.query_builder.build_executable(sql=sql, values=tuple(values))
+    
+    
+    @staticmethod
+    def _to_cascade_result(row: Optional[Record]) -> CascadeResult:
+        if row is None:
+            return CascadeResult(row=None, ids={}, queued_keys=0)
+        
+        # Strip the cascade columns, the rest is the root row.
+        row = dict(row)
+        ids = json.loads(row.pop("cascade_ids"))
+        queued_keys = row.pop("queued_keys")
+        return CascadeResult(row=row, ids=ids, queued_keys=queued_keys)
+    
+    
+    async def cascade_delete(self, cmd: BaseModel) -> CascadeResult:
+        """
+            Soft deletes a row with all its dependents in one round trip, then
+            publishes the invalidation of every affected table.
+        """
+        data = self._add_audit_field(cmd.model_dump(exclude={"id"}), "delete")
+        executable = self.build_cascade_delete(cmd.id, data)
+        
+        result = self._to_cascade_result(await self.db.execute(executable, fetch_returns="one"))
+        await self._publish_cascade(result)
+        return result
+    
+    
+    async def _publish_cascade(self, result: CascadeResult) -> None:
+        await self._publish_row_change(result.row)
+        for table, ids in result.ids.items():
+            await self._publish_invalidation(ids, tablename=table)
+        logger.debug(
+            "Cascade delete of %s: %s, %s storage keys queued.", self.tablename, result.counts, result.queued_keys
+        )
+    
+    
     @abstractmethod
     async def delete(self, cmd: BaseModel) -> Optional[T]:
         "Delete a record."
@@ -121,6 +345,7 @@ class BaseRepository[T](ABC):
         )
         
         entity = await self.db.execute(executable, fetch_returns="one")
+        await self._publish_row_change(entity)
         return self._to_domain(entity)
     
     
@@ -151,7 +376,8 @@ class BaseRepository[T](ABC):
             where_clause= critera
         )    
         
-        result = await self.db.execute(executable, fetch_returns="one" if not fetch_all else "all") 
+        # Reads are coalesced, identical concurrent lookups share one query.
+        result = await self.db.execute_shared(executable, fetch_returns="one" if not fetch_all else "all") 
         return result
     
     
@@ -163,6 +389,18 @@ class BaseRepository[T](ABC):
         return self._to_domain(entitiy)
     
     
+    async def get_version(self, entity_id: ID) -> Optional[datetime]:
+        """
+            Returns only the version (updated_at or created_at) of a record.
+            Used to answer conditional requests without hydrating the full row.
+        """
+        row = await self.pick(
+            columns=("coalesce(updated_at, created_at) as version",),
+            id=entity_id
+        )
+        return row["version"] if row else None
+    
+    
     async def exists_by(
         self,
         where_clause: Optional[BaseWhere] = None,
@@ -235,15 +473,14 @@ class BaseRepository[T](ABC):
         
         executable = self.db.query_builder.build_update(
             self.tablename,
-            {"position_string": position_string},
+            self._add_audit_field({"position_string": position_string}, "update"),
             where_clause=self.db.query_builder.build_where_pk(target_id)
         )
         
-        return self._to_domain(
-            await self.db.execute(
-                executable, fetch_returns="one"
-            )
-        )
+        entity = await self.db.execute(executable, fetch_returns="one")
+        await self._publish_row_change(entity)
+        
+        return self._to_domain(entity)
         
 
 
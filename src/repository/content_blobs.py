@@ -0,0 +1,156 @@
+from typing import ClassVar, Optional
+from asyncpg.protocol.record import Record
+from src.commands.base import UserID
+from src.database import AsyncPgDBManager, async_db_manager
+from src.repository.ownership_specification import ResourceOwnershipSpec
+from src.repository.storage_deletion_queue import StorageDeletionQueueRepository
+
+
+
+class ContentBlobRepository:
+    """
+        Metadata of the content addressed blobs. Each digest is stored once
+        and reference counted, a blob is queued for deletion when its last
+        reference is released.
+    """
+
+    tablename: ClassVar[str] = "content_blobs"
+
+    def __init__(self, db: Optional[AsyncPgDBManager] = None) -> None:
+        self.db = db or async_db_manager
+
+
+    async def acquire(self, digest: str, readable_by: Optional[UserID] = None) -> Optional[Record]:
+        """
+            Adds a reference to an existing blob. None if the digest is unknown.
+            With `readable_by`, only content that user can already read (a
+            ready resource they own) is claimed: knowing a digest is not a
+            proof of possession.
+        """
+        scope, values = "", (digest,)
+        if readable_by is not None:
+            scope = f"""
+                and exists (
+                    select 1 from resources as r
+                    where r.content_digest = $1 and r.status = 'ready' and r.deleted_at is null
+                    and {ResourceOwnershipSpec.owned_condition("r.id", "$2")}
+                )
+            """
+            values = (digest, readable_by)
+            
+        sql = f"""
+            update {self.tablename}
+            set
+                ref_count = ref_count + 1,
+                updated_at = now()
+            where
+                digest = $1 {scope}
+            returning *
+            ;
+        """
+        executable = self.db.query_builder.build_executable(sql, values=values)
+        return await self.db.execute(executable, fetch_returns="one")
+
+
+    async def register(
+        self,
+        digest: str,
+        object_key: str,
+        size: int,
+        content_type: Optional[str]
+    ) -> Record:
+        """
+            Records a freshly uploaded blob with one reference. If the same
+            digest was registered concurrently, the existing blob wins and
+            the uploaded copy is queued for deletion in the same statement.
+        """
+        sql = f"""
+            with blob as (
+                insert into {self.tablename}(digest, object_key, size, content_type, ref_count)
+                values ($1, $2, $3, $4, 1)
+                on conflict (digest) do update
+                set
+                    ref_count = {self.tablename}.ref_count + 1,
+                    updated_at = now()
+                returning *
+            ),
+            duplicate as (
+                insert into {StorageDeletionQueueRepository.tablename}(object_key)
+                select $2 from blob where blob.object_key <> $2
+                on conflict (object_key) do nothing
+            )
+            select * from blob
+            ;
+        """
+        executable = self.db.query_builder.build_executable(
+            sql, values=(digest, object_key, size, content_type)
+        )
+        return await self.db.execute(executable, fetch_returns="one")
+
+
+    async def release(self, digest: str) -> Optional[Record]:
+        """
+            Drops a reference. The blob row is removed and its object queued
+            for deletion when no reference is left. Returns the queued row.
+            
+            Runs as two statements in a transaction: the decrement locks the
+            row, so a concurrent acquire either happens before it or finds no
+            blob and uploads a new copy. (A single statement can't both update
+            and delete the same row.)
+        """
+        decrement = self.db.query_builder.build_executable(
+            f"""
+                update {self.tablename}
+                set
+                    ref_count = ref_count - 1,
+                    updated_at = now()
+                where
+                    digest = $1 and ref_count > 0
+                ;
+            """,
+            values=(digest,)
+        )
+        delete_orphan = self.db.query_builder.build_executable(
+            f"""
+                with orphan as (
+                    delete from {self.tablename}
+                    where digest = $1 and ref_count = 0
+                    returning object_key
+                )
+                insert into {StorageDeletionQueueRepository.tablename}(object_key)
+                select object_key from orphan
+                on conflict (object_key) do nothing
+                returning object_key
+                ;
+            """,
+            values=(digest,)
+        )
+        return await self.db.with_transaction([decrement, delete_orphan])
+
+
+    async def sweep_orphans(self, limit: int = 1000) -> int:
+        """
+            Removes the blobs left without references by bulk releases (e.g.
+            a cascade delete) and queues their objects for deletion. A
+            concurrent acquire locks the row first, the recheck skips it.
+        """
+        sql = f"""
+            with orphan as (
+                delete from {self.tablename}
+                where digest in (
+                    select digest from {self.tablename}
+                    where ref_count = 0
+                    limit $1
+                    for update skip locked
+                ) and ref_count = 0
+                returning object_key
+            )
+            insert into {StorageDeletionQueueRepository.tablename}(object_key)
+            select object_key from orphan
+            on conflict (object_key) do nothing
+            returning object_key
+            ;
+        """
+        executable = self.db.query_builder.build_executable(sql, values=(limit,))
+        rows = await self.db.execute(executable, fetch_returns="all")
+        return len(rows)
@@ -1,28 +1,47 @@
 import asyncio
+import json
 from asyncpg.protocol.record import Record
-from typing import Any, ClassVar, Literal, Optional, Type, Union, override
+from typing import Any, ClassVar, Literal, Optional, Sequence, Type, Union, override
 from src.query_builder.base import BaseExecutableSQL
-from src.repository.base import BaseRepository
+from src.repository.base import BaseRepository, Cascade
+from src.repository.modules import ModuleRepository
 from src.commands.courses import(
     Course, CourseCreate, CourseDelete, CourseGet,
     CourseInfoUpdate, RecordedCourseDetailsUpdate,
-    CourseType   
+    CourseType, THUMBNAIL_PREFIX
 )
 from src.repository.ownership_specification import BaseOwnershipSpec, CourseOwnershipSpec
+from src.repository.storage_deletion_queue import StorageDeletionQueueRepository
 
 
 
 class CourseRepository(BaseRepository[Course]):
          
     tablename: ClassVar[str] = "courses"
+    unique_columns: ClassVar[Sequence[str]] = ("title",)
+    cascades: ClassVar[Sequence[Cascade]] = (Cascade(ModuleRepository, "course_id"),)
+    # Only the keys issued for the course are queued, a thumbnail set before
+    # the course prefix could point to an object other rows still use.
+    storage_keys: ClassVar[Optional[str]] = (
+        "array(select k from unnest(array[thumbnail::text] || "
+        "array(select v.value from jsonb_each_text(coalesce(thumbnail_variants, '{}'::jsonb)) as v)) as k "
+        f"where k like '{THUMBNAIL_PREFIX}/' || id || '/%' and k !~ '(^|/)\\.{{1,2}}(/|$)')"
+    )
     _ownership_spec: ClassVar[Type[BaseOwnershipSpec]] = CourseOwnershipSpec
     
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.deletion_queue = StorageDeletionQueueRepository(self.db)
+        
     @override
     def _to_domain(self, row: Optional[Record]) -> Course:
         
         if not row:
             return None
         course = dict(row)
+        # There is no json codec on the pool, jsonb is returned as str.
+        if isinstance(course.get("thumbnail_variants"), str):
+            course["thumbnail_variants"] = json.loads(course["thumbnail_variants"])
         detail_columns = ["type", "price", "total_hours"] if course["type"] == CourseType.PRE_RECORDED.value else ["type"]
         details = {key: course[key] for key in detail_columns}    
 
@@ -30,12 +49,17 @@ class CourseRepository(BaseRepository[Course]):
     
     
     @override
-    async def add(self, cmd: CourseCreate) -> Course:
-        
+    def _insert_data(self, cmd: CourseCreate) -> dict[str, Any]:
         data = cmd.model_dump(exclude_none=True, exclude={"details", "trainer_id"})
         data.update(cmd.details.model_dump())
         data.update({"slug": cmd.get_slug(), "trainer_id": cmd.trainer_id})
-        executable = self.db.query_builder.build_insert(self.tablename, data)
+        return data
+    
+    
+    @override
+    async def add(self, cmd: CourseCreate) -> Course:
+        
+        executable = self.db.query_builder.build_insert(self.tablename, self._insert_data(cmd))
         
         course: Record = await self.db.execute(executable, fetch_returns="one")
         
@@ -49,50 +73,70 @@ class CourseRepository(BaseRepository[Course]):
         ]
     ) -> Optional[Course]:
         
-        return await super().update(cmd)
+        if not isinstance(cmd, CourseInfoUpdate) or cmd.thumbnail is None:
+            return await super().update(cmd)
         
-            
-  
-    @override
-    async def delete(self, cmd: CourseDelete) -> Optional[Course]:
-        data = cmd.model_dump(exclude={"id"})
-        data = self._add_audit_field(data, "delete")
-        print(data)
-    
-        executables: list[BaseExecutableSQL] = [
+        # A new thumbnail makes the variants stale, they are regenerated in background.
+        data = cmd.model_dump(exclude_none=True, exclude={"id"}, exclude_unset=True)
+        data = self._add_audit_field(data, "update")
+        data["thumbnail_variants"] = None
         
-            # self.db.query_builder.build_update(
-            #     "resources", data,
-            #     where_clause=self.db.query_builder.build_base_where(
-            #         condition="where module_id in (select id from modules where course_id = ($course_id) and deleted_at is null)",
-            #         values={"course_id": id},
-            #     ),
-            #     return_columns=None
-            # ),
-            
-            self.db.query_builder.build_update(
-                "modules", data,
-                where_clause = self.db.query_builder.build_where(
-                    column="course_id", value=cmd.id
-                )
+        executables: list[BaseExecutableSQL] = [
+            # Every generation writes new variant keys, the current ones are never reused.
+            self.deletion_queue.build_enqueue_from_select(
+                """
+                    select v.value from courses c, jsonb_each_text(c.thumbnail_variants) as v
+                    where c.id = $1
+                """,
+                values=(cmd.id,)
             ),
-            # We can use build_where, but for uniformity we go with this approach.
             self.db.query_builder.build_update(
                 self.tablename, data,
                 where_clause=self.db.query_builder.build_where_pk(cmd.id)
             )
         ]
+        # Independent statements, the enqueue reads the thumbnail from before the update anyway.
+        course: Optional[dict] = await self.db.with_transaction(executables, pipelined=True)
+        await self._publish_row_change(course)
         
-        for executable in executables:
-            print(executable.preview())
-            print("=="* 10)
-            print("\n")
-        
-        # # Handover to transaction.
-        course: Optional[Record] = await self.db.with_transaction(executables)
-
         return self._to_domain(course)
     
+    
+    async def set_thumbnail_variants(
+        self,
+        course_id: int,
+        thumbnail: str,
+        variants: dict[str, str]
+    ) -> bool:
+        """
+            Records the generated variants, only if the course still uses the
+            same thumbnail and has none recorded (an overwrite would orphan
+            the recorded keys). Returns False when the variants are outdated.
+        """
+        sql = f"""
+            update {self.tablename}
+            set
+                thumbnail_variants = $3::jsonb
+            where
+                id = $1 and thumbnail = $2 and thumbnail_variants is null and deleted_at is null
+            returning id
+            ;
+        """
+        executable = self.db.query_builder.build_executable(
+            sql, values=(course_id, thumbnail, json.dumps(variants))
+        )
+        row: Optional[Record] = await self.db.execute(executable, fetch_returns="one")
+        await self._publish_row_change(row)
+        return row is not None
+        
+            
+  
+    @override
+    async def delete(self, cmd: CourseDelete) -> Optional[Course]:
+        # Modules, their resources and every asset go in one statement, storage is not touched in the request.
+        result = await self.cascade_delete(cmd)
+        return self._to_domain(result.row)
+    
 
     async def get(self, query: CourseGet):
         return await super().get(query)
@@ -1,15 +1,24 @@
+from datetime import datetime
 from asyncpg.protocol.record import Record
-from typing import ClassVar, Optional, Type, override
-from src.repository.base import BaseRepository
+from typing import ClassVar, Optional, Sequence, Type, override
+from src.commands.base import CourseID, UserID
+from src.repository.base import BaseRepository, Cascade
 from src.commands.modules import Module, ModuleCreateWithPosition, ModuleDelete, ModuleGetQuery, ModuleUpdate, ReArrangeModule
 from src.repository.ownership_specification import BaseOwnershipSpec, ModuleOwnershipSpec
+from src.repository.resources import ResourceRepository
 
 
 class ModuleRepository(BaseRepository[Module]):
     
     tablename: ClassVar[str] = "modules"
+    unique_columns: ClassVar[Sequence[str]] = ("course_id", "title")
+    cascades: ClassVar[Sequence[Cascade]] = (
+        Cascade(ResourceRepository, "module_id"),
+        # If necessary we can unlink the connections.
+        # Cascade(LessonRepository, "module_id"),
+    )
     _ownership_spec: ClassVar[Type[BaseOwnershipSpec]] = ModuleOwnershipSpec
-
+    
     
     @override
     def _to_domain(self, row: Optional[Record]):
@@ -28,36 +37,79 @@ class ModuleRepository(BaseRepository[Module]):
     
     @override
     async def delete(self, cmd: ModuleDelete):
-        # Unlink the relationships.
-        data = cmd.model_dump(exclude={"id"})
-        data = self._add_audit_field(data, action="delete")
-        print(f"Delete payload is {data}")
-        
-        executables = [
-            
-            # If necessary we can unlink the connections.
-            
-            # self.db.query_builder.build_update(
-            #     "lessons",
-            #     data,
-            #     where_clause=self.db.query_builder.build_base_where(
-            #         condition="Where module_id = ($module_id) and deleted_at is Null",
-            #         values={"module_id": cmd.id}
-            #     )
-            # ),
-            self.db.query_builder.build_update(
-                self.tablename, data,
-                where_clause=self.db.query_builder.build_where_pk(cmd.id)
-            )
-            
-        ]
-        module = await self.db.with_transaction(executables, return_last=True)
-        return self._to_domain(module)
+        # Unlink the relationships, the resources (and their uploads) go with the module.
+        result = await self.cascade_delete(cmd)
+        return self._to_domain(result.row)
                 
                 
     async def get(self, query: ModuleGetQuery) -> Optional[Module]:
         return await super().get(query)
     
+    
+    async def list_by_course(
+        self, 
+        course_id: CourseID, 
+        owned_by: Optional[UserID] = None
+    ) -> list[Module]:
+        """
+            Returns the modules of a course in their display order. With
+            `owned_by`, only the modules that user owns, filtered in the
+            same query.
+        """
+        
+        if owned_by is None:
+            executable = self.db.query_builder.build_simple_select(
+                self.tablename,
+                where_clause=self.db.query_builder.build_base_where(
+                    condition="where course_id = ($course_id) and deleted_at is null order by position_string",
+                    values={"course_id": course_id}
+                )
+            )
+        else:
+            # The ownership select reuses the user placeholder, the where builder can't repeat one.
+            sql = f"""
+                select * from {self.tablename}
+                where 
+                    course_id = $1 and deleted_at is null 
+                    and {self._ownership_spec.owned_condition("id", "$2")}
+                order by position_string
+                ;
+            """
+            executable = self.db.query_builder.build_executable(sql=sql, values=(course_id, owned_by))
+        
+        modules: list[Record] = await self.db.execute_shared(executable, fetch_returns="all")
+        return [self._to_domain(module) for module in modules]
+    
+    
+    async def get_outline_version(self, course_id: CourseID) -> Optional[datetime]:
+        """
+            Returns the latest change in a course outline, including the
+            modules that were removed. None if the course does not exist.
+        """
+        
+        sql = """
+            select
+                greatest(
+                    coalesce(c.updated_at, c.created_at),
+                    max(coalesce(m.updated_at, m.created_at)),
+                    max(m.deleted_at)
+                ) as version
+            from 
+                courses as c
+            left join
+                modules as m
+            on 
+                m.course_id = c.id
+            where 
+                c.id = $1 and c.deleted_at is null
+            group by
+                c.id
+            ;
+        """
+        executable = self.db.query_builder.build_executable(sql, values=(course_id,))
+        row = await self.db.execute_shared(executable, fetch_returns="one")
+        return row["version"] if row else None
+    
 
 
 
@@ -0,0 +1,121 @@
+import time
+from typing import Callable, Hashable, NamedTuple, Optional
+from src.cache import TTLCache
+from src.invalidation import ALL_TABLES, InvalidationBus, InvalidationEvent, invalidation_bus
+from src.metrics import metrics
+from src.settings import settings
+
+
+
+class OwnershipDecision(NamedTuple):
+    owned: bool
+    scope: tuple[str, int] # (scope table, id) the decision depends on.
+    epoch: int # Invalidation epoch when the lookup started.
+
+
+
+class OwnershipCache:
+    """
+        Bounded cache of ownership decisions keyed by (spec, entity, user).
+
+        A decision only depends on its scope row: the course for courses,
+        modules and resources (a module never changes course), the user
+        itself for users. An invalidation of a scope evicts, in O(1), every
+        decision under it, e.g. changing the trainer of a course evicts the
+        decisions of all its modules and resources.
+    """
+
+    scope_tables: tuple[str, ...] = ("courses", "users")
+
+    def __init__(
+        self,
+        maxsize: int = 50_000,
+        ttl: float = 300.0,
+        bus: Optional[InvalidationBus] = None,
+        clock: Callable[[], float] = time.monotonic
+    ) -> None:
+
+        self._cache: TTLCache[tuple[Hashable, ...], OwnershipDecision] = TTLCache(maxsize=maxsize, ttl=ttl, clock=clock)
+        self.maxsize = maxsize
+        # Decisions looked up at or before these epochs are stale.
+        self._epoch = 0
+        self._cleared_at = -1
+        self._invalidated: dict[tuple[str, int], int] = {} # scope -> epoch
+
+        self._hits = metrics.counter("ownership_cache_hits_total", "Ownership checks answered from the cache.")
+        self._misses = metrics.counter("ownership_cache_misses_total", "Ownership checks sent to the database.")
+
+        if bus is not None:
+            self.subscribe(bus)
+
+
+    def subscribe(self, bus: InvalidationBus) -> None:
+        # Only the scope rows change a decision, the other tables are not watched.
+        for table in self.scope_tables:
+            bus.subscribe(table, self.on_invalidation)
+        # "*" handlers receive the events of every table, only the reconnect flush is kept.
+        bus.subscribe(ALL_TABLES, self._on_flush)
+
+
+    def begin(self) -> int:
+        """
+            Returns the epoch to store with a decision fetched afterwards. A
+            scope invalidated while the query runs makes that decision stale.
+        """
+        return self._epoch
+
+
+    def get(self, key: tuple[Hashable, ...]) -> Optional[bool]:
+        decision = self._cache.get(key)
+        if (
+            decision is None or 
+            decision.epoch <= self._cleared_at or 
+            self._invalidated.get(decision.scope, -1) >= decision.epoch
+        ):
+            self._misses.inc()
+            return None
+
+        self._hits.inc()
+        return decision.owned
+
+
+    def set(self, key: tuple[Hashable, ...], owned: bool, scope: tuple[str, int], epoch: int) -> None:
+        self._cache.set(key, OwnershipDecision(owned, scope, epoch))
+
+
+    def invalidate(self, table: str, scope_id: Optional[int]) -> None:
+        if scope_id is None or len(self._invalidated) >= self.maxsize:
+            self.clear()
+            return
+
+        self._invalidated[(table, scope_id)] = self._epoch
+        self._epoch += 1
+
+
+    def clear(self) -> None:
+        # The scopes tracked so far are all covered by the clear epoch.
+        self._cleared_at = self._epoch
+        self._epoch += 1
+        self._cache.clear()
+        self._invalidated.clear()
+
+
+    def on_invalidation(self, event: InvalidationEvent) -> None:
+        if event.table == ALL_TABLES:
+            self.clear()
+        elif event.table in self.scope_tables:
+            self.invalidate(event.table, event.id)
+        # Any other table leaves the decisions untouched.
+
+
+    def _on_flush(self, event: InvalidationEvent) -> None:
+        if event.table == ALL_TABLES:
+            self.clear()
+
+
+
+ownership_cache = OwnershipCache(
+    maxsize=settings.auth.ownership_cache_size,
+    ttl=settings.auth.ownership_cache_ttl,
+    bus=invalidation_bus
+)
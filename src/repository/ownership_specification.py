@@ -1,4 +1,4 @@
-from typing import Optional, Union
+from typing import ClassVar, Optional, Sequence, Union
 from abc import ABC, abstractmethod
 from src.commands.base import ID, UserID
 from src.database import AsyncPgDBManager, async_db_manager
@@ -21,34 +21,93 @@ class BaseOwnershipSpec(ABC):
         
     
     
+    # Select of the ids owned by the `{user}` placeholder, used by the set based checks.
+    owned_ids_sql: ClassVar[str]
+    # The table whose row decides the ownership, a change of that row changes the decision.
+    scope_table: ClassVar[str] = "courses"
+    
+    
     @abstractmethod
     def get_executable(self) -> BaseExecutableSQL:
-        """Returns the BaseExecutable sql to check ownership."""
+        """
+            Returns the BaseExecutable sql to check ownership, selecting
+            `owned` and `scope_id` for the entity, no row if it is missing.
+        """
+    
+    
+    @classmethod
+    def owned_condition(cls, column: str, user_placeholder: str) -> str:
+        """
+            SQL predicate keeping the rows whose `column` is owned by the
+            user, so list queries filter in the same statement.
+            e.g. owned_condition("m.id", "$2")
+        """
+        return f"{column} in ({cls.owned_ids_sql.format(user=user_placeholder)})"
+    
+    
+    @classmethod
+    async def filter_owned(
+        cls,
+        entity_ids: Sequence[ID],
+        user_id: UserID,
+        db: Optional[AsyncPgDBManager] = None
+    ) -> set[int]:
+        """Returns the subset of `entity_ids` owned by the user, in one query."""
+        if not entity_ids:
+            return set()
+        
+        db = db or async_db_manager
+        # The subquery is flattened by Postgres, the id filter is applied inside it.
+        sql = f"""
+            select
+                owned.id
+            from 
+                ({cls.owned_ids_sql.format(user="$2")}) as owned
+            where
+                owned.id = any($1::int[])
+            ;
+        """
+        executable = db.query_builder.build_executable(sql=sql, values=(list(entity_ids), user_id))
+        rows = await db.execute(executable, fetch_returns="all")
+        return {row["id"] for row in rows}
         
     
+    async def evaluate(self) -> Optional[tuple[bool, int]]:
+        """
+            Returns whether the user owns the entity, with the id of the
+            `scope_table` row the decision depends on. None when the entity
+            does not exist.
+        """
+        executable = self.get_executable()
+        res = await self.db.execute_shared(executable, fetch_returns="one")
+        if res is None:
+            return None
+        return bool(res["owned"]), res["scope_id"]
+    
+    
     async def is_satisfied(self) -> bool:
         # Not created as abstract method, since it hanldes in all 
         # subclasses and not necessary to repeat the same in subclass.
         """Checks for the ownership of an entity."""
-        executable = self.get_executable()
-        res = await self.db.execute(executable, fetch_returns="one")
-        return bool(res)
+        decision = await self.evaluate()
+        return decision is not None and decision[0]
         
 
 
 class UserOwnershipSpec(BaseOwnershipSpec):
     
+    owned_ids_sql = "select id from users where created_by = {user} or id = {user}"
+    scope_table = "users"
+    
     def get_executable(self):
         sql = """
             select  
-                1
+                id as scope_id,
+                (created_by = $2 or id = $3) as owned
             from 
                 users
             where 
-                id = $1 and (
-                    created_by = $2 or 
-                    id = $3
-                )
+                id = $1
         """
         return self.db.query_builder.build_executable(
             sql=sql,
@@ -59,17 +118,17 @@ class UserOwnershipSpec(BaseOwnershipSpec):
 
 class CourseOwnershipSpec(BaseOwnershipSpec):
     
+    owned_ids_sql = "select id from courses where trainer_id = {user} or manager_id = {user}"
+    
     def get_executable(self):
         sql = """
             select
-                1
+                id as scope_id,
+                (trainer_id = ($2) or manager_id = ($3)) as owned
             from 
                 courses
             where
-                (id = ($1)) and (
-                    trainer_id = ($2) or
-                    manager_id = ($3)
-                )
+                id = ($1)
             ;
         """
         return self.db.query_builder.build_executable(
@@ -81,10 +140,16 @@ class CourseOwnershipSpec(BaseOwnershipSpec):
         
 class ModuleOwnershipSpec(BaseOwnershipSpec):
     
+    owned_ids_sql = """
+        select m.id from modules as m join courses as c on c.id = m.course_id
+        where c.trainer_id = {user} or c.manager_id = {user}
+    """
+    
     def get_executable(self):
         sql = """
             select 
-                1
+                c.id as scope_id,
+                (c.trainer_id = $2 or c.manager_id = $3) as owned
             from 
                 modules as m
             join
@@ -92,10 +157,7 @@ class ModuleOwnershipSpec(BaseOwnershipSpec):
             on 
                 c.id = m.course_id
             where 
-                m.id = ($1) and (
-                    c.trainer_id = $2 or 
-                    c.manager_id = $3
-                )
+                m.id = ($1)
             ; 
         """
         return self.db.query_builder.build_executable(
@@ -106,3 +168,35 @@ class ModuleOwnershipSpec(BaseOwnershipSpec):
     
     
 
+class ResourceOwnershipSpec(BaseOwnershipSpec):
+    
+    owned_ids_sql = """
+        select r.id from resources as r 
+        join modules as m on m.id = r.module_id 
+        join courses as c on c.id = m.course_id
+        where c.trainer_id = {user} or c.manager_id = {user}
+    """
+    
+    def get_executable(self):
+        sql = """
+            select 
+                c.id as scope_id,
+                (c.trainer_id = $2 or c.manager_id = $3) as owned
+            from 
+                resources as r
+            join
+                modules as m
+            on 
+                m.id = r.module_id
+            join
+                courses as c
+            on 
+                c.id = m.course_id
+            where 
+                r.id = ($1)
+            ; 
+        """
+        return self.db.query_builder.build_executable(
+            sql=sql,
+            values=(self.entity_id, self.user_id, self.user_id)
+        )
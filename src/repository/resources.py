@@ -0,0 +1,221 @@
+from asyncpg.protocol.record import Record
+from typing import ClassVar, Optional, Sequence, Type, override
+from src.commands.base import ModuleID, UserID
+from src.commands.resources import Resource, ResourceDelete, ResourceFile, ResourceGet, ResourceStatus, ResourceUpdate
+from src.repository.base import BaseRepository
+from src.repository.ownership_specification import BaseOwnershipSpec, ResourceOwnershipSpec
+from src.repository.storage_deletion_queue import StorageDeletionQueueRepository
+
+
+
+class ResourceRepository(BaseRepository[Resource]):
+
+    tablename: ClassVar[str] = "resources"
+    # A deduplicated resource points to the shared blob object, the blob owns that key.
+    storage_keys: ClassVar[Optional[str]] = "case when content_digest is null then array[object_key::text] end"
+    blob_digest: ClassVar[Optional[str]] = "content_digest"
+    _ownership_spec: ClassVar[Type[BaseOwnershipSpec]] = ResourceOwnershipSpec
+
+
+    @override
+    def _to_domain(self, row: Optional[Record]) -> Optional[Resource]:
+        if row is None:
+            return None
+        return Resource(**row)
+
+
+    async def add(self, cmd: Resource) -> Resource:
+        return await super().add(cmd)
+
+
+    async def add_many(
+        self,
+        module_id: ModuleID,
+        files: Sequence[ResourceFile],
+        object_keys: Sequence[str],
+        created_by: UserID,
+        content_digests: Optional[Sequence[Optional[str]]] = None
+    ) -> list[Resource]:
+        """
+            Inserts the rows of a whole upload batch in one statement. Files
+            with a content digest (claimed blobs) are ready right away, the
+            others are pending. Nothing is inserted (empty list) when the
+            module does not exist.
+        """
+        digests = list(content_digests) if content_digests is not None else [None] * len(files)
+
+        sql = f"""
+            insert into {self.tablename}(
+                module_id, filename, content_type, size, sha256, object_key, content_digest, status, created_by
+            )
+            select
+                m.id, f.filename, f.content_type, f.size, f.sha256, f.object_key, f.content_digest,
+                case when f.content_digest is null then $2 else $8 end, $3
+            from
+                modules as m
+            cross join
+                unnest($4::text[], $5::text[], $6::bigint[], $7::text[], $9::text[], $10::text[])
+                    with ordinality as f(filename, content_type, size, object_key, sha256, content_digest, position)
+            where
+                m.id = $1 and m.deleted_at is null
+            order by
+                f.position
+            returning *
+            ;
+        """
+        executable = self.db.query_builder.build_executable(
+            sql,
+            values=(
+                module_id, ResourceStatus.PENDING.value, created_by,
+                [file.filename for file in files],
+                [file.content_type.value for file in files],
+                [file.size for file in files],
+                list(object_keys),
+                ResourceStatus.READY.value,
+                [file.sha256 for file in files],
+                digests
+            )
+        )
+        rows: list[Record] = await self.db.execute(executable, fetch_returns="all")
+
+        # Returning does not guarantee the order, map back through the filenames
+        # (unique within a batch, claimed files share the blob key).
+        by_filename = {row["filename"]: row for row in rows}
+        return [self._to_domain(by_filename[file.filename]) for file in files if file.filename in by_filename]
+
+
+    async def list_pending(self, module_id: ModuleID, ids: Sequence[int]) -> list[Resource]:
+        executable = self.db.query_builder.build_simple_select(
+            self.tablename,
+            where_clause=self.db.query_builder.build_base_where(
+                condition="""
+                    where module_id = ($module_id) and id = any(($ids)::int[])
+                    and status = ($status) and deleted_at is null
+                """,
+                values={"module_id": module_id, "ids": list(ids), "status": ResourceStatus.PENDING.value}
+            )
+        )
+        rows: list[Record] = await self.db.execute(executable, fetch_returns="all")
+        return [self._to_domain(row) for row in rows]
+
+
+    async def mark_ready(
+        self,
+        module_id: ModuleID,
+        ids: Sequence[int],
+        updated_by: UserID
+    ) -> list[Resource]:
+        "Flips the pending rows of a module to ready in one statement."
+
+        if not ids:
+            return []
+
+        sql = f"""
+            update {self.tablename}
+            set
+                status = $3,
+                updated_at = now(),
+                updated_by = $4
+            where
+                module_id = $1 and id = any($2::int[])
+                and status = $5 and deleted_at is null
+            returning *
+            ;
+        """
+        executable = self.db.query_builder.build_executable(
+            sql,
+            values=(module_id, list(ids), ResourceStatus.READY.value, updated_by, ResourceStatus.PENDING.value)
+        )
+        rows: list[Record] = await self.db.execute(executable, fetch_returns="all")
+        await self._publish_invalidation([row["id"] for row in rows])
+        return [self._to_domain(row) for row in rows]
+
+
+    async def attach_blob(self, resource_id: int, own_key: str, digest: str, blob_key: str) -> bool:
+        """
+            Points a ready resource to the verified blob of its content, the
+            uploaded object is queued for deletion in the same statement (the
+            blob is always another copy). False when the resource changed
+            meanwhile (deleted, already attached), the blob reference is then
+            the caller's to release.
+        """
+        sql = f"""
+            with attached as (
+                update {self.tablename}
+                set
+                    content_digest = $3,
+                    object_key = $4
+                where
+                    id = $1 and object_key = $2 and content_digest is null
+                    and status = $5 and deleted_at is null
+                returning id
+            ),
+            queued as (
+                insert into {StorageDeletionQueueRepository.tablename}(object_key)
+                select $2 from attached
+                on conflict (object_key) do nothing
+            )
+            select id from attached
+            ;
+        """
+        executable = self.db.query_builder.build_executable(
+            sql, values=(resource_id, own_key, digest, blob_key, ResourceStatus.READY.value)
+        )
+        row: Optional[Record] = await self.db.execute(executable, fetch_returns="one")
+        if row is None:
+            return False
+        await self._publish_invalidation([row["id"]])
+        return True
+
+
+    async def expire_pending(self, older_than: float, limit: int = 1000) -> int:
+        """
+            Soft deletes the pending rows never completed within `older_than`
+            seconds and queues their (possibly partial) objects for deletion
+            in the same statement. Returns the expired count.
+        """
+        sql = f"""
+            with expired as (
+                update {self.tablename}
+                set
+                    deleted_at = now()
+                where
+                    id in (
+                        select id from {self.tablename}
+                        where status = $1 and deleted_at is null
+                        and created_at < now() - make_interval(secs => $2)
+                        limit $3
+                        for update skip locked
+                    )
+                    and status = $1 and deleted_at is null
+                returning id, object_key
+            ),
+            queued as (
+                insert into {StorageDeletionQueueRepository.tablename}(object_key)
+                select object_key from expired
+                on conflict (object_key) do nothing
+            )
+            select id from expired
+            ;
+        """
+        executable = self.db.query_builder.build_executable(
+            sql, values=(ResourceStatus.PENDING.value, older_than, limit)
+        )
+        rows: list[Record] = await self.db.execute(executable, fetch_returns="all")
+        await self._publish_invalidation([row["id"] for row in rows])
+        return len(rows)
+
+
+    async def update(self, cmd: ResourceUpdate) -> Optional[Resource]:
+        return await super().update(cmd)
+
+
+    @override
+    async def delete(self, cmd: ResourceDelete) -> Optional[Resource]:
+        # The object is queued for cleanup in the same statement, storage is not touched in the request.
+        result = await self.cascade_delete(cmd)
+        return self._to_domain(result.row)
+
+
+    async def get(self, query: ResourceGet) -> Optional[Resource]:
+        return await super().get(query)
@@ -0,0 +1,112 @@
+from typing import ClassVar, Mapping, Optional, Sequence
+from asyncpg.protocol.record import Record
+from src.database import AsyncPgDBManager, async_db_manager
+from src.query_builder.base import BaseExecutableSQL
+
+
+
+class StorageDeletionQueueRepository:
+    """
+        Postgres backed queue of object storage keys to delete. Keys are
+        claimed with a lease (FOR UPDATE SKIP LOCKED), so several workers can
+        drain the queue without deleting the same key twice.
+    """
+
+    tablename: ClassVar[str] = "storage_deletion_queue"
+
+    def __init__(self, db: Optional[AsyncPgDBManager] = None) -> None:
+        self.db = db or async_db_manager
+
+
+    def build_enqueue_from_select(self, select_sql: str, values: tuple) -> BaseExecutableSQL:
+        """
+            Returns an executable that enqueues the keys returned by a select.
+            Meant to be added to a delete transaction, so the cleanup is
+            recorded atomically with the delete without waiting for storage.
+        """
+        sql = f"""
+            insert into {self.tablename}(object_key)
+            select
+                key
+            from
+                ({select_sql}) as t(key)
+            where
+                key is not null
+            on conflict (object_key) do nothing
+            ;
+        """
+        return self.db.query_builder.build_executable(sql, values=values)
+
+
+    async def enqueue(self, keys: Sequence[str]) -> None:
+        if not keys:
+            return
+
+        executable = self.build_enqueue_from_select(
+            "select unnest($1::text[])", values=(list(keys),)
+        )
+        await self.db.execute(executable, fetch_returns="none")
+
+
+    async def claim(self, limit: int, lease_seconds: float) -> list[str]:
+        """
+            Claims up to `limit` due keys. They are hidden from other workers
+            until the lease expires, then retried if not completed.
+        """
+        sql = f"""
+            update {self.tablename}
+            set
+                attempts = attempts + 1,
+                next_attempt_at = now() + make_interval(secs => $2)
+            where
+                object_key in (
+                    select
+                        object_key
+                    from
+                        {self.tablename}
+                    where
+                        next_attempt_at <= now()
+                    order by
+                        next_attempt_at
+                    limit $1
+                    for update skip locked
+                )
+            returning object_key
+            ;
+        """
+        executable = self.db.query_builder.build_executable(sql, values=(limit, lease_seconds))
+        rows: list[Record] = await self.db.execute(executable, fetch_returns="all")
+        return [row["object_key"] for row in rows]
+
+
+    async def complete(self, keys: Sequence[str]) -> None:
+        if not keys:
+            return
+
+        executable = self.db.query_builder.build_executable(
+            f"delete from {self.tablename} where object_key = any($1::text[]);",
+            values=(list(keys),)
+        )
+        await self.db.execute(executable, fetch_returns="none")
+
+
+    async def fail(self, failures: Mapping[str, str], max_backoff_seconds: float = 3600) -> None:
+        "Records the errors and backs off exponentially on the attempts."
+        if not failures:
+            return
+
+        sql = f"""
+            update {self.tablename} as q
+            set
+                last_error = f.error,
+                next_attempt_at = now() + make_interval(secs => least(power(2, q.attempts), $3))
+            from
+                unnest($1::text[], $2::text[]) as f(key, error)
+            where
+                q.object_key = f.key
+            ;
+        """
+        executable = self.db.query_builder.build_executable(
+            sql, values=(list(failures.keys()), list(failures.values()), max_backoff_seconds)
+        )
+        await self.db.execute(executable, fetch_returns="none")
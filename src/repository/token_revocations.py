@@ -0,0 +1,88 @@
+from typing import ClassVar, Optional
+from asyncpg.protocol.record import Record
+from src.commands.base import UserID
+from src.database import AsyncPgDBManager, async_db_manager
+from src.query_builder.base import BaseExecutableSQL
+from src.settings import settings
+
+
+
+class TokenRevocationRepository:
+    """
+        Revoked access tokens, by token id or by user epoch (every token of
+        the user issued before a moment). Rows are only kept until the
+        tokens they cover have expired.
+    """
+
+    tablename: ClassVar[str] = "token_revocations"
+
+    def __init__(
+        self,
+        db: Optional[AsyncPgDBManager] = None,
+        retention_seconds: Optional[float] = None
+    ) -> None:
+        self.db = db or async_db_manager
+        # At least the lifetime of an access token.
+        self.retention_seconds = retention_seconds or (settings.auth.access_token_ttl + settings.auth.leeway)
+
+
+    def build_revoke_user(self, user_id: UserID) -> BaseExecutableSQL:
+        """
+            Returns an executable that revokes every token issued to the
+            user so far. Meant to be added to the transaction of the change
+            (delete, role change) that makes the tokens invalid.
+        """
+        sql = f"""
+            insert into {self.tablename}(user_id, not_before, expires_at)
+            values ($1, now(), now() + make_interval(secs => $2))
+            ;
+        """
+        return self.db.query_builder.build_executable(sql, values=(user_id, self.retention_seconds))
+
+
+    async def revoke_user(self, user_id: UserID) -> None:
+        await self.db.execute(self.build_revoke_user(user_id), fetch_returns="none")
+
+
+    async def revoke_token(self, token_id: str, expires_at: float) -> None:
+        sql = f"""
+            insert into {self.tablename}(token_id, expires_at)
+            values ($1, to_timestamp($2))
+            ;
+        """
+        executable = self.db.query_builder.build_executable(sql, values=(token_id, expires_at))
+        await self.db.execute(executable, fetch_returns="none")
+
+
+    async def changes_since(self, last_id: int, overlap_seconds: float) -> list[Record]:
+        """
+            Returns the live revocations added after `last_id`. Identities are
+            not committed in order, so the recent rows are read again too,
+            a row committed late behind a higher id is never missed.
+        """
+        sql = f"""
+            select
+                id,
+                token_id,
+                user_id,
+                extract(epoch from not_before)::float8 as not_before,
+                extract(epoch from expires_at)::float8 as expires_at
+            from
+                {self.tablename}
+            where
+                (id > $1 or created_at > now() - make_interval(secs => $2))
+                and expires_at > now()
+            order by
+                id
+            ;
+        """
+        executable = self.db.query_builder.build_executable(sql, values=(last_id, overlap_seconds))
+        return await self.db.execute(executable, fetch_returns="all")
+
+
+    async def prune(self) -> None:
+        executable = self.db.query_builder.build_executable(
+            f"delete from {self.tablename} where expires_at < now() - interval '1 hour';",
+            values=()
+        )
+        await self.db.execute(executable, fetch_returns="none")
@@ -1,10 +1,12 @@
 import asyncio
-from typing import ClassVar, Optional, Union, Literal, override
+from typing import ClassVar, Iterable, Mapping, Optional, Sequence, Union, Literal, override
 from asyncpg.protocol.record import Record
+from src.commands.base import UserID, any_id_adaptor
 from src.commands.users import UserCreate, UserDelete, UserGetByEmail, UserGetByID, PasswordUpdate, User
 from src.query_builder.asyncpg import AsyncPgWhere
-from src.repository.base import BaseRepository
+from src.repository.base import BaseRepository, Cascade
 from src.repository.ownership_specification import BaseOwnershipSpec, UserOwnershipSpec
+from src.repository.token_revocations import TokenRevocationRepository
 
 
 
@@ -12,8 +14,17 @@ from src.repository.ownership_specification import BaseOwnershipSpec, UserOwners
 class UserRespository(BaseRepository[User]):
     
     tablename: ClassVar[str] = "users"
+    unique_columns: ClassVar[Sequence[str]] = ("email",)
+    cascades: ClassVar[Sequence[Cascade]] = (
+        # Cascade(EnrollmentRepository, "user_id"),
+        # Cascade(ProfileRepository, "user_id"),
+    )
     _ownership_spec: ClassVar[BaseOwnershipSpec] = UserOwnershipSpec
     
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.revocations = TokenRevocationRepository(self.db)
+    
     
     @override
     def _to_domain(self, row: Optional[Record]) -> Optional[User]:
@@ -29,15 +40,21 @@ class UserRespository(BaseRepository[User]):
     @override
     async def update(self, cmd: PasswordUpdate) -> Optional[User]:
                 
+        where_clause = self.db.query_builder.build_where(column="email", value=cmd.email)
+        if cmd.expected_password is not None:
+            where_clause = self.db.query_builder.build_base_where(
+                condition="where email = ($email) and password = ($expected_password) and deleted_at is null",
+                values={"email": cmd.email, "expected_password": cmd.expected_password}
+            )
+        
         executable = self.db.query_builder.build_update(
             self.tablename,
             self._add_audit_field({"password": cmd.new_password}, "update"),
-            where_clause=self.db.query_builder.build_where(
-                column="email", value=cmd.email
-            )
+            where_clause=where_clause
         )
         
         user = await self.db.execute(executable, fetch_returns="one")
+        await self._publish_row_change(user)
         
         return self._to_domain(user)
         
@@ -45,42 +62,21 @@ class UserRespository(BaseRepository[User]):
     @override
     async def delete(self, cmd: UserDelete) -> Optional[User]:
         
-        # Soft delete from all linked tables.
+        # Soft delete from all linked tables, see `cascades`.
         data = cmd.model_dump(exclude="id")
         data = self._add_audit_field(data, "delete")
         
-        # Where clause associated with user id.
-        where_clause = self.db.query_builder.build_where(
-            column="user_id", value=cmd.id
-        )
-        
         executables = [
-            # Delete the enrollement first.
-            # self.db.query_builder.build_update(
-            #     "enrollments", data,
-            #     where_clause=where_clause
-            # ),
-            
-            # Delete the profile.
-            # self.db.query_builder.build_update(
-            #     "profiles", data,
-            #     where_clause=where_clause
-            # ),
-            
-            self.db.query_builder.build_update(
-                self.tablename, data,
-                where_clause=self.db.query_builder.build_where_pk(cmd.id)
-            )    
+            # The tokens already issued to the user must stop working now.
+            self.revocations.build_revoke_user(cmd.id),
+            self.build_cascade_delete(cmd.id, data)
         ] 
-        
-        for executable in executables:
-            print(executable.preview())
-            print("=="*10)
-            print("\n")
             
-        user = await self.db.with_transaction(executables)
+        result = self._to_cascade_result(await self.db.with_transaction(executables))
+        await self._publish_cascade(result)
+        await self._publish_invalidation([None], tablename=self.revocations.tablename)
         
-        return self._to_domain(user)
+        return self._to_domain(result.row)
     
     
     @override
@@ -96,7 +92,67 @@ class UserRespository(BaseRepository[User]):
             )
         )
         
-        user = await self.db.execute(executable, fetch_returns="one")
+        user = await self.db.execute_shared(executable, fetch_returns="one")
 
         return self._to_domain(user)
     
+    
+    
+    async def validate_roles(
+        self,
+        checks: Sequence[tuple[UserID, str]],
+        virtual_roles: Mapping[str, Iterable[str]]
+    ) -> list[Optional[bool]]:
+        """
+            Checks many (user_id, role) pairs in one query. A virtual role is
+            expanded in SQL to the roles it stands for. Returns, in order,
+            None when the user does not exist, otherwise whether it has the role.
+        """
+        if not checks:
+            return []
+        
+        user_ids = [any_id_adaptor.validate_python(user_id) for user_id, _ in checks]
+        roles = [str(role) for _, role in checks]
+        # One (virtual, actual) row per expansion.
+        pairs = [(name, str(role)) for name, expanded in virtual_roles.items() for role in expanded]
+        
+        sql = f"""
+            with checks as (
+                select * from unnest($1::int[], $2::text[]) with ordinality as c(user_id, role, ord)
+            ),
+            expanded as (
+                select 
+                    c.ord, coalesce(v.role, c.role) as role
+                from 
+                    checks as c
+                left join
+                    unnest($3::text[], $4::text[]) as v(name, role)
+                on
+                    v.name = c.role
+            )
+            select
+                c.ord,
+                u.id as user_id,
+                coalesce(bool_or(u.role::text = e.role), false) as is_valid
+            from 
+                checks as c
+            join
+                expanded as e
+            on
+                e.ord = c.ord
+            left join
+                {self.tablename} as u
+            on
+                u.id = c.user_id and u.deleted_at is null
+            group by
+                c.ord, u.id
+            order by 
+                c.ord
+            ;
+        """
+        executable = self.db.query_builder.build_executable(
+            sql=sql,
+            values=(user_ids, roles, [name for name, _ in pairs], [role for _, role in pairs])
+        )
+        rows = await self.db.execute(executable, fetch_returns="all")
+        return [None if row["user_id"] is None else row["is_valid"] for row in rows]
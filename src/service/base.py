@@ -1,15 +1,29 @@
+import contextlib
 import inspect
 from functools import wraps
-from typing import Any, Callable, Literal, Optional, Type, ClassVar, TypeVar, ParamSpec
+from typing import Any, Callable, Iterator, Literal, Optional, Sequence, Type, ClassVar, TypeVar, ParamSpec
 from abc import ABC, abstractmethod
+from asyncpg.exceptions import UniqueViolationError
 from pydantic import BaseModel
-from src.exceptions import EntityNotFoundError, UnauthorizedError, InvalidRoleError, UserNotFoundError, ValidationError
+from src.exceptions import (
+    AlreadyExistsError, CourseAlreadyExistsError, CourseModuleAlreadyExistsError, EntityNotFoundError, 
+    InvalidRoleError, UnauthorizedError, UserAlreadyExistsError, UserNotFoundError, ValidationError
+)
 from src.repository.base import BaseRepository, ReorderParicipants
-from src.service.permission_policy import Action, Entity, PermissionPolicy, UserRole, UserRoleOrVirtual
+from src.service.permission_policy import Action, Decision, Entity, PermissionPolicy, UserRoleOrVirtual, VIRTUAL_ROLES
 from src.repository.users import UserRespository
 from src.commands.users import UserGetByID
 from src.commands.base import UserID, ReArrangeBase
 from src.service.fractional_index import fractional_index
+from src.service.tokens import current_principal
+
+
+# Partial unique indexes (see the migrations) and the error raised when a write violates them.
+UNIQUE_CONSTRAINTS: dict[str, tuple[Type[AlreadyExistsError], str]] = {
+    "users_email_live_key": (UserAlreadyExistsError, "email"),
+    "courses_title_live_key": (CourseAlreadyExistsError, "title"),
+    "modules_course_id_title_live_key": (CourseModuleAlreadyExistsError, "title"),
+}
 
 
 E = TypeVar("E", bound=EntityNotFoundError)
@@ -26,55 +40,61 @@ def require_access(
     obj_name: Literal["cmd", "query"] = "cmd" # type: ignore
     ):
         
+    requires_entity = action != Action.CREATE
+    
     def dec(func: Callable[P, R]) -> Callable[P, R]:
-        # Get the function signature only once.
-        sig = inspect.signature(func)
+        # Resolve where the object is passed once, instead of binding the signature per call.
+        parameters = list(inspect.signature(func).parameters)
+        if obj_name not in parameters:
+            raise ValueError(f"Argument {obj_name} was not found in {func.__qualname__} signature.")
+        position = parameters.index(obj_name) - 1 # Without self.
+        
+        # The (entity, action) column of the decision table, per service class.
+        columns: dict[type, int] = {}
+        
         @wraps(func)
         async def wrapper(self: BaseService, *args: P.args, **kwargs: P.kwargs) -> R:
-            # Bind the parameter to this wrapper function.
-            bound_arguments = sig.bind(self, *args, **kwargs)
-            bound_arguments.apply_defaults()
-            
-            # Check the obj_name is found in function signature as parameter.
-            obj = bound_arguments.arguments.get(obj_name)
+            obj = args[position] if position < len(args) else kwargs.get(obj_name)
             if obj is None:
                 raise ValueError(f"Argument {obj_name} was not found in function call.")
             
             # Get the enities from the object.
             user_id = getattr(obj, user_id_alias, None)
-            entity_id = getattr(obj, entity_id_alias or "", None)
+            entity_id = getattr(obj, entity_id_alias, None) if entity_id_alias else None
             
-    
             # Check the action Type.
             if user_id is None:
                 raise AttributeError(f"The object {obj_name} is missing required attribute '{user_id_alias}'")
-            if action != Action.CREATE and entity_id is None:
+            if requires_entity and entity_id is None:
                 raise AttributeError(f"The object {obj_name} is missing required attribute {entity_id_alias} to check permission.")
             
-            # Now check the user is exist to perform the action.
-            actor = await self.user_repo.get(UserGetByID(id=user_id))
-            if not actor:
-                raise UnauthorizedError()
+            # The verified token already carries the role of the request user.
+            principal = current_principal.get()
+            if principal is not None and principal.user_id == user_id:
+                role = principal.role
+            else:
+                # Now check the user is exist to perform the action.
+                actor = await self.user_repo.get(UserGetByID(id=user_id))
+                if not actor:
+                    raise UnauthorizedError()
+                role = actor.role
             
-            if actor.role == UserRole.ADMIN:
-                return await func(self, *args, **kwargs)
+            column = columns.get(type(self))
+            if column is None:
+                column = columns[type(self)] = self.permission_policy.column(self._entity, action)
             
-            policy = self.permission_policy.get_policy(actor.role, self._entity)
-            if not policy.allows(action):
+            decision = self.permission_policy.decide(role, column)
+            if decision == Decision.DENY:
                 raise UnauthorizedError()
             
             # This self.repo refers actual entity's repo. 
             # it may be course, enrollement based on runtime.
             
             # Choose which repo to use to check the ownership.
-            repo = parent_repo if parent_repo is not None else self.repo
-            if (
-                    (policy.scope == "specific") and 
-                    (not await repo.verify_ownership(entity_id=entity_id, user_id=user_id)
-                    
-                )
-            ): 
-                raise UnauthorizedError()
+            if decision == Decision.ALLOW_OWNED:
+                repo = parent_repo if parent_repo is not None else self.repo
+                if not await repo.verify_ownership(entity_id=entity_id, user_id=user_id):
+                    raise UnauthorizedError()
             
             return await func(self, *args, **kwargs)
  
@@ -104,6 +124,24 @@ class BaseService[T](ABC):
         self.permission_policy = permission_policy or PermissionPolicy()
 
 
+    @staticmethod
+    @contextlib.contextmanager
+    def map_unique_violation(cmd: BaseModel) -> Iterator[None]:
+        """
+            Raises the matching AlreadyExistsError when a write inside the
+            block violates one of the UNIQUE_CONSTRAINTS, e.g. renaming a
+            course to the title of another live course.
+        """
+        try:
+            yield
+        except UniqueViolationError as e:
+            mapping = UNIQUE_CONSTRAINTS.get(e.constraint_name)
+            if mapping is None:
+                raise
+            exc, identifier = mapping
+            raise exc(value=getattr(cmd, identifier, None), identifier=identifier) from e
+
+
     def _require_entity(self, entity: Optional[T], **error_kwargs) -> T:
         """
             Helper function that return the entity if not None. 
@@ -114,32 +152,33 @@ class BaseService[T](ABC):
         return entity
           
     
+    async def validate_roles(
+        self,
+        checks: Sequence[tuple[UserRoleOrVirtual, UserID]]
+    ) -> None:
+        """
+            Validates the role of several users with a single query, raises
+            for the first pair that fails, in the given order.
+        """
+        results = await self.user_repo.validate_roles(
+            [(user_id, role) for role, user_id in checks], VIRTUAL_ROLES
+        )
+        
+        for (role, user_id), is_valid in zip(checks, results, strict=True):
+            if is_valid is None:
+                raise UserNotFoundError(
+                    value=user_id, identifier="id", alias=role
+                )
+            if not is_valid:
+                raise InvalidRoleError(role)
+    
+    
     async def validate_role(
         self,
         role: UserRoleOrVirtual,
         user_id: UserID
     ) -> None:
-
-        exc = InvalidRoleError(role)
-        user = await self.user_repo.get(UserGetByID(id=user_id))
-        if user is None:
-            raise UserNotFoundError(
-                value=user_id, identifier="id", alias=role
-            )
-    
-        # Virtual role mappings.
-        virtual_role_mappings = {
-            "manager": {UserRole.SUBADMIN, UserRole.TRAINER}
-        }
-          
-        if role in virtual_role_mappings:
-            is_valid = user.role in virtual_role_mappings[role]
-            
-        else:
-            is_valid = user.role == role
-            
-        if not is_valid:
-            raise exc
+        await self.validate_roles([(role, user_id)])
        
        
     async def generate_position_string(self, **scope_kwargs: dict[str, Any]) -> str:
@@ -0,0 +1,113 @@
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+from asyncpg.protocol.record import Record
+from src.commands.base import UserID
+from src.exceptions import ChecksumMismatchError
+from src.repository.content_blobs import ContentBlobRepository
+from src.repository.storage_deletion_queue import StorageDeletionQueueRepository
+from src.service.files import BaseObjectStorageService, ByteSource
+
+
+
+@dataclass
+class StoredBlob:
+    digest: str
+    object_key: str
+    size: int
+    content_type: Optional[str]
+    deduplicated: bool # True when no new object was stored.
+
+    @classmethod
+    def from_record(cls, row: Record, deduplicated: bool) -> "StoredBlob":
+        return cls(
+            digest=row["digest"],
+            object_key=row["object_key"],
+            size=row["size"],
+            content_type=row["content_type"],
+            deduplicated=deduplicated
+        )
+
+
+
+class ContentStore:
+    """
+        Content addressed layer over the object storage. Content is hashed
+        while it is streamed, every digest is stored once and shared by all
+        the references to it (the same PDF uploaded to many courses).
+
+        Objects are stored under a random key instead of the digest itself,
+        so a blob deleted after its last release can never remove a newer
+        upload of the same content.
+    """
+
+    def __init__(
+        self,
+        storage: BaseObjectStorageService,
+        repo: Optional[ContentBlobRepository] = None,
+        deletion_queue: Optional[StorageDeletionQueueRepository] = None,
+        prefix: str = "blobs"
+    ) -> None:
+        self.storage = storage
+        self.repo = repo or ContentBlobRepository()
+        self.deletion_queue = deletion_queue or StorageDeletionQueueRepository(self.repo.db)
+        self.prefix = prefix
+
+
+    async def claim(self, digest: str, readable_by: Optional[UserID] = None) -> Optional[StoredBlob]:
+        """
+            Adds a reference to already stored content, so a client that
+            knows the digest skips the upload. With `readable_by`, only
+            content that user can already read is claimed.
+        """
+        row = await self.repo.acquire(digest.lower(), readable_by=readable_by)
+        return StoredBlob.from_record(row, deduplicated=True) if row else None
+
+
+    async def put(
+        self,
+        source: ByteSource,
+        content_type: Optional[str] = None,
+        expected_digest: Optional[str] = None
+    ) -> StoredBlob:
+        """
+            Stores the content once per digest and returns a new reference.
+            The stream is always read: the digest is computed from the bytes,
+            a declared one is only checked, never trusted.
+        """
+
+        object_key = f"{self.prefix}/{uuid.uuid4().hex}"
+        result = await self.storage.upload_stream(object_key, source, content_type=content_type)
+
+        if expected_digest and result.sha256 != expected_digest.lower():
+            await self.deletion_queue.enqueue([object_key])
+            raise ChecksumMismatchError()
+
+        row = await self.repo.register(result.sha256, object_key, result.size, content_type)
+        # Someone stored the same content first, our copy is already queued for deletion.
+        return StoredBlob.from_record(row, deduplicated=row["object_key"] != object_key)
+
+
+    async def adopt(
+        self,
+        object_key: str,
+        expected_digest: str,
+        content_type: Optional[str] = None
+    ) -> Optional[StoredBlob]:
+        """
+            Registers an object uploaded directly to the storage (presigned
+            URL) as a blob. The bytes are copied under a fresh blob key while
+            they are hashed: the uploaded key stays writable by its client
+            until the URL expires, so it is never shared. None when they
+            don't match `expected_digest`. The uploaded object is left to the
+            caller, which must switch its reference to the returned blob.
+        """
+        try:
+            return await self.put(self.storage.stream_object(object_key), content_type, expected_digest)
+        except ChecksumMismatchError:
+            return None
+
+
+    async def release(self, digest: str) -> None:
+        "Drops a reference, the object is deleted in background after the last one."
+        await self.repo.release(digest.lower())
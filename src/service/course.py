@@ -1,11 +1,19 @@
-import asyncio
+import uuid
+from datetime import datetime
 from typing import Type, Union, Optional, override
 from src.service.base import BaseService, require_access
-from src.commands.courses import Course, CourseCreate, CourseDelete, CourseGet, CourseInfoUpdate, RecordedCourseDetailsUpdate, CourseGetByIDQuery
+from src.commands.courses import (
+    Course, CourseCreate, CourseDelete, CourseGet, CourseInfoUpdate, RecordedCourseDetailsUpdate, CourseGetByIDQuery,
+    CourseThumbnailUpload, CourseThumbnailUploadURL, THUMBNAIL_PREFIX, is_course_thumbnail_key
+)
 from src.repository.courses import CourseRepository
 from src.service.permission_policy import Entity, PermissionPolicy
-from src.exceptions import EntityNotFoundError, CourseNotFoundError, CourseAlreadyExistsError
+from src.exceptions import (
+    EntityNotFoundError, CourseNotFoundError, CourseAlreadyExistsError, InvalidThumbnailError, ResourceNotFoundError
+)
 from src.repository.users import UserRespository
+from src.service.files import AllowdeContentTypes, BaseObjectStorageService, FileMetadata, PRESIGNED_URL_EXPIRE_MINS
+from src.service.thumbnails import ThumbnailGenerator, pick_variant
 
 
 
@@ -19,27 +27,38 @@ class CourseService(BaseService[Course]):
         self, 
         user_repo: Optional[UserRespository] = None, # For user permissions.
         permission_policy: PermissionPolicy = None,
-        repo: Optional[CourseRepository] = None
+        repo: Optional[CourseRepository] = None,
+        thumbnail_generator: Optional[ThumbnailGenerator] = None,
+        storage: Optional[BaseObjectStorageService] = None,
+        upload_expire_mins: int = PRESIGNED_URL_EXPIRE_MINS
     ) -> None:
         
         super().__init__(user_repo, permission_policy)
         self.repo = repo or CourseRepository()
+        self.thumbnail_generator = thumbnail_generator
+        self.storage = storage
+        self.upload_expire_mins = upload_expire_mins
+        
+    
+    def _schedule_thumbnail_variants(self, course: Optional[Course]) -> None:
+        if course and self.thumbnail_generator:
+            self.thumbnail_generator.schedule(course.id, course.thumbnail)
         
         
         
     @require_access(action="create", user_id_alias="created_by")
     @override
     async def create(self, cmd: CourseCreate):
-        # Check the course is alraedy exist with the given title.
-        if await self.repo.exists_by(title=cmd.title): 
-            raise CourseAlreadyExistsError(value=cmd.title, identifier="title")
-        
-        await asyncio.gather(
-                self.validate_role("trainer", cmd.trainer_id),
-                self.validate_role("manager", cmd.manager_id)
-            )
+        # Thumbnail keys are issued per course, there is none before the course exists.
+        if cmd.thumbnail is not None:
+            raise InvalidThumbnailError()
+        await self.validate_roles([("trainer", cmd.trainer_id), ("manager", cmd.manager_id)])
         
-        course = await self.repo.add(cmd)
+        # No row back means a live course already has this title.
+        course = await self.repo.add_if_absent(cmd)
+        if course is None: 
+            raise CourseAlreadyExistsError(value=cmd.title, identifier="title")
+        self._schedule_thumbnail_variants(course)
         
         return course    
     
@@ -55,16 +74,24 @@ class CourseService(BaseService[Course]):
     ) -> Course:
         
         if isinstance(cmd, CourseInfoUpdate):
-            tasks = []
+            if cmd.thumbnail is not None and not is_course_thumbnail_key(cmd.id, cmd.thumbnail):
+                raise InvalidThumbnailError()
+            
+            checks = []
             if cmd.trainer_id is not None:
-                tasks.append(self.validate_role("trainer",  cmd.trainer_id))
+                checks.append(("trainer",  cmd.trainer_id))
             if cmd.manager_id is not None:
-                tasks.append(self.validate_role("manager", cmd.manager_id))
+                checks.append(("manager", cmd.manager_id))
         
-            # First execute the tasks to check for RoleError.
-            await asyncio.gather(*tuple(tasks))
+            # First check for RoleError, both users in one query.
+            await self.validate_roles(checks)
             
-            return await self.repo.update(cmd)
+            # A rename can collide with another live course.
+            with self.map_unique_violation(cmd):
+                course = await self.repo.update(cmd)
+            if cmd.thumbnail is not None:
+                self._schedule_thumbnail_variants(course)
+            return self._require_entity(course, value=cmd.id)
         
         course = await self.repo.update(cmd)
         return self._require_entity(course, value=cmd.id)
@@ -81,4 +108,45 @@ class CourseService(BaseService[Course]):
         course = await self.repo.get(CourseGet(id=query.id))
         return self._require_entity(course, value=query.id)
     
+    
+    @require_access(action="view", user_id_alias="viewer_id", entity_id_alias="id", obj_name="query")
+    async def get_version(self, query: CourseGetByIDQuery) -> datetime:
+        "Returns only the version of a course, used for conditional requests."
+        version = await self.repo.get_version(query.id)
+        return self._require_entity(version, value=query.id)
+    
+    
+    @require_access(action="view", user_id_alias="viewer_id", entity_id_alias="id", obj_name="query")
+    async def get_thumbnail_key(self, query: CourseGetByIDQuery, width: Optional[int] = None) -> str:
+        """
+            Returns the storage key of the course thumbnail. With a width, the
+            smallest generated variant that covers it is preferred.
+        """
+        course = self._require_entity(
+            await self.repo.get(CourseGet(id=query.id)), value=query.id
+        )
+        key = pick_variant(course.thumbnail, course.thumbnail_variants, width) if course.thumbnail else None
+        # A key outside the course prefix was not issued for it, it is never streamed.
+        if key is None or not is_course_thumbnail_key(course.id, key):
+            raise ResourceNotFoundError(message=f"Course '{query.id}' has no thumbnail.")
+        return key
+    
+    
+    @require_access(action="update", user_id_alias="updated_by", entity_id_alias="id")
+    async def request_thumbnail_upload(self, cmd: CourseThumbnailUpload) -> CourseThumbnailUploadURL:
+        """
+            Issues a thumbnail key under the course prefix with its presigned
+            upload URL. The key is then set as the thumbnail of the course.
+        """
+        if self.storage is None:
+            raise RuntimeError("CourseService has no storage to sign the thumbnail upload.")
+        self._require_entity(await self.repo.get_version(cmd.id), value=cmd.id)
+        
+        extension = "png" if cmd.content_type == AllowdeContentTypes.PNG else "jpg"
+        key = f"{THUMBNAIL_PREFIX}/{cmd.id}/{uuid.uuid4().hex}.{extension}"
+        [upload_url] = await self.storage.generate_presigned_urls(
+            [FileMetadata(filename=key, content_type=cmd.content_type, size=cmd.size)],
+            expire_mins=self.upload_expire_mins
+        )
+        return CourseThumbnailUploadURL(thumbnail=key, upload_url=upload_url)
 
@@ -1,17 +1,25 @@
 import os
 import asyncio
-from typing import Any, List, Optional, Union
+import base64
+import contextlib
+import hashlib
+from typing import Any, AsyncIterable, AsyncIterator, List, Optional, Protocol, Union
 from pathlib import Path
+from datetime import datetime
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import StrEnum
 from functools import lru_cache
-from src.settings import settings
+from src.settings import settings, AWSS3Settings
+from src.cache import TTLCache
+from src.service.signing import SigV4Signer
 
 # AWS SDK
 import aioboto3
+from aiobotocore.config import AioConfig
+from botocore.exceptions import ClientError
 from mypy_boto3_s3 import S3Client
-from mypy_boto3_s3.type_defs import DeleteObjectOutputTypeDef, DeleteTypeDef
+from mypy_boto3_s3.type_defs import DeleteTypeDef
 
 
 class AllowdeContentTypes(StrEnum):
@@ -30,6 +38,65 @@ class FileMetadata:
     
     
 
+class AsyncByteReader(Protocol):
+    "Anything with an async read, e.g. FastAPI's UploadFile."
+    async def read(self, size: int = -1) -> bytes: ...
+
+
+ByteSource = Union[AsyncByteReader, AsyncIterable[bytes]]
+
+
+@dataclass
+class DeleteResult:
+    deleted: list[str] = field(default_factory=list)
+    failed: dict[str, str] = field(default_factory=dict) # Key and the reason.
+
+
+@dataclass
+class ObjectInfo:
+    key: str
+    size: int
+    etag: str
+    last_modified: datetime
+    content_type: Optional[str] = None
+
+
+@dataclass
+class UploadResult:
+    key: str
+    size: int
+    sha256: str # Hex digest of the whole object, computed while streaming.
+    etag: Optional[str] = None
+
+
+
+async def iter_chunks(source: ByteSource, chunk_size: int) -> AsyncIterator[bytes]:
+    if hasattr(source, "read"):
+        while chunk := await source.read(chunk_size):
+            yield chunk
+    else:
+        async for chunk in source:
+            if chunk:
+                yield chunk
+
+
+
+async def iter_parts(source: ByteSource, part_size: int) -> AsyncIterator[bytes]:
+    """
+        Re-chunks a byte stream into parts of exactly `part_size` bytes,
+        except the last one. Only one part is buffered at a time.
+    """
+    buffer = bytearray()
+    async for chunk in iter_chunks(source, part_size):
+        buffer += chunk
+        while len(buffer) >= part_size:
+            yield bytes(buffer[:part_size])
+            del buffer[:part_size]
+    if buffer:
+        yield bytes(buffer)
+
+
+
 @dataclass
 class BaseObjectStorageService(ABC):
     
@@ -51,15 +118,42 @@ class BaseObjectStorageService(ABC):
     async def upload_file(self, *args, **kwargs) -> Any:
         """Used to upload a file directly to object storage"""
     
+    @abstractmethod
+    async def upload_stream(self, *args, **kwargs) -> UploadResult:
+        """Uploads an async byte stream with bounded memory."""
+    
+    @abstractmethod
+    async def stat_object(self, key: str) -> Optional[ObjectInfo]:
+        """Returns the metadata of an object, None if it does not exist."""
+    
+    @abstractmethod
+    def stream_object(
+        self, 
+        key: str, 
+        start: int = 0, 
+        end: Optional[int] = None,
+        chunk_size: int = 64 * 1024
+    ) -> AsyncIterator[bytes]:
+        """Streams the inclusive byte range of an object in chunks."""
+    
     @abstractmethod
     async def delete_files(self, *args, **kwargs) -> Any:
         "Used to delete a files from the object storage"
+    
+    async def open(self) -> None:
+        """Acquires long lived resources (clients, pools). Called once on startup."""
+    
+    async def close(self) -> None:
+        """Releases the resources acquired by open. Called once on shutdown."""
    
     
 
 # Global session configuration to connect with the Cloud Service.
 
 PRESIGNED_URL_EXPIRE_MINS = 120  # 2 Hour
+MIN_PART_SIZE = 5 * 1024 * 1024  # S3 minimum, except for the last part.
+MAX_PARTS = 10_000
+DELETE_BATCH_SIZE = 1000  # S3 delete_objects limit.
 
 @lru_cache
 def get_session() -> aioboto3.Session:
@@ -69,24 +163,94 @@ def get_session() -> aioboto3.Session:
         region_name=settings.aws.region.get_secret_value()
 )
 
+
+def get_client_config(aws: AWSS3Settings) -> AioConfig:
+    "Connection pool, keep-alive and retry settings of the S3 client."
+    return AioConfig(
+        max_pool_connections=aws.max_pool_connections,
+        tcp_keepalive=aws.tcp_keepalive,
+        connect_timeout=aws.connect_timeout,
+        read_timeout=aws.read_timeout,
+        retries={"max_attempts": aws.max_attempts, "mode": aws.retry_mode},
+        connector_args={"keepalive_timeout": aws.keepalive_timeout}
+    )
+    
+
 @dataclass
 class S3(BaseObjectStorageService):
     bucket: str
     session: aioboto3.Session
+    config: Optional[AioConfig] = None
+    endpoint_url: Optional[str] = None
+    signer: Optional[SigV4Signer] = None # Signs URLs locally, falls back to the client if None.
+    url_cache_size: int = 10_000
+    part_size: int = 8 * 1024 * 1024
+    max_concurrency: int = 4
+    _client: Optional[S3Client] = field(default=None, init=False, repr=False)
+    _exit_stack: Optional[contextlib.AsyncExitStack] = field(default=None, init=False, repr=False)
+    _url_cache: TTLCache[tuple[str, int], str] = field(init=False, repr=False)
     
     # NOTE: All the filenames refers the Key, So Appropriate Service eg. LessonService
     # AssignmentService handles adding the prefix to the filename.
     # For example. filename="assignments/{Nagarjun}/{Assignment1.pdf}"
     
+    def __post_init__(self) -> None:
+        self._url_cache = TTLCache(maxsize=self.url_cache_size, ttl=PRESIGNED_URL_EXPIRE_MINS * 60)
+    
+    
+    async def open(self) -> None:
+        """
+            Creates one long lived client per process. Endpoint resolution,
+            credential loading and the connection pool are shared by every call.
+        """
+        if self._client is not None:
+            return 
+        
+        exit_stack = contextlib.AsyncExitStack()
+        self._client = await exit_stack.enter_async_context(
+            self.session.client("s3", config=self.config, endpoint_url=self.endpoint_url)
+        )
+        self._exit_stack = exit_stack
+        print("S3 client created.")
+        
+        
+    async def close(self) -> None:
+        try:
+            if self._exit_stack is not None:
+                await self._exit_stack.aclose()
+                print("S3 client closed.")
+        except Exception as e:
+            print(f"Error occured while closing the S3 client. {str(e)}")
+        finally:
+            self._client, self._exit_stack = None, None
+            
+            
+    @property
+    def client(self) -> S3Client:
+        if self._client is None:
+            raise ValueError("Open the storage service to get the S3 client.")
+        return self._client
+    
     async def get_presigned_url(
         self,
         filename: str,
         expire_mins: int = PRESIGNED_URL_EXPIRE_MINS
     ) -> str:
         
-        async with self.session.client("s3") as s3:
-            s3: S3Client
-            return await s3.generate_presigned_url(
+        # Repeated views within the expiry window get the same URL.
+        cache_key = (filename, expire_mins)
+        url = self._url_cache.get(cache_key)
+        if url is not None:
+            return url
+        
+        if self.signer is not None:
+            url = self.signer.presign(
+                "GET", filename, 
+                expires_in=(expire_mins * 60),
+                params={"response-content-disposition": "inline"}
+            )
+        else:
+            url = await self.client.generate_presigned_url(
                 ClientMethod="get_object",
                 Params={
                     "Key": filename,
@@ -95,6 +259,10 @@ class S3(BaseObjectStorageService):
                 },
                 ExpiresIn=(expire_mins * 60) 
             )
+        
+        # Cache for half of the expiry, so a cached URL has at least half its lifetime left.
+        self._url_cache.set(cache_key, url, ttl=(expire_mins * 60) / 2)
+        return url
             
     
     async def generate_presigned_url(
@@ -103,17 +271,22 @@ class S3(BaseObjectStorageService):
         expire_mins: int = PRESIGNED_URL_EXPIRE_MINS
     ) -> str:
         
-        async with self.session.client("s3") as s3:
-            s3: S3Client
-            return await s3.generate_presigned_url(
-                ClientMethod="put_object",
-                Params={
-                    "Bucket": self.bucket,
-                    "Key": file_metadata.filename,
-                    "ContentType": file_metadata.content_type
-                },
-                ExpiresIn=(expire_mins * 60)
-            )  
+        if self.signer is not None:
+            return self.signer.presign(
+                "PUT", str(file_metadata.filename),
+                expires_in=(expire_mins * 60),
+                headers={"Content-Type": file_metadata.content_type}
+            )
+        
+        return await self.client.generate_presigned_url(
+            ClientMethod="put_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": file_metadata.filename,
+                "ContentType": file_metadata.content_type
+            },
+            ExpiresIn=(expire_mins * 60)
+        )
     
     async def generate_presigned_urls(
         self, 
@@ -121,6 +294,16 @@ class S3(BaseObjectStorageService):
         expire_mins: int = PRESIGNED_URL_EXPIRE_MINS
     ) -> List[str]:
         
+        if self.signer is not None: # Pure CPU work, no need to schedule tasks.
+            return [
+                self.signer.presign(
+                    "PUT", str(fm.filename),
+                    expires_in=(expire_mins * 60),
+                    headers={"Content-Type": fm.content_type}
+                )
+                for fm in files_metadata
+            ]
+        
         return await asyncio.gather(
             *(
                 self.generate_presigned_url(fm, expire_mins) 
@@ -133,29 +316,205 @@ class S3(BaseObjectStorageService):
         filename: Union[str, Path],
         s3_key: Optional[str] = None
     ):
-        async with self.session.client("s3") as s3:
-            s3: S3Client
-            return await s3.upload_file(
-                Bucket=self.bucket,
-                Key=os.path.basename(filename) if s3_key is None else s3_key,
-                Filename=str(filename)
+        return await self.client.upload_file(
+            Bucket=self.bucket,
+            Key=os.path.basename(filename) if s3_key is None else s3_key,
+            Filename=str(filename)
+        )
+        
+
+    async def upload_stream(
+        self,
+        s3_key: str,
+        source: ByteSource,
+        content_type: Optional[str] = None,
+        part_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None
+    ) -> UploadResult:
+        """
+            Streams a file to S3 without spooling it to disk. Small files are
+            sent with one put_object, larger ones as a multipart upload with at
+            most `max_concurrency` parts in flight, so memory stays around
+            part_size * max_concurrency whatever the file size. 
+            The multipart upload is aborted on any failure.
+        """
+        
+        part_size = max(part_size or self.part_size, MIN_PART_SIZE)
+        max_concurrency = max_concurrency or self.max_concurrency
+        extra_args = {"ContentType": content_type} if content_type else {}
+        
+        parts = iter_parts(source, part_size)
+        digest = hashlib.sha256()
+        first = await anext(parts, b"")
+        second = await anext(parts, None)
+        
+        if second is None:
+            digest.update(first)
+            response = await self.client.put_object(
+                Bucket=self.bucket, Key=s3_key, Body=first,
+                ChecksumSHA256=base64.b64encode(hashlib.sha256(first).digest()).decode(),
+                **extra_args
+            )
+            return UploadResult(key=s3_key, size=len(first), sha256=digest.hexdigest(), etag=response.get("ETag"))
+        
+        upload_id = (
+            await self.client.create_multipart_upload(
+                Bucket=self.bucket, Key=s3_key, ChecksumAlgorithm="SHA256", **extra_args
             )
+        )["UploadId"]
+        
+        slots = asyncio.Semaphore(max_concurrency)
+        completed: dict[int, dict[str, Any]] = {}
+        tasks: list[asyncio.Task] = []
+        
+        async def send_part(part_number: int, data: bytes) -> None:
+            try:
+                checksum = base64.b64encode(hashlib.sha256(data).digest()).decode()
+                response = await self.client.upload_part(
+                    Bucket=self.bucket, Key=s3_key, UploadId=upload_id,
+                    PartNumber=part_number, Body=data, ChecksumSHA256=checksum
+                )
+                completed[part_number] = {
+                    "PartNumber": part_number, "ETag": response["ETag"], "ChecksumSHA256": checksum
+                }
+            finally:
+                slots.release()
+        
+        async def all_parts() -> AsyncIterator[bytes]:
+            yield first
+            yield second
+            async for part in parts:
+                yield part
+        
+        size, part_number = 0, 0
+        try:
+            async for data in all_parts():
+                part_number += 1
+                if part_number > MAX_PARTS:
+                    raise ValueError(f"File needs more than {MAX_PARTS} parts, increase the part size.")
+                
+                digest.update(data)
+                size += len(data)
+                
+                # Waits for a free slot before reading further, this bounds the memory.
+                await slots.acquire()
+                
+                # Fail fast, no point in reading the rest if a part failed.
+                for task in tasks:
+                    if task.done() and task.exception() is not None:
+                        raise task.exception()
+                tasks = [task for task in tasks if not task.done()]
+                tasks.append(asyncio.create_task(send_part(part_number, data)))
+                
+            await asyncio.gather(*tasks)
+            
+            response = await self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=s3_key, UploadId=upload_id,
+                MultipartUpload={"Parts": [completed[number] for number in sorted(completed)]}
+            )
+            
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await asyncio.shield(self._abort_multipart_upload(s3_key, upload_id))
+            raise
+        
+        return UploadResult(key=s3_key, size=size, sha256=digest.hexdigest(), etag=response.get("ETag"))
+    
+    
+    async def _abort_multipart_upload(self, s3_key: str, upload_id: str) -> None:
+        try:
+            await self.client.abort_multipart_upload(Bucket=self.bucket, Key=s3_key, UploadId=upload_id)
+        except Exception as e:
+            print(f"Error occured while aborting the multipart upload of {s3_key}. {str(e)}")
         
 
+    async def stat_object(self, key: str) -> Optional[ObjectInfo]:
+        try:
+            response = await self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        
+        return ObjectInfo(
+            key=key,
+            size=response["ContentLength"],
+            etag=response["ETag"],
+            last_modified=response["LastModified"],
+            content_type=response.get("ContentType")
+        )
+        
+    
+    async def stream_object(
+        self,
+        key: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        chunk_size: int = 64 * 1024
+    ) -> AsyncIterator[bytes]:
+        """
+            Reads the body lazily, a chunk is only fetched when the consumer
+            asks for it, so a slow client applies backpressure to S3.
+        """
+        
+        # S3 rejects "bytes=0-" on an empty object (InvalidRange), a full read sends no range.
+        params = {"Bucket": self.bucket, "Key": key}
+        if start != 0 or end is not None:
+            params["Range"] = f"bytes={start}-{'' if end is None else end}"
+        response = await self.client.get_object(**params)
+        body = response["Body"]
+        try:
+            while chunk := await body.read(chunk_size):
+                yield chunk
+        finally:
+            body.close()
+            
+    
     async def delete_files(
         self,
-        filenames: List[str]
-    ) -> DeleteObjectOutputTypeDef:
-        
-        async with self.session.client("s3") as s3:
-            s3: S3Client
-            return await s3.delete_objects(
-                Bucket=self.bucket,
-                Delete=DeleteTypeDef(
-                    Objects=[{"Key": filename} for filename in filenames],
-                    Quiet=True
-                ),
+        filenames: List[str],
+        max_concurrency: Optional[int] = None
+    ) -> DeleteResult:
+        """
+            Deletes the keys in chunks of 1000 (the delete_objects limit), 
+            running the chunks concurrently. Per key errors are collected
+            instead of being ignored, so they can be retried.
+        """
+        
+        keys = list(dict.fromkeys(filenames)) # Drop duplicates, keep the order.
+        result = DeleteResult()
+        slots = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+        
+        async def delete_chunk(chunk: list[str]) -> None:
+            async with slots:
+                try:
+                    response = await self.client.delete_objects(
+                        Bucket=self.bucket,
+                        Delete=DeleteTypeDef(
+                            Objects=[{"Key": key} for key in chunk],
+                            Quiet=True # Only the errors are returned.
+                        ),
+                    )
+                except Exception as e:
+                    result.failed.update({key: str(e) for key in chunk})
+                    return
+                
+            errors = {
+                error["Key"]: f"{error.get('Code')}: {error.get('Message')}" 
+                for error in response.get("Errors", [])
+            }
+            result.failed.update(errors)
+            result.deleted.extend(key for key in chunk if key not in errors)
+            
+        await asyncio.gather(
+            *(
+                delete_chunk(keys[i: i + DELETE_BATCH_SIZE]) 
+                for i in range(0, len(keys), DELETE_BATCH_SIZE)
             )
+        )
+        return result
 
     
 
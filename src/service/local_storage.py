@@ -0,0 +1,193 @@
+import asyncio
+import hashlib
+import hmac
+import mimetypes
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import AsyncIterator, List, Literal, Optional, Union
+from urllib.parse import quote
+from src.exceptions import ValidationError
+from src.service.files import (
+    BaseObjectStorageService, ByteSource, DeleteResult, FileMetadata,
+    ObjectInfo, UploadResult, PRESIGNED_URL_EXPIRE_MINS, iter_chunks
+)
+
+
+
+@dataclass
+class LocalFileStorage(BaseObjectStorageService):
+    """
+        Object storage on the local disk, for development and benchmarks
+        without any network. URLs are signed with HMAC and served by the
+        storage router. Uploads are written to a temporary file and renamed
+        atomically, so readers never see a partial object.
+    """
+    root: Path
+    signing_secret: bytes
+    base_url: str # Where the storage router is mounted.
+    chunk_size: int = 1024 * 1024
+
+
+    def __post_init__(self) -> None:
+        self.root = Path(self.root).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+
+
+    def path_for(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root not in path.parents:
+            raise ValidationError(f"Invalid object key '{key}'.")
+        return path
+
+
+    def _signature(self, method: str, key: str, expires: int) -> str:
+        message = f"{method}\n{key}\n{expires}".encode()
+        return hmac.new(self.signing_secret, message, hashlib.sha256).hexdigest()
+
+
+    def sign_url(self, method: Literal["GET", "PUT"], key: str, expire_mins: int) -> str:
+        expires = int(time.time()) + expire_mins * 60
+        signature = self._signature(method, key, expires)
+        return f"{self.base_url.rstrip('/')}/{quote(key)}?expires={expires}&signature={signature}"
+
+
+    def verify_signature(self, method: str, key: str, expires: int, signature: str) -> bool:
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(self._signature(method, key, expires), signature)
+
+
+    async def get_presigned_url(
+        self,
+        filename: str,
+        expire_mins: int = PRESIGNED_URL_EXPIRE_MINS
+    ) -> str:
+        return self.sign_url("GET", filename, expire_mins)
+
+
+    async def generate_presigned_url(
+        self,
+        file_metadata: FileMetadata,
+        expire_mins: int = PRESIGNED_URL_EXPIRE_MINS
+    ) -> str:
+        return self.sign_url("PUT", str(file_metadata.filename), expire_mins)
+
+
+    async def generate_presigned_urls(
+        self,
+        files_metadata: List[FileMetadata],
+        expire_mins: int = PRESIGNED_URL_EXPIRE_MINS
+    ) -> List[str]:
+        return [self.sign_url("PUT", str(fm.filename), expire_mins) for fm in files_metadata]
+
+
+    def _atomic_copy(self, source: Path, target: Path) -> None:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=target.parent, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as tmp, open(source, "rb") as src:
+                shutil.copyfileobj(src, tmp, self.chunk_size)
+            os.replace(tmp_name, target)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+
+
+    async def upload_file(
+        self,
+        filename: Union[str, Path],
+        s3_key: Optional[str] = None
+    ) -> None:
+        key = os.path.basename(filename) if s3_key is None else s3_key
+        await asyncio.to_thread(self._atomic_copy, Path(filename), self.path_for(key))
+
+
+    async def upload_stream(
+        self,
+        s3_key: str,
+        source: ByteSource,
+        content_type: Optional[str] = None,
+        part_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None
+    ) -> UploadResult:
+
+        target = self.path_for(s3_key)
+        await asyncio.to_thread(target.parent.mkdir, parents=True, exist_ok=True)
+        fd, tmp_name = await asyncio.to_thread(tempfile.mkstemp, dir=target.parent, prefix=".upload-")
+
+        digest, size = hashlib.sha256(), 0
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                async for chunk in iter_chunks(source, part_size or self.chunk_size):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    await asyncio.to_thread(tmp.write, chunk)
+            await asyncio.to_thread(os.replace, tmp_name, target)
+        except BaseException:
+            await asyncio.to_thread(os.unlink, tmp_name)
+            raise
+
+        return UploadResult(key=s3_key, size=size, sha256=digest.hexdigest())
+
+
+    def _stat(self, key: str) -> Optional[ObjectInfo]:
+        try:
+            stat_result = self.path_for(key).stat()
+        except FileNotFoundError:
+            return None
+        
+        return ObjectInfo(
+            key=key,
+            size=stat_result.st_size,
+            etag=f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"',
+            last_modified=datetime.fromtimestamp(stat_result.st_mtime, tz=UTC),
+            content_type=mimetypes.guess_type(key)[0]
+        )
+    
+    
+    async def stat_object(self, key: str) -> Optional[ObjectInfo]:
+        return await asyncio.to_thread(self._stat, key)
+    
+    
+    async def stream_object(
+        self,
+        key: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        chunk_size: int = 64 * 1024
+    ) -> AsyncIterator[bytes]:
+        
+        file = await asyncio.to_thread(open, self.path_for(key), "rb")
+        try:
+            await asyncio.to_thread(file.seek, start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                size = chunk_size if remaining is None else min(chunk_size, remaining)
+                chunk = await asyncio.to_thread(file.read, size)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+        finally:
+            await asyncio.to_thread(file.close)
+
+
+    def _delete(self, keys: list[str]) -> DeleteResult:
+        result = DeleteResult()
+        for key in keys:
+            try:
+                self.path_for(key).unlink(missing_ok=True) # Same as S3, missing keys are deleted.
+                result.deleted.append(key)
+            except (OSError, ValidationError) as e:
+                result.failed[key] = str(e)
+        return result
+
+
+    async def delete_files(self, filenames: List[str]) -> DeleteResult:
+        return await asyncio.to_thread(self._delete, list(dict.fromkeys(filenames)))
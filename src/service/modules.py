@@ -1,9 +1,10 @@
-import asyncio
+from datetime import datetime
 from typing import Type, Optional
 from src.repository.users import UserRespository
 from src.service.base import BaseService, require_access
 from src.repository.modules import ModuleRepository
 from src.repository.courses import CourseRepository
+from src.commands.courses import CourseGetByIDQuery
 from src.commands.modules import Module, ModuleCreate, ModuleCreateWithPosition, ModuleGetQuery, ModuleUpdate, ModuleDelete, ModuleGet, ReArrangeModule
 from src.service.permission_policy import Entity, PermissionPolicy
 from src.exceptions import EntityNotFoundError, CourseModuleNotFoundError, CourseNotFoundError, CourseModuleAlreadyExistsError
@@ -35,35 +36,30 @@ class ModuleService(BaseService[Module]):
     @require_access(action="create", user_id_alias="created_by", entity_id_alias="course_id", parent_repo=course_repository)    
     async def create(self, cmd: ModuleCreate):
         
-        # Conditions
-        course_exist_flag, duplicate_module_title_flag = await asyncio.gather(
-            self.course_repo.exists_by(id=cmd.course_id),
-            self.repo.exists_by(title=cmd.title, course_id=cmd.course_id)
-        )
         # Check for course existance.
-        if not course_exist_flag:
+        if not await self.course_repo.exists_by(id=cmd.course_id):
             raise CourseNotFoundError(value=cmd.course_id)
-            
-        # Check for duplicate module name in a course.
-        if duplicate_module_title_flag:
-            raise CourseModuleAlreadyExistsError(cmd.title, identifier="title")
-                 
         
         position_string = await self.generate_position_string(course_id=cmd.course_id)
                  
-        module = await self.repo.add(
+        module = await self.repo.add_if_absent(
             ModuleCreateWithPosition(
                 **cmd.model_dump(),
                 position_string=position_string
             )
         )
-        return self._require_entity(module)
+        # Check for duplicate module name in a course.
+        if module is None:
+            raise CourseModuleAlreadyExistsError(cmd.title, identifier="title")
+        return module
     
 
 
     @require_access(action="update", user_id_alias="updated_by", entity_id_alias="id")
     async def update(self, cmd: ModuleUpdate):
-        module = await self.repo.update(cmd)
+        # A rename can collide with another live module of the course.
+        with self.map_unique_violation(cmd):
+            module = await self.repo.update(cmd)
         return self._require_entity(module, value=cmd.id)
     
    
@@ -81,6 +77,36 @@ class ModuleService(BaseService[Module]):
         return self._require_entity(module, value=query.id)
     
 
+    @require_access(action="view", user_id_alias="viewer_id", entity_id_alias="id", obj_name="query")
+    async def get_version(self, query: ModuleGetQuery) -> datetime:
+        "Returns only the version of a module, used for conditional requests."
+        version = await self.repo.get_version(query.id)
+        return self._require_entity(version, value=query.id)
+    
+    
+    @require_access(action="view", user_id_alias="viewer_id", entity_id_alias="id", obj_name="query", parent_repo=course_repository)
+    async def get_outline_version(self, query: CourseGetByIDQuery) -> datetime:
+        return await self._require_outline_version(query.id)
+    
+    
+    @require_access(action="view", user_id_alias="viewer_id", entity_id_alias="id", obj_name="query", parent_repo=course_repository)
+    async def get_outline(self, query: CourseGetByIDQuery) -> tuple[datetime, list[Module]]:
+        """
+            Returns the ordered modules of a course along with the outline version.
+            The version is read first, so it is never newer than the modules.
+        """
+        version = await self._require_outline_version(query.id)
+        modules = await self.repo.list_by_course(query.id)
+        return version, modules
+    
+    
+    async def _require_outline_version(self, course_id: int) -> datetime:
+        version = await self.repo.get_outline_version(course_id)
+        if version is None:
+            raise CourseNotFoundError(value=course_id)
+        return version
+    
+
     @require_access(action="update", user_id_alias="updated_by", entity_id_alias="target_id")
     async def rearrange_sequence(
         self, cmd: ReArrangeModule, 
@@ -1,5 +1,5 @@
-from enum import StrEnum
-from typing import Literal, Union, NamedTuple, TypeAlias
+from enum import IntEnum, StrEnum
+from typing import ClassVar, Literal, Union, NamedTuple, TypeAlias
 
 
 
@@ -8,6 +8,7 @@ class Entity(StrEnum):
     COURSE = "course"
     MODULE = "module"
     LESSON = "lesson"
+    RESOURCE = "resource"
     ASSIGNMENT = "assignment"
     SUBMISSIONS = "submissions"
     LAB_CREDENTIALS = "lab_credentials"
@@ -31,6 +32,24 @@ class Action(StrEnum):
 
 # Virtual Roles.
 UserRoleOrVirtual: TypeAlias = Union[UserRole, Literal["manager"]]
+
+VIRTUAL_ROLES: dict[str, frozenset[UserRole]] = {
+    "manager": frozenset({UserRole.SUBADMIN, UserRole.TRAINER})
+}
+
+
+class Decision(IntEnum):
+    DENY = 0
+    ALLOW = 1 # Any entity.
+    ALLOW_OWNED = 2 # Only the entities owned by the user.
+
+
+# Dense integer indexes, StrEnum members hash like their value so plain
+# strings (e.g. a role read from the database) resolve to the same slot.
+ROLE_INDEX: dict[str, int] = {role: idx for idx, role in enumerate(UserRole)}
+ENTITY_INDEX: dict[str, int] = {entity: idx for idx, entity in enumerate(Entity)}
+ACTION_INDEX: dict[str, int] = {action: idx for idx, action in enumerate(Action)}
+ROLE_STRIDE = len(Entity) * len(Action)
     
 
 class Policy(NamedTuple):
@@ -59,6 +78,7 @@ class PermissionPolicy:
             Entity.COURSE: OWNED_VIEW_UPDATE,
             Entity.MODULE: OWNED_STAFF_EDIT,
             Entity.LESSON: OWNED_STAFF_EDIT,
+            Entity.RESOURCE: OWNED_STAFF_EDIT,
             Entity.ASSIGNMENT: OWNED_VIEW_UPDATE,
             Entity.SUBMISSIONS: OWNED_VIEW_UPDATE,
             Entity.LAB_CREDENTIALS: OWNED_READ_ONLY
@@ -68,6 +88,7 @@ class PermissionPolicy:
             Entity.COURSE: OWNED_READ_ONLY,
             Entity.MODULE: OWNED_STAFF_EDIT,
             Entity.LESSON: OWNED_STAFF_EDIT,
+            Entity.RESOURCE: OWNED_STAFF_EDIT,
             Entity.ASSIGNMENT: OWNED_STAFF_EDIT,
             Entity.SUBMISSIONS: OWNED_VIEW_UPDATE,
             Entity.LAB_CREDENTIALS: OWNED_STAFF_EDIT
@@ -77,23 +98,68 @@ class PermissionPolicy:
             Entity.COURSE: OWNED_READ_ONLY,
             Entity.MODULE: OWNED_READ_ONLY,
             Entity.LESSON: OWNED_READ_ONLY,
+            Entity.RESOURCE: OWNED_READ_ONLY,
             Entity.ASSIGNMENT: OWNED_READ_ONLY,
             Entity.SUBMISSIONS: OWNED_STAFF_EDIT,
             Entity.LAB_CREDENTIALS: OWNED_READ_ONLY
         }
     }
     
+    # Compiled once at import, see `_compile`.
+    _policies: ClassVar[dict[tuple[str, str], Policy]]
+    _decisions: ClassVar[bytes]
+    
+    
+    @classmethod
+    def _compile(cls) -> None:
+        """
+            Flattens the mapper into a (role, entity) -> Policy dict and a
+            dense decision table indexed by role * ROLE_STRIDE + column.
+            Pairs missing from the mapper are denied.
+        """
+        policies: dict[tuple[str, str], Policy] = {}
+        decisions = bytearray(len(UserRole) * ROLE_STRIDE)
+        
+        for role in UserRole:
+            for entity in Entity:
+                policy = CRUD_ALL if role == UserRole.ADMIN else cls._permission_mapper[role].get(entity)
+                if policy is None:
+                    continue
+                policies[(role, entity)] = policy
+                
+                allowed = Decision.ALLOW if policy.scope == "global" else Decision.ALLOW_OWNED
+                for action in policy.capabilities:
+                    decisions[ROLE_INDEX[role] * ROLE_STRIDE + cls.column(entity, action)] = allowed
+        
+        cls._policies = policies
+        cls._decisions = bytes(decisions)
+    
+    
+    @staticmethod
+    def column(entity: Union[Entity, str], action: Union[Action, str]) -> int:
+        "Offset of an (entity, action) pair in a role row. Resolve it once, then call `decide`."
+        return ENTITY_INDEX[entity] * len(Action) + ACTION_INDEX[action]
+    
+    
+    def decide(self, role: Union[UserRole, str], column: int) -> int:
+        "Returns a Decision value. One dict lookup and one index, unknown roles are denied."
+        role_idx = ROLE_INDEX.get(role)
+        if role_idx is None:
+            return Decision.DENY
+        return self._decisions[role_idx * ROLE_STRIDE + column]
+    
+    
     def get_policy(
         self,
         role: Union[UserRole, str], 
         entity: Union[Entity, str]
     ) -> Policy:
         
-        role = UserRole(role)    
-        entity = Entity(entity)
-        
-        if role == UserRole.ADMIN:
-            return CRUD_ALL
-            
-        return self._permission_mapper[role][entity]
-        
+        try:
+            return self._policies[(role, entity)]
+        except KeyError:
+            raise ValueError(f"No policy for role '{role}' on entity '{entity}'.")
+
+
+PermissionPolicy._compile()
+
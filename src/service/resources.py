@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import posixpath
+import uuid
+from typing import Optional, Type
+from src.commands.base import UserID
+from src.commands.resources import (
+    Resource, ResourceDelete, ResourceFile, ResourceGet, ResourceGetQuery, ResourceStatus, ResourceUpdate,
+    ResourceUpload, ResourceUploadBatch, ResourceUploadComplete, ResourceUploadCompletion
+)
+from src.exceptions import EntityNotFoundError, CourseModuleNotFoundError, ResourceNotFoundError
+from src.repository.modules import ModuleRepository
+from src.repository.resources import ResourceRepository
+from src.repository.users import UserRespository
+from src.service.base import BaseService, require_access
+from src.service.content_store import ContentStore, StoredBlob
+from src.service.files import BaseObjectStorageService, FileMetadata, PRESIGNED_URL_EXPIRE_MINS
+from src.service.permission_policy import Entity, PermissionPolicy
+
+
+logger = logging.getLogger(__name__)
+
+module_repository = ModuleRepository()
+
+# Keeps a reference to the background adoptions until they finish.
+_adopt_tasks: set[asyncio.Task] = set()
+
+
+class ResourceService(BaseService[Resource]):
+
+    _entity: Entity = Entity.RESOURCE
+    _not_found_exc: Type[EntityNotFoundError] = ResourceNotFoundError
+
+
+    def __init__(
+        self,
+        storage: BaseObjectStorageService,
+        user_repo: Optional[UserRespository] = None,
+        permission_policy: Optional[PermissionPolicy] = None,
+        repo: Optional[ResourceRepository] = None,
+        upload_expire_mins: int = PRESIGNED_URL_EXPIRE_MINS,
+        content_store: Optional[ContentStore] = None
+    ) -> None:
+
+        super().__init__(user_repo, permission_policy)
+        self.repo = repo or ResourceRepository()
+        self.storage = storage
+        self.content_store = content_store or ContentStore(storage=storage)
+        self.upload_expire_mins = upload_expire_mins
+
+
+    @staticmethod
+    def build_object_key(module_id: int, filename: str) -> str:
+        # The random segment keeps re-uploads of the same filename apart.
+        return f"resources/{module_id}/{uuid.uuid4().hex}/{posixpath.basename(filename)}"
+
+
+    @require_access(action="create", user_id_alias="created_by", entity_id_alias="module_id", parent_repo=module_repository)
+    async def create(self, cmd: ResourceUploadBatch) -> list[ResourceUpload]:
+        """
+            Registers a batch of resources and returns one presigned upload
+            URL per file. Files declaring the sha256 of content the creator
+            can already read reuse the stored blob: they are ready at once,
+            without URL. One permission check, one insert and the URLs are
+            signed locally, whatever the size of the batch.
+        """
+        blobs = await asyncio.gather(*(self._claim(file, cmd.created_by) for file in cmd.files))
+        object_keys = [
+            blob.object_key if blob else self.build_object_key(cmd.module_id, file.filename)
+            for file, blob in zip(cmd.files, blobs, strict=True)
+        ]
+        digests = [blob.digest if blob else None for blob in blobs]
+
+        resources = await self.repo.add_many(cmd.module_id, cmd.files, object_keys, cmd.created_by, digests)
+        if not resources:
+            await asyncio.gather(*(self.content_store.release(blob.digest) for blob in blobs if blob))
+            raise CourseModuleNotFoundError(value=cmd.module_id)
+
+        pending = [resource for resource in resources if resource.content_digest is None]
+        upload_urls = await self.storage.generate_presigned_urls(
+            [
+                FileMetadata(filename=resource.object_key, content_type=resource.content_type, size=resource.size)
+                for resource in pending
+            ],
+            expire_mins=self.upload_expire_mins
+        )
+        urls_by_id = {resource.id: url for resource, url in zip(pending, upload_urls, strict=True)}
+        return [ResourceUpload(resource=resource, upload_url=urls_by_id.get(resource.id)) for resource in resources]
+
+
+    async def _claim(self, file: ResourceFile, user_id: UserID) -> Optional[StoredBlob]:
+        """
+            Claims the stored blob of a file declaring its sha256. Scoped to
+            the content the user can already read, knowing a digest is not a
+            proof of possession.
+        """
+        if file.sha256 is None:
+            return None
+        blob = await self.content_store.claim(file.sha256, readable_by=user_id)
+        if blob is not None and blob.size != file.size:
+            await self.content_store.release(blob.digest)
+            return None
+        return blob
+
+
+    @require_access(action="update", user_id_alias="updated_by", entity_id_alias="module_id", parent_repo=module_repository)
+    async def complete_uploads(self, cmd: ResourceUploadComplete) -> ResourceUploadCompletion:
+        """
+            Flips the uploaded resources of a module to ready in bulk. Only the
+            objects found in the storage with the declared size are accepted.
+        """
+        pending = await self.repo.list_pending(cmd.module_id, cmd.resource_ids)
+        objects = await asyncio.gather(*(self.storage.stat_object(r.object_key) for r in pending))
+
+        uploaded_ids = [
+            resource.id
+            for resource, info in zip(pending, objects, strict=True)
+            if info is not None and info.size == resource.size
+        ]
+        ready = await self.repo.mark_ready(cmd.module_id, uploaded_ids, cmd.updated_by)
+
+        ready_ids = {resource.id for resource in ready}
+        failed = [resource_id for resource_id in dict.fromkeys(cmd.resource_ids) if resource_id not in ready_ids]
+
+        # The declared digests are verified against the stored bytes in background.
+        for resource in ready:
+            if resource.sha256 is not None:
+                task = asyncio.create_task(self._adopt(resource))
+                _adopt_tasks.add(task)
+                task.add_done_callback(_adopt_tasks.discard)
+        return ResourceUploadCompletion(ready=ready, failed=failed)
+
+
+    async def _adopt(self, resource: Resource) -> None:
+        """
+            Copies an uploaded object into the blob of its content and
+            attaches the resource to it, so later uploads of the same bytes
+            are claimed. The client writable upload is then deleted. Nothing
+            happens when the bytes don't match the declared sha256.
+        """
+        try:
+            blob = await self.content_store.adopt(resource.object_key, resource.sha256, resource.content_type)
+            if blob is None:
+                return
+            attached = await self.repo.attach_blob(resource.id, resource.object_key, blob.digest, blob.object_key)
+            if not attached:
+                await self.content_store.release(blob.digest)
+        except Exception:
+            logger.exception("Content adoption failed for resource %s.", resource.id)
+
+
+    @require_access(action="update", user_id_alias="updated_by", entity_id_alias="id")
+    async def update(self, cmd: ResourceUpdate) -> Resource:
+        resource = await self.repo.update(cmd)
+        return self._require_entity(resource, value=cmd.id)
+
+
+    @require_access(action="delete", user_id_alias="deleted_by", entity_id_alias="id")
+    async def delete(self, cmd: ResourceDelete) -> Resource:
+        resource = await self.repo.delete(cmd)
+        return self._require_entity(resource, value=cmd.id)
+
+
+    @require_access(action="view", user_id_alias="viewer_id", entity_id_alias="id", obj_name="query")
+    async def get(self, query: ResourceGetQuery) -> Resource:
+        resource = await self.repo.get(ResourceGet(id=query.id))
+        return self._require_entity(resource, value=query.id)
+
+
+    @require_access(action="view", user_id_alias="viewer_id", entity_id_alias="id", obj_name="query")
+    async def get_download_key(self, query: ResourceGetQuery) -> str:
+        "Returns the storage key of a ready resource."
+        resource = await self.repo.get(ResourceGet(id=query.id))
+        if resource is None or resource.status != ResourceStatus.READY:
+            raise ResourceNotFoundError(value=query.id)
+        return resource.object_key
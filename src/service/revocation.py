@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Optional
+from src.invalidation import ALL_TABLES, InvalidationBus, InvalidationEvent, invalidation_bus as default_invalidation_bus
+from src.metrics import metrics
+from src.repository.token_revocations import TokenRevocationRepository
+from src.service.tokens import Principal
+
+
+logger = logging.getLogger(__name__)
+
+
+
+class RevocationList:
+    """
+        In-memory mirror of the token revocations, so checking a token costs
+        two dict lookups and no query. The mirror is refreshed incrementally
+        (only the rows added since the last refresh) when the invalidation
+        bus announces a revocation, and on a slow poll as a safety net.
+    """
+
+    def __init__(
+        self,
+        repo: Optional[TokenRevocationRepository] = None,
+        bus: Optional[InvalidationBus] = None,
+        poll_interval: float = 30.0,
+        overlap_seconds: float = 60.0,
+        prune_interval: float = 3600.0,
+        clock: Callable[[], float] = time.time
+    ) -> None:
+
+        self.repo = repo or TokenRevocationRepository()
+        self.bus = bus or default_invalidation_bus
+        self.poll_interval = poll_interval
+        self.overlap_seconds = overlap_seconds
+        self.prune_interval = prune_interval
+        self._clock = clock
+
+        # token id -> expiry, user id -> (not before, expiry). Timestamps in seconds.
+        self._token_ids: dict[str, float] = {}
+        self._user_epochs: dict[int, tuple[float, float]] = {}
+        self._last_id = 0
+        self._last_prune = 0.0
+
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._size = metrics.gauge("auth_revocations", "Revocations mirrored in memory.")
+        self._rejected = metrics.counter("auth_revoked_tokens_total", "Requests rejected with a revoked token.")
+
+
+    def is_revoked(self, principal: Principal) -> bool:
+        epoch = self._user_epochs.get(principal.user_id)
+        # iat has a second resolution, a token issued in the revocation second is revoked too.
+        revoked = (
+            (epoch is not None and principal.issued_at <= epoch[0]) or
+            principal.token_id in self._token_ids
+        )
+        if revoked:
+            self._rejected.inc()
+        return revoked
+
+
+    async def revoke_token(self, principal: Principal) -> None:
+        "Revokes a single token, e.g. on logout."
+        await self.repo.revoke_token(principal.token_id, principal.expires_at)
+        # Applied here right away, the other workers refresh on the notification.
+        self._token_ids[principal.token_id] = principal.expires_at
+        await self.bus.publish(self.repo.tablename, [None])
+
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self.bus.subscribe(self.repo.tablename, self._on_invalidation)
+        self.bus.subscribe(ALL_TABLES, self._on_invalidation)
+        await self.refresh()
+        self._task = asyncio.create_task(self._run(), name="token-revocations")
+
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+    def _on_invalidation(self, event: InvalidationEvent) -> None:
+        if event.table in (self.repo.tablename, ALL_TABLES):
+            self._wakeup.set()
+
+
+    async def refresh(self) -> None:
+        rows = await self.repo.changes_since(self._last_id, self.overlap_seconds)
+        for row in rows:
+            if row["token_id"] is not None:
+                self._token_ids[row["token_id"]] = row["expires_at"]
+            else:
+                current = self._user_epochs.get(row["user_id"])
+                if current is None or current[0] < row["not_before"]:
+                    self._user_epochs[row["user_id"]] = (row["not_before"], row["expires_at"])
+            self._last_id = max(self._last_id, row["id"])
+
+        self._drop_expired()
+        self._size.set(len(self._token_ids) + len(self._user_epochs))
+
+
+    def _drop_expired(self) -> None:
+        now = self._clock()
+        self._token_ids = {key: exp for key, exp in self._token_ids.items() if exp > now}
+        self._user_epochs = {key: value for key, value in self._user_epochs.items() if value[1] > now}
+
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.refresh()
+                if self._clock() - self._last_prune > self.prune_interval:
+                    await self.repo.prune()
+                    self._last_prune = self._clock()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Token revocation refresh failed.")
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+from typing import Optional
+from src.metrics import metrics
+from src.repository.content_blobs import ContentBlobRepository
+from src.repository.resources import ResourceRepository
+from src.repository.storage_deletion_queue import StorageDeletionQueueRepository
+from src.service.files import BaseObjectStorageService, DeleteResult
+
+
+logger = logging.getLogger(__name__)
+
+
+
+class StorageCleanupWorker:
+    """
+        Background task that drains the storage deletion queue. Requests only
+        enqueue keys (inside their transaction), the objects are deleted here
+        in bulk and failed keys are retried later with a backoff. The content
+        blobs left without reference and the uploads never completed within
+        `pending_ttl` seconds are queued first.
+    """
+
+    def __init__(
+        self,
+        storage: BaseObjectStorageService,
+        queue: Optional[StorageDeletionQueueRepository] = None,
+        blobs: Optional[ContentBlobRepository] = None,
+        resources: Optional[ResourceRepository] = None,
+        pending_ttl: float = 24 * 60 * 60,
+        batch_size: int = 5000,
+        poll_interval: float = 30.0,
+        lease_seconds: float = 300.0
+    ) -> None:
+
+        self.storage = storage
+        self.queue = queue or StorageDeletionQueueRepository()
+        self.blobs = blobs or ContentBlobRepository(self.queue.db)
+        self.resources = resources or ResourceRepository(self.queue.db)
+        self.pending_ttl = pending_ttl
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._deleted = metrics.counter("storage_cleanup_deleted_total", "Objects deleted by the cleanup worker.")
+        self._failed = metrics.counter("storage_cleanup_failed_total", "Object deletions that failed and were rescheduled.")
+        self._expired = metrics.counter("storage_cleanup_expired_uploads_total", "Pending resources expired before completion.")
+
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="storage-cleanup")
+
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+    def wake(self) -> None:
+        "Processes the queue now instead of waiting for the next poll."
+        self._wakeup.set()
+
+
+    async def run_once(self) -> Optional[DeleteResult]:
+        await self.blobs.sweep_orphans(self.batch_size)
+        self._expired.inc(await self.resources.expire_pending(self.pending_ttl, self.batch_size))
+        keys = await self.queue.claim(self.batch_size, self.lease_seconds)
+        if not keys:
+            return None
+
+        result = await self.storage.delete_files(keys)
+        await self.queue.complete(result.deleted)
+        await self.queue.fail(result.failed)
+
+        self._deleted.inc(len(result.deleted))
+        self._failed.inc(len(result.failed))
+        return result
+
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                result = await self.run_once()
+                # A full batch means there is probably more due, don't wait.
+                if result is not None and len(result.deleted) + len(result.failed) >= self.batch_size:
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Storage cleanup run failed.")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
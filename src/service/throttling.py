@@ -0,0 +1,230 @@
+import asyncio
+import contextlib
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import AsyncIterator, Callable, ClassVar, Optional
+from src.database import AsyncPgDBManager, async_db_manager
+from src.exceptions import ThrottledError
+from src.metrics import metrics
+from src.settings import AuthSettings
+
+
+
+class RateLimiter(ABC):
+    """
+        Token buckets keyed by a string. A bucket holds up to `burst` tokens
+        and refills continuously at `rate` tokens per second.
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+
+
+    @abstractmethod
+    async def acquire(self, key: str, cost: float = 1) -> Optional[float]:
+        "Takes `cost` tokens. Returns None if allowed, otherwise the seconds to wait."
+
+
+
+class InMemoryRateLimiter(RateLimiter):
+    """
+        Per-process buckets. Idle buckets are full again after
+        `burst / rate` seconds, the least recently used ones are dropped
+        when `max_keys` is reached, so the memory stays bounded under a
+        flood of distinct keys.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        max_keys: int = 100_000,
+        clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        super().__init__(rate, burst)
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict() # key -> (tokens, updated_at)
+
+
+    def try_acquire(self, key: str, cost: float = 1) -> Optional[float]:
+        now = self._clock()
+        tokens, updated_at = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+
+        if tokens < cost:
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            return (cost - tokens) / self.rate
+
+        self._buckets[key] = (tokens - cost, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return None
+
+
+    async def acquire(self, key: str, cost: float = 1) -> Optional[float]:
+        return self.try_acquire(key, cost)
+
+
+
+class PostgresRateLimiter(RateLimiter):
+    """
+        Buckets shared by every worker, stored in an unlogged table. The
+        refill and the take happen in one upsert, so concurrent workers
+        can't both spend the last token. Buckets idle for `burst / rate`
+        seconds are full again, they are pruned from time to time so a
+        flood of distinct keys doesn't grow the table without bound.
+    """
+
+    tablename: ClassVar[str] = "login_throttle"
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        scope: str,
+        db: Optional[AsyncPgDBManager] = None,
+        prune_interval: float = 60.0,
+        prune_batch: int = 10_000,
+        clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        super().__init__(rate, burst)
+        self.scope = scope # Keeps the email and the IP buckets apart.
+        self.db = db or async_db_manager
+        self.prune_interval = prune_interval
+        self.prune_batch = prune_batch
+        self._clock = clock
+        self._next_prune = clock() + prune_interval
+
+
+    async def acquire(self, key: str, cost: float = 1) -> Optional[float]:
+        sql = f"""
+            insert into {self.tablename} as t(key, tokens, updated_at)
+            values ($1, $2 - $4, now())
+            on conflict (key) do update
+            set
+                tokens = least($2, t.tokens + extract(epoch from now() - t.updated_at) * $3) - $4,
+                updated_at = now()
+            where
+                least($2, t.tokens + extract(epoch from now() - t.updated_at) * $3) >= $4
+            returning tokens
+            ;
+        """
+        executable = self.db.query_builder.build_executable(
+            sql, values=(f"{self.scope}:{key}", float(self.burst), float(self.rate), float(cost))
+        )
+        row = await self.db.execute(executable, fetch_returns="one")
+
+        if self._clock() >= self._next_prune:
+            self._next_prune = self._clock() + self.prune_interval
+            await self.prune()
+        # The bucket is not read when throttled, one token interval is a fair estimate.
+        return None if row else cost / self.rate
+
+
+    async def prune(self) -> int:
+        "Deletes a batch of the buckets of the scope that are full again, returns the count."
+        sql = f"""
+            delete from {self.tablename}
+            where key in (
+                select key from {self.tablename}
+                where key like $1 and updated_at < now() - make_interval(secs => $2)
+                limit $3
+            )
+            and updated_at < now() - make_interval(secs => $2)
+            returning 1
+            ;
+        """
+        executable = self.db.query_builder.build_executable(
+            sql, values=(f"{self.scope}:%", self.burst / self.rate, self.prune_batch)
+        )
+        rows = await self.db.execute(executable, fetch_returns="all")
+        return len(rows)
+
+
+
+class LoginThrottle:
+    """
+        Admission control in front of the password verification. Attempts
+        are rejected, before any hashing, when the email or the client IP
+        ran out of tokens, or when too many verifies are already waiting.
+        Verifies run in threads (argon2 releases the GIL), at most
+        `max_concurrent` at once, so logins can't starve the event loop.
+    """
+
+    def __init__(
+        self,
+        email_limiter: RateLimiter,
+        ip_limiter: RateLimiter,
+        max_concurrent: int = 4,
+        max_queued: int = 32
+    ) -> None:
+
+        self.email_limiter = email_limiter
+        self.ip_limiter = ip_limiter
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._waiting = 0
+
+        self._throttled = metrics.counter("auth_login_throttled_total", "Login attempts rejected before hashing.")
+        self._in_flight = metrics.gauge("auth_password_verifies_in_flight", "Password verifies running or queued.")
+
+
+    @classmethod
+    def from_settings(cls, auth: AuthSettings) -> "LoginThrottle":
+        if auth.login_throttle_backend == "postgres":
+            email_limiter = PostgresRateLimiter(auth.login_email_rate, auth.login_email_burst, scope="email")
+            ip_limiter = PostgresRateLimiter(auth.login_ip_rate, auth.login_ip_burst, scope="ip")
+        else:
+            email_limiter = InMemoryRateLimiter(auth.login_email_rate, auth.login_email_burst)
+            ip_limiter = InMemoryRateLimiter(auth.login_ip_rate, auth.login_ip_burst)
+
+        return cls(
+            email_limiter=email_limiter,
+            ip_limiter=ip_limiter,
+            max_concurrent=auth.max_concurrent_verifies,
+            max_queued=auth.max_queued_verifies
+        )
+
+
+    def _reject(self, retry_after: float) -> None:
+        self._throttled.inc()
+        raise ThrottledError(retry_after=retry_after)
+
+
+    async def check(self, email: str, client_ip: Optional[str] = None) -> None:
+        "Spends a token of the IP and of the email, raises ThrottledError if either is empty."
+        if client_ip is not None:
+            retry_after = await self.ip_limiter.acquire(client_ip)
+            if retry_after is not None:
+                self._reject(retry_after)
+
+        retry_after = await self.email_limiter.acquire(email.lower())
+        if retry_after is not None:
+            self._reject(retry_after)
+
+
+    @contextlib.asynccontextmanager
+    async def verify_slot(self) -> AsyncIterator[None]:
+        "Holds one of the verify slots, fails fast when the queue is already full."
+        if self._slots.locked() and self._waiting >= self.max_queued:
+            self._reject(retry_after=1.0)
+
+        self._waiting += 1
+        self._in_flight.inc()
+        try:
+            try:
+                await self._slots.acquire()
+            finally:
+                self._waiting -= 1
+            try:
+                yield
+            finally:
+                self._slots.release()
+        finally:
+            self._in_flight.dec()
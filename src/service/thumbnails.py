@@ -0,0 +1,186 @@
+import asyncio
+import io
+import logging
+import posixpath
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Optional, Sequence
+from PIL import Image, ImageOps
+from src.commands.courses import MAX_THUMBNAIL_SIZE, THUMBNAIL_PREFIX, is_course_thumbnail_key
+from src.metrics import metrics
+from src.repository.courses import CourseRepository
+from src.service.files import BaseObjectStorageService
+
+
+logger = logging.getLogger(__name__)
+
+MAX_SOURCE_BYTES = MAX_THUMBNAIL_SIZE
+VARIANT_FORMAT = "webp"
+
+
+
+def render_variants(data: bytes, widths: Sequence[int], quality: int = 80) -> dict[int, bytes]:
+    """
+        Decodes the image once and encodes one resized copy per width. Runs
+        in a worker process, keep it a plain module level function.
+        Widths larger than the source are skipped, images are never upscaled.
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        # JPEGs can be decoded at a reduced scale, much cheaper for large photos.
+        source.draft("RGB", (max(widths), max(widths)))
+        image = ImageOps.exif_transpose(source).convert("RGB")
+
+    variants: dict[int, bytes] = {}
+    for width in sorted(set(widths)):
+        if width > image.width and variants:
+            break
+        resized = image.copy()
+        resized.thumbnail((width, width * 4), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        resized.save(buffer, format=VARIANT_FORMAT, quality=quality, method=4)
+        variants[min(width, image.width)] = buffer.getvalue()
+    return variants
+
+
+
+def pick_variant(
+    thumbnail: str,
+    variants: Optional[dict[str, str]],
+    width: Optional[int]
+) -> str:
+    "Returns the smallest variant covering the width, or the original."
+    if not width or not variants:
+        return thumbnail
+    for variant_width in sorted(map(int, variants)):
+        if variant_width >= width:
+            return variants[str(variant_width)]
+    return thumbnail
+
+
+
+async def _as_stream(data: bytes) -> AsyncIterator[bytes]:
+    yield data
+
+
+
+class ThumbnailGenerator:
+    """
+        Generates resized variants of course thumbnails in background. The
+        decoding and resizing runs in a process pool, the event loop only
+        moves bytes between the storage and the workers. Once stored, the
+        variants are recorded on the course row (only if the thumbnail did
+        not change meanwhile).
+    """
+
+    def __init__(
+        self,
+        storage: BaseObjectStorageService,
+        repo: Optional[CourseRepository] = None,
+        widths: Sequence[int] = (160, 320, 640),
+        max_workers: int = 2,
+        prefix: str = THUMBNAIL_PREFIX
+    ) -> None:
+
+        self.storage = storage
+        self.repo = repo or CourseRepository()
+        self.widths = tuple(widths)
+        self.max_workers = max_workers
+        self.prefix = prefix
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._tasks: set[asyncio.Task] = set()
+        # Bounds the source images held in memory while waiting for a worker.
+        self._slots = asyncio.Semaphore(max_workers * 2)
+        self._generated = metrics.counter("thumbnail_variants_generated_total", "Thumbnail variants stored.")
+        self._failed = metrics.counter("thumbnail_generation_failed_total", "Thumbnail generations that failed.")
+        self._duration = metrics.histogram("thumbnail_render_seconds", "Time spent rendering the variants of a thumbnail.")
+
+
+    async def start(self) -> None:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+
+    async def stop(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+    def variant_key(self, course_id: int, thumbnail: str, width: int, generation: str) -> str:
+        # A unique generation per render, a key queued for deletion is never written again.
+        stem = posixpath.splitext(posixpath.basename(thumbnail))[0]
+        return f"{self.prefix}/{course_id}/{stem}-{generation}-{width}w.{VARIANT_FORMAT}"
+
+
+    def schedule(self, course_id: int, thumbnail: Optional[str]) -> None:
+        "Generates the variants in background, the request does not wait for it."
+        if not thumbnail or self._executor is None or not is_course_thumbnail_key(course_id, thumbnail):
+            return
+
+        task = asyncio.create_task(self._run(course_id, thumbnail), name=f"thumbnail-{course_id}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+    async def _run(self, course_id: int, thumbnail: str) -> None:
+        try:
+            await self.generate(course_id, thumbnail)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._failed.inc()
+            logger.exception("Thumbnail generation failed for course %s.", course_id)
+
+
+    async def _read_source(self, thumbnail: str) -> bytes:
+        info = await self.storage.stat_object(thumbnail)
+        if info is None:
+            raise FileNotFoundError(thumbnail)
+        if info.size > MAX_SOURCE_BYTES:
+            raise ValueError(f"Thumbnail '{thumbnail}' is too large ({info.size} bytes).")
+        return b"".join([chunk async for chunk in self.storage.stream_object(thumbnail)])
+
+
+    async def generate(self, course_id: int, thumbnail: str) -> dict[str, str]:
+        """
+            Renders, stores and records the variants of a thumbnail. Returns
+            the recorded variants, keyed by width.
+        """
+        if self._executor is None:
+            raise RuntimeError("ThumbnailGenerator is not started.")
+        # Never read an object the course does not own, e.g. a thumbnail set before the uploads.
+        if not is_course_thumbnail_key(course_id, thumbnail):
+            raise ValueError(f"Thumbnail '{thumbnail}' is not a key of course {course_id}.")
+
+        async with self._slots:
+            data = await self._read_source(thumbnail)
+            loop = asyncio.get_running_loop()
+            started_at = time.perf_counter()
+            rendered = await loop.run_in_executor(self._executor, render_variants, data, self.widths)
+            self._duration.observe(time.perf_counter() - started_at)
+            del data
+
+        generation = uuid.uuid4().hex
+        variants = {
+            str(width): self.variant_key(course_id, thumbnail, width, generation)
+            for width in rendered
+        }
+        await asyncio.gather(*(
+            self.storage.upload_stream(
+                variants[str(width)], _as_stream(content), content_type=f"image/{VARIANT_FORMAT}"
+            )
+            for width, content in rendered.items()
+        ))
+        self._generated.inc(len(variants))
+
+        if not await self.repo.set_thumbnail_variants(course_id, thumbnail, variants):
+            # The thumbnail was replaced (or the course deleted) while rendering.
+            await self.repo.deletion_queue.enqueue(list(variants.values()))
+            return {}
+        return variants
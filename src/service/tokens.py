@@ -0,0 +1,179 @@
+import hashlib
+import time
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Protocol
+import jwt
+from jwt.algorithms import get_default_algorithms
+from src.cache import TTLCache
+from src.commands.base import UserID
+from src.exceptions import UnAuthenticated
+from src.metrics import metrics
+from src.service.permission_policy import UserRole
+from src.settings import AuthSettings
+
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    "The verified identity of a request, decoded from its access token."
+    user_id: int
+    role: UserRole
+    token_id: str
+    issued_at: int
+    expires_at: int
+
+
+
+# Set once per request by the auth dependency, read by `require_access`.
+current_principal: ContextVar[Optional[Principal]] = ContextVar("current_principal", default=None)
+
+
+
+class RevocationChecker(Protocol):
+    def is_revoked(self, principal: Principal) -> bool: ...
+
+
+
+@dataclass(frozen=True, slots=True)
+class IssuedToken:
+    access_token: str
+    expires_in: int # Seconds
+
+
+
+class TokenService:
+    """
+        Issues and verifies the JWT access tokens. The keys are parsed once,
+        and the verified claims are cached by token hash until the token
+        expires, so a repeated token costs one hash and one dict lookup
+        instead of a signature verification.
+    """
+
+    def __init__(
+        self,
+        signing_key: Any,
+        verifying_key: Any,
+        algorithm: str = "HS256",
+        issuer: str = "vrx-learn",
+        audience: str = "vrx-learn-api",
+        ttl: int = 15 * 60,
+        leeway: int = 10,
+        cache_size: int = 100_000,
+        revocations: Optional[RevocationChecker] = None,
+        clock: Callable[[], float] = time.time
+    ) -> None:
+
+        algorithms = get_default_algorithms()
+        if algorithm not in algorithms:
+            raise ValueError(f"Unsupported JWT algorithm '{algorithm}'.")
+
+        # Parse the PEM / secret once, jwt would redo it on every call otherwise.
+        self._algorithm = algorithms[algorithm]
+        self._signing_key = self._algorithm.prepare_key(signing_key)
+        self._verifying_key = self._algorithm.prepare_key(verifying_key)
+        self._jwt = jwt.PyJWT()
+
+        self.algorithm = algorithm
+        self.issuer = issuer
+        self.audience = audience
+        self.ttl = ttl
+        self.leeway = leeway
+        self.revocations = revocations
+        self._clock = clock
+        self._cache: TTLCache[bytes, Principal] = TTLCache(maxsize=cache_size, ttl=ttl)
+
+        self._cache_hits = metrics.counter("auth_claims_cache_hits_total", "Tokens resolved from the claims cache.")
+        self._verifications = metrics.counter("auth_token_verifications_total", "Token signatures verified.")
+
+
+    @classmethod
+    def from_settings(
+        cls, 
+        auth: AuthSettings, 
+        revocations: Optional[RevocationChecker] = None
+    ) -> "TokenService":
+        if auth.jwt_algorithm.startswith("HS"):
+            signing_key = verifying_key = auth.jwt_secret.get_secret_value().encode()
+        else:
+            if auth.jwt_private_key is None or auth.jwt_public_key is None:
+                raise ValueError(f"{auth.jwt_algorithm} requires both the JWT private and public keys.")
+            signing_key = auth.jwt_private_key.get_secret_value()
+            verifying_key = auth.jwt_public_key
+
+        return cls(
+            signing_key=signing_key,
+            verifying_key=verifying_key,
+            algorithm=auth.jwt_algorithm,
+            issuer=auth.jwt_issuer,
+            audience=auth.jwt_audience,
+            ttl=auth.access_token_ttl,
+            leeway=auth.leeway,
+            cache_size=auth.claims_cache_size,
+            revocations=revocations
+        )
+
+
+    @staticmethod
+    def _cache_key(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+
+    def issue(self, user_id: UserID, role: UserRole) -> IssuedToken:
+        issued_at = int(self._clock())
+        claims = {
+            "sub": str(user_id),
+            "role": str(role),
+            "jti": uuid.uuid4().hex,
+            "iat": issued_at,
+            "exp": issued_at + self.ttl,
+            "iss": self.issuer,
+            "aud": self.audience
+        }
+        token = self._jwt.encode(claims, self._signing_key, algorithm=self.algorithm)
+        return IssuedToken(access_token=token, expires_in=self.ttl)
+
+
+    def _decode(self, token: str) -> Principal:
+        try:
+            claims = self._jwt.decode(
+                token,
+                self._verifying_key,
+                algorithms=[self.algorithm],
+                audience=self.audience,
+                issuer=self.issuer,
+                leeway=self.leeway,
+                options={"require": ["sub", "role", "jti", "iat", "exp"]}
+            )
+            return Principal(
+                user_id=int(claims["sub"]),
+                role=UserRole(claims["role"]),
+                token_id=claims["jti"],
+                issued_at=int(claims["iat"]),
+                expires_at=int(claims["exp"])
+            )
+        except jwt.ExpiredSignatureError:
+            raise UnAuthenticated("The access token has expired.")
+        except (jwt.PyJWTError, ValueError):
+            raise UnAuthenticated("The access token is invalid.")
+
+
+    def verify(self, token: str) -> Principal:
+        "Returns the principal of a valid token, raises UnAuthenticated otherwise."
+        key = self._cache_key(token)
+        now = self._clock()
+
+        principal = self._cache.get(key)
+        if principal is not None and principal.expires_at + self.leeway > now:
+            self._cache_hits.inc()
+        else:
+            self._verifications.inc()
+            principal = self._decode(token)
+            # Cached until the token expires, never longer.
+            self._cache.set(key, principal, ttl=principal.expires_at + self.leeway - now)
+
+        # Checked on every request, cached claims can be revoked at any time.
+        if self.revocations is not None and self.revocations.is_revoked(principal):
+            raise UnAuthenticated("The access token has been revoked.")
+        return principal
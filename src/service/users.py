@@ -1,8 +1,12 @@
+import asyncio
+import contextlib
+import logging
 from passlib.context import CryptContext
 from typing import ClassVar, Optional, Type, override
 from src.repository.users import UserRespository
 from src.service.base import BaseService, require_access
 from src.service.permission_policy import Entity, UserRoleOrVirtual
+from src.service.throttling import LoginThrottle
 import src.exceptions as domain_exceptions
 from src.commands.users import (
     User, UserCreate, UserDelete, PasswordUpdate,
@@ -10,13 +14,22 @@ from src.commands.users import (
     UserGetByID, UserAuth, UserGetByEmail
 )
 from src.commands.base import UserID
+from src.settings import settings
 
 
+logger = logging.getLogger(__name__)
+
 _pwd_context = CryptContext(
         schemes=["argon2"],
-        deprecated="auto"
+        deprecated="auto",
+        argon2__time_cost=settings.auth.argon2_time_cost,
+        argon2__memory_cost=settings.auth.argon2_memory_cost,
+        argon2__parallelism=settings.auth.argon2_parallelism
     )
 
+# Keeps a reference to the background rehashes until they finish.
+_rehash_tasks: set[asyncio.Task] = set()
+
 
 
 class PasswordHandler:
@@ -27,6 +40,10 @@ class PasswordHandler:
     def verify_password(self, raw_password: str, hashed_password: str) -> bool:
         return _pwd_context.verify(raw_password, hashed_password)
     
+    def needs_update(self, hashed_password: str) -> bool:
+        "True when the hash was made with other parameters. Only parses the hash."
+        return _pwd_context.needs_update(hashed_password)
+    
     
 
 class UserService(BaseService[User]):
@@ -39,11 +56,13 @@ class UserService(BaseService[User]):
         user_repo = None, 
         permission_policy = None,
         password_handler: Optional[PasswordHandler] = None,
-        repo: Optional[UserRespository] = None
+        repo: Optional[UserRespository] = None,
+        login_throttle: Optional[LoginThrottle] = None
     ):
         super().__init__(user_repo, permission_policy)
         self.repo = repo or UserRespository()
         self.password_handler = password_handler or PasswordHandler()
+        self.login_throttle = login_throttle
 
 
     @require_access(action="create", user_id_alias="created_by", obj_name="cmd")
@@ -54,14 +73,9 @@ class UserService(BaseService[User]):
         if cmd.password != cmd.confirm_password:
             raise domain_exceptions.PasswordMismatchError()
         
-        # Check for the duplicate email.
-        if await self.repo.exists_by(email=cmd.email):
-            raise domain_exceptions.UserAlreadyExistsError(
-                value=cmd.email, identifier="email"
-            )
-    
-        hashed_password = self.password_handler.hash_password(cmd.password)
-        user = await self.user_repo.add(
+        # Argon2 releases the GIL, hash in a thread to keep the loop free.
+        hashed_password = await asyncio.to_thread(self.password_handler.hash_password, cmd.password)
+        user = await self.user_repo.add_if_absent(
             UserCreate(
                 username=cmd.username,
                 email=cmd.email,
@@ -71,6 +85,11 @@ class UserService(BaseService[User]):
             ) 
         )
         
+        # Check for the duplicate email, no row back means a live user has it.
+        if user is None:
+            raise domain_exceptions.UserAlreadyExistsError(
+                value=cmd.email, identifier="email"
+            )
         return user
 
     
@@ -83,7 +102,7 @@ class UserService(BaseService[User]):
                 value=cmd.email, 
                 identifier="email"
             )
-        hashed_password = self.password_handler.hash_password(cmd.new_password)
+        hashed_password = await asyncio.to_thread(self.password_handler.hash_password, cmd.new_password)
         user = await self.user_repo.update(
             PasswordUpdate(
                 email=cmd.email, 
@@ -107,13 +126,51 @@ class UserService(BaseService[User]):
         return self._require_entity(user, value=query.id)
            
         
-    async def authenticate(self, auth: UserAuth) -> User:
+    async def authenticate(self, auth: UserAuth, client_ip: Optional[str] = None) -> User:
+        # Throttled attempts are rejected before any lookup or hashing.
+        if self.login_throttle is not None:
+            await self.login_throttle.check(auth.email, client_ip)
+        
         user = await self.repo.get(UserGetByEmail(email=auth.email))
-        if user is None or \
-            not self.password_handler.verify_password(
-                user.password, auth.password
-            ):
+        if user is None:
+            raise domain_exceptions.UnAuthenticated()
+        
+        verify_slot = self.login_throttle.verify_slot() if self.login_throttle else contextlib.nullcontext()
+        async with verify_slot:
+            is_valid = await asyncio.to_thread(
+                self.password_handler.verify_password, auth.password, user.password
+            )
+        
+        if not is_valid:
             raise domain_exceptions.UnAuthenticated()
+        
+        if self.password_handler.needs_update(user.password):
+            task = asyncio.create_task(self._rehash(user, auth.password))
+            _rehash_tasks.add(task)
+            task.add_done_callback(_rehash_tasks.discard)
         return user
+    
+    
+    async def _rehash(self, user: User, raw_password: str) -> None:
+        """
+            Upgrades the hash to the current parameters after a login, in
+            background. Only written if the password did not change meanwhile.
+        """
+        try:
+            verify_slot = self.login_throttle.verify_slot() if self.login_throttle else contextlib.nullcontext()
+            async with verify_slot:
+                new_password = await asyncio.to_thread(self.password_handler.hash_password, raw_password)
+            
+            await self.repo.update(
+                PasswordUpdate(
+                    email=user.email,
+                    new_password=new_password,
+                    expected_password=user.password
+                )
+            )
+        except domain_exceptions.ThrottledError:
+            pass # Busy with logins, the next login will retry.
+        except Exception:
+            logger.exception("Password rehash failed for user %s.", user.id)
 
     
@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import BaseModel, SecretStr, Field
-from typing import Annotated
+from pydantic import BaseModel, SecretStr, Field, model_validator
+from pathlib import Path
+from typing import Annotated, Literal, Optional, Self
 
 
 
@@ -32,6 +33,21 @@ class AWSS3Settings(BaseSettings):
     secret_access_key: SecretStr
     region: SecretStr
     s3_bucket: SecretStr    
+    endpoint_url: Optional[str] = None # Set to use a local S3 compatible server.
+    
+    # Client pool settings.
+    max_pool_connections: int = 50
+    tcp_keepalive: bool = True
+    keepalive_timeout: float = 60.0
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+    max_attempts: int = 3
+    retry_mode: Literal["legacy", "standard", "adaptive"] = "standard"
+    presigned_url_cache_size: int = 10_000
+    
+    # Multipart upload settings.
+    multipart_part_size: int = 8 * 1024 * 1024
+    multipart_concurrency: int = 4
 
     model_config = SettingsConfigDict(
         env_file="src/.env",
@@ -40,9 +56,112 @@ class AWSS3Settings(BaseSettings):
     )
 
 
+class StorageSettings(BaseSettings):
+    backend: Literal["s3", "local"] = "s3"
+    
+    # Local filesystem backend, used for development and benchmarks.
+    local_root: Path = Path("storage")
+    public_url: str = "http://localhost:8000/api/v1/storage"
+    # Signs the local URLs, required by the local backend (shared by every worker).
+    signing_secret: Optional[SecretStr] = None
+    
+    # Pending resources never completed are expired after this delay (seconds),
+    # longer than the upload URLs stay valid.
+    pending_upload_ttl: int = 24 * 60 * 60
+    
+    # Resized thumbnail variants, rendered in a process pool.
+    thumbnail_widths: list[int] = [160, 320, 640]
+    thumbnail_workers: int = 2
+
+    model_config = SettingsConfigDict(
+        env_file="src/.env",
+        extra="ignore",
+        env_prefix="STORAGE_"
+    )
+    
+    @model_validator(mode="after")
+    def validate_signing_secret(self) -> Self:
+        # A per process random secret would reject the URLs signed by the other workers.
+        if self.backend == "local" and self.signing_secret is None:
+            raise ValueError("STORAGE_SIGNING_SECRET is required with the local storage backend.")
+        return self
+
+
+class MonitoringSettings(BaseSettings):
+    loop_lag_interval: float = 0.25
+    slow_callback_threshold: float = 0.1
+    debug: bool = False
+
+    model_config = SettingsConfigDict(
+        env_file="src/.env",
+        extra="ignore",
+        env_prefix="MONITORING_"
+    )
+
+
+class AuthSettings(BaseSettings):
+    # HS* algorithms sign with the secret, RS*/ES*/EdDSA with the PEM keys.
+    jwt_algorithm: Literal["HS256", "HS384", "HS512", "RS256", "ES256", "EdDSA"] = "HS256"
+    # Required, every worker must sign and verify with the same key.
+    jwt_secret: Optional[SecretStr] = None
+    jwt_private_key: Optional[SecretStr] = None
+    jwt_public_key: Optional[str] = None
+    jwt_issuer: str = "vrx-learn"
+    jwt_audience: str = "vrx-learn-api"
+    access_token_ttl: int = 15 * 60 # Seconds
+    leeway: int = 10 # Seconds of clock skew accepted on exp.
+    claims_cache_size: int = 100_000
+    
+    # Login throttling, token buckets refilled per second up to the burst.
+    login_throttle_backend: Literal["memory", "postgres"] = "memory"
+    login_email_rate: float = 5 / 60
+    login_email_burst: int = 5
+    login_ip_rate: float = 1.0
+    login_ip_burst: int = 30
+    # Reverse proxies (addresses or networks) whose X-Forwarded-For is trusted to
+    # find the client IP of the per IP bucket. Empty: the peer address is used.
+    trusted_proxies: list[str] = []
+    # Password verifies allowed at once, and waiting beyond that.
+    max_concurrent_verifies: int = 4
+    max_queued_verifies: int = 32
+    
+    # Argon2 cost, tune with `python -m benchmarks.calibrate_argon2`.
+    # Hashes made with other parameters are upgraded on the next login.
+    argon2_time_cost: int = 2
+    argon2_memory_cost: int = 102400 # KiB
+    argon2_parallelism: int = 8
+    
+    # Ownership decisions, evicted when their course or user changes.
+    ownership_cache_size: int = 50_000
+    ownership_cache_ttl: float = 300 # Seconds, bounds a missed invalidation.
+
+    model_config = SettingsConfigDict(
+        env_file="src/.env",
+        extra="ignore",
+        env_prefix="AUTH_"
+    )
+    
+    @model_validator(mode="after")
+    def validate_jwt_keys(self) -> Self:
+        # A per process random key would reject the tokens of the other workers and of past deploys.
+        if self.jwt_algorithm.startswith("HS"):
+            if self.jwt_secret is None:
+                raise ValueError(f"AUTH_JWT_SECRET is required with {self.jwt_algorithm}.")
+        elif self.jwt_private_key is None or self.jwt_public_key is None:
+            raise ValueError(f"{self.jwt_algorithm} requires AUTH_JWT_PRIVATE_KEY and AUTH_JWT_PUBLIC_KEY.")
+        return self
+
+
 class Settings(BaseModel):
     database: Annotated[DatabaseSettings, Field(default_factory=LocalDatabaseSettings)]
-    aws: Annotated[AWSS3Settings, Field(default_factory=AWSS3Settings)]
+    storage: Annotated[StorageSettings, Field(default_factory=StorageSettings)]
+    # AWS credentials are only required by the s3 storage backend.
+    aws: Annotated[
+        Optional[AWSS3Settings], 
+        Field(default_factory=lambda data: AWSS3Settings() if data["storage"].backend == "s3" else None)
+    ]
+    monitoring: Annotated[MonitoringSettings, Field(default_factory=MonitoringSettings)]
+    auth: Annotated[AuthSettings, Field(default_factory=AuthSettings)]
     
     
 settings = Settings()
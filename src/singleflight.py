@@ -0,0 +1,54 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable
+from src.metrics import metrics
+
+
+
+class SingleFlight:
+    """
+        Coalesces concurrent calls with the same key into one in-flight call.
+        The first caller (leader) starts the work, every caller arriving before
+        it finishes (follower) awaits the same result. Nothing is cached once
+        the call completes.
+    """
+
+    def __init__(self, name: str) -> None:
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self._leaders = metrics.counter(
+            f"singleflight_{name}_leaders_total", "Calls that executed the work."
+        )
+        self._followers = metrics.counter(
+            f"singleflight_{name}_followers_total", "Calls that shared an in-flight result."
+        )
+        self._ratio = metrics.gauge(
+            f"singleflight_{name}_coalescing_ratio", "Share of calls served by an in-flight call."
+        )
+
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+
+    async def do[R](self, key: Hashable, func: Callable[[], Awaitable[R]]) -> R:
+
+        future = self._inflight.get(key)
+
+        if future is None:
+            future = asyncio.ensure_future(func())
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._forget(key, f))
+            self._leaders.inc()
+        else:
+            self._followers.inc()
+
+        total = self._leaders.value + self._followers.value
+        self._ratio.set(self._followers.value / total)
+
+        # Shield, so one cancelled caller does not cancel the shared call.
+        return await asyncio.shield(future)
+
+
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]